@@ -1,3 +1,9 @@
-from . import api
+from dotenv import load_dotenv
 
-__all__ = ["api"]
\ No newline at end of file
+# Read .env once per process, before any submodule reads its settings from
+# the environment at import time
+load_dotenv()
+
+from . import api  # noqa: E402 - must run after load_dotenv() so settings see .env
+
+__all__ = ["api"]
@@ -4,17 +4,37 @@ Uses LLM function calling to generate structured activity data
 """
 
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import Response
 from pydantic import BaseModel, Field
 from typing import List, Optional
-import json
+from typing_extensions import Annotated
+import logging
+import msgspec
 import os
-from app.services.ai_orchestrator.llm_client_groq import LLMClientGroq
+from app.services.ai_orchestrator.llm_client_groq import get_groq_client
+from app.services.cache import SemanticCache
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
-# Initialize modular LLM client
-# Uses llama-3.3-70b-versatile for balanced performance in activity generation
-client = LLMClientGroq(model="llama-3.3-70b-versatile")
+# Uses llama-3.3-70b-versatile for balanced performance in activity generation.
+# Clients are fetched per request from the memoized factory rather than bound
+# at import, so a new app lifespan (which closes the shared HTTP transport and
+# clears the factory) gets fresh ones
+ACTIVITY_MODEL = "llama-3.3-70b-versatile"
+
+# Cheap draft model: used when the cache has close-but-not-identical activities,
+# which are passed to it as few-shot examples
+DRAFT_MODEL = "llama-3.1-8b-instant"
+DRAFT_MIN_SIMILARITY = 0.75
+DRAFT_EXAMPLES = 3
+
+# Activities from either model need at least this many test cases
+MIN_TEST_CASES = 2
+
+# Semantic cache of generated activities (encoded JSON bodies) keyed by prompt
+# Paraphrased prompts above the similarity threshold reuse a prior generation
+activity_cache = SemanticCache(threshold=0.92, max_entries=256, ttl_seconds=3600)
 
 
 # Request/Response Models
@@ -38,6 +58,70 @@ class GeneratedActivity(BaseModel):
     hints: Optional[List[str]] = None
 
 
+# msgspec mirrors of the response models above, used on the hot path:
+# LLM tool-call arguments are decoded and validated into these in a single
+# pass and encoded straight back to the response body. The Pydantic models
+# remain the documented API schema.
+_NonEmptyStr = Annotated[str, msgspec.Meta(min_length=1)]
+
+
+class _TestCaseStruct(msgspec.Struct):
+    name: _NonEmptyStr
+    input: str
+    expectedOutput: str
+    isHidden: bool = False
+
+
+class _GeneratedActivityStruct(msgspec.Struct):
+    title: _NonEmptyStr
+    description: str
+    problemStatement: _NonEmptyStr
+    starterCode: _NonEmptyStr
+    testCases: Annotated[List[_TestCaseStruct], msgspec.Meta(min_length=MIN_TEST_CASES)]
+    hints: Optional[List[str]] = None
+
+
+# Precompiled decoder: the target type is resolved once here instead of on
+# every msgspec.json.decode(..., type=...) call
+_ACTIVITY_DECODER = msgspec.json.Decoder(_GeneratedActivityStruct)
+_ACTIVITY_ENCODER = msgspec.json.Encoder()
+
+
+def _parse_activity(arguments: str) -> _GeneratedActivityStruct:
+    """
+    Decode and validate LLM tool-call arguments into an activity.
+    
+    Draft and full-tier output go through the same checks: the Struct
+    constraints above, plus starter code that compiles.
+    
+    Raises:
+        msgspec.DecodeError: Malformed JSON or an invalid activity
+            (msgspec.ValidationError is a subclass)
+    """
+    activity = _ACTIVITY_DECODER.decode(arguments)
+    try:
+        compile(activity.starterCode, "<starterCode>", "exec")
+    except (SyntaxError, ValueError) as e:
+        raise msgspec.ValidationError(f"starterCode is not valid Python: {e}") from e
+    return activity
+
+
+# Static system prompt - identical across requests so provider prefix caching applies
+ACTIVITY_SYSTEM_PROMPT = """You are an expert computer science educator specializing in creating programming exercises.
+Your task is to generate high-quality coding activities for students learning Python.
+
+When creating activities:
+- Make problem statements clear and educational
+- Include realistic examples with input/output
+- Write starter code that guides without solving
+- Create comprehensive test cases (visible and hidden)
+- Provide progressive hints that don't give away the solution
+- Use proper Markdown formatting for problem statements
+- Ensure test cases actually validate the solution
+
+Generate activities appropriate for the requested difficulty level and topic."""
+
+
 # Function/Tool Definition for LLM
 ACTIVITY_GENERATION_TOOL = {
     "type": "function",
@@ -89,7 +173,7 @@ ACTIVITY_GENERATION_TOOL = {
                         },
                         "required": ["name", "input", "expectedOutput"]
                     },
-                    "minItems": 2
+                    "minItems": MIN_TEST_CASES
                 },
                 "hints": {
                     "type": "array",
@@ -105,46 +189,97 @@ ACTIVITY_GENERATION_TOOL = {
 }
 
 
-@router.post("/generate-activity", response_model=GeneratedActivity)
+# Built once at import; the same list object is handed to the SDK on every request
+ACTIVITY_GENERATION_TOOLS = [ACTIVITY_GENERATION_TOOL]
+
+# Pins the model to the activity tool; shared like the tool list above
+ACTIVITY_TOOL_CHOICE = {
+    "type": "function",
+    "function": {"name": ACTIVITY_GENERATION_TOOL["function"]["name"]},
+}
+
+
+async def _draft_from_cache(prompt: str) -> Optional[bytes]:
+    """
+    Try a cheap draft with the small model, using similar cached activities
+    as few-shot examples.
+    
+    Args:
+        prompt: Activity request from the user
+        
+    Returns:
+        Encoded activity body, or None if there are no similar activities or
+        the draft fails validation (caller escalates to the large model)
+    """
+    examples = activity_cache.search(prompt, min_score=DRAFT_MIN_SIMILARITY, top_k=DRAFT_EXAMPLES)
+    if not examples:
+        return None
+
+    examples_json = ",\n".join(body.decode() for _, body in examples)
+    user_prompt = (
+        f"Here are similar prior activities:\n[{examples_json}]\n\n"
+        f"Now generate: {prompt}"
+    )
+
+    try:
+        function_call_result = await get_groq_client(DRAFT_MODEL).complete_with_function_calling(
+            system_prompt=ACTIVITY_SYSTEM_PROMPT,
+            user_prompt=user_prompt,
+            tools=ACTIVITY_GENERATION_TOOLS,
+            tool_choice=ACTIVITY_TOOL_CHOICE,
+            temperature=0.7,
+            max_retries=0,
+        )
+        activity = _parse_activity(function_call_result["arguments"])
+    except Exception as e:
+        logger.info("Draft activity generation failed, escalating: %s", e)
+        return None
+
+    return _ACTIVITY_ENCODER.encode(activity)
+
+
+@router.post("/generate-activity", responses={200: {"model": GeneratedActivity}})
 async def generate_activity(request: GenerateActivityRequest):
     """
     Generate a coding activity using AI with function calling.
     
     The LLM will be instructed to generate structured data matching
     the Activity schema using function calling.
+    
+    Near-duplicate prompts are served from the semantic cache without
+    calling the LLM. Related (but not duplicate) prompts are drafted by a
+    small model seeded with cached activities; the large model is only
+    called when no draft is possible or the draft fails validation.
     """
-    try:
-        # Create the system prompt for activity generation
-        system_prompt = """You are an expert computer science educator specializing in creating programming exercises.
-Your task is to generate high-quality coding activities for students learning Python.
-
-When creating activities:
-- Make problem statements clear and educational
-- Include realistic examples with input/output
-- Write starter code that guides without solving
-- Create comprehensive test cases (visible and hidden)
-- Provide progressive hints that don't give away the solution
-- Use proper Markdown formatting for problem statements
-- Ensure test cases actually validate the solution
+    cached = activity_cache.get(request.prompt)
+    if cached is not None:
+        return Response(content=cached, media_type="application/json")
 
-Generate activities appropriate for the requested difficulty level and topic."""
+    # Drafts are not cached: the cache only holds large-model output so it
+    # stays a high-quality source of examples
+    draft = await _draft_from_cache(request.prompt)
+    if draft is not None:
+        return Response(content=draft, media_type="application/json")
 
+    try:
         # Call LLM with function calling using modular client
-        function_call_result = await client.complete_with_function_calling(
-            system_prompt=system_prompt,
+        function_call_result = await get_groq_client(ACTIVITY_MODEL).complete_with_function_calling(
+            system_prompt=ACTIVITY_SYSTEM_PROMPT,
             user_prompt=request.prompt,
-            tools=[ACTIVITY_GENERATION_TOOL],
+            tools=ACTIVITY_GENERATION_TOOLS,
+            tool_choice=ACTIVITY_TOOL_CHOICE,
             temperature=0.7
         )
 
-        # Parse the function call arguments
-        generated_data = json.loads(function_call_result["arguments"])
+        # Parse and validate the function call arguments in one pass
+        activity = _parse_activity(function_call_result["arguments"])
 
-        # Validate and return
-        activity = GeneratedActivity(**generated_data)
-        return activity
+        # Cache the encoded body so hits are served without re-serializing
+        body = _ACTIVITY_ENCODER.encode(activity)
+        activity_cache.set(request.prompt, body)
+        return Response(content=body, media_type="application/json")
 
-    except json.JSONDecodeError as e:
+    except msgspec.DecodeError as e:
         raise HTTPException(
             status_code=500,
             detail=f"Failed to parse LLM response: {str(e)}"
@@ -157,6 +292,5 @@ Generate activities appropriate for the requested difficulty level and topic."""
 
 
 # Note: To use a different model (e.g., for different capabilities or costs),
-# you can create another client instance:
-# client_fast = LLMClientGroq(model="llama-3.1-8b-instant")  # Faster, simpler tasks
-# client_large = LLMClientGroq(model="mixtral-8x7b-32768")   # Larger context window
+# fetch another shared client instance (memoized per model):
+# client_large = get_groq_client("mixtral-8x7b-32768")   # Larger context window
@@ -4,83 +4,199 @@ Chat API endpoint for pedagogical AI interactions.
 Provides Socratic tutoring integrated with behavioral telemetry.
 """
 
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import StreamingResponse
-from pydantic import BaseModel, Field
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel, Field, StringConstraints
 from typing import Optional, AsyncGenerator, List, Dict
+from typing_extensions import Annotated, NotRequired, TypedDict
 from datetime import datetime
+import asyncio
+import hashlib
 import logging
-import json
+import time
+import orjson
 
+from ..schemas import Identifier
 from ...services.ai_orchestrator import PedagogicalFirewall
-from ...services.ai_orchestrator.firewall import ChatContext
+from ...services.ai_orchestrator.firewall import GENERAL_CHAT_PROBLEM_ID, STREAM_ERROR_CHUNK, ChatContext
+from ...services.ai_orchestrator.prompts import OUT_OF_SCOPE_RESPONSE
+from ...services.cache import LLMCache
+from ...services.session import append_chat_turn, get_chat_history, get_session_code
 
 logger = logging.getLogger(__name__)
 
-# Initialize firewall (singleton)
-try:
-    firewall = PedagogicalFirewall()
-except Exception as e:
-    logger.error(f"Failed to initialize PedagogicalFirewall: {e}")
-    firewall = None
-
 router = APIRouter(prefix="/api/chat", tags=["chat"])
 
+# Responses to first-turn tutoring questions, shared across students
+tutor_cache = LLMCache(max_entries=10_000, ttl_seconds=3600)
 
-# --- SESSION CODE STORAGE ---
-# In-memory storage for session code (replace with Redis/DB in production)
-_session_code_store: Dict[str, Dict[str, str]] = {}
 
+# --- DEPENDENCIES ---
 
-async def _store_session_code(session_id: str, problem_id: str, code: str) -> None:
+async def get_firewall(request: Request) -> Optional[PedagogicalFirewall]:
     """
-    Store the current code for a session-problem pair.
+    Shared PedagogicalFirewall created in the app lifespan.
     
-    Args:
-        session_id: Unique session identifier
-        problem_id: Problem/activity identifier
-        code: Current code content
+    None when it failed to initialize (e.g. missing GROQ_API_KEY); endpoints
+    answer 503 in that case.
     """
-    key = f"{session_id}:{problem_id}"
-    _session_code_store[key] = {
-        "code": code,
-        "timestamp": datetime.utcnow().isoformat(),
-    }
-    logger.debug(f"Stored code for {key} ({len(code)} chars)")
+    return request.app.state.firewall
+
 
+# --- SESSION CODE CONTEXT ---
 
-async def _get_session_code(session_id: str, problem_id: str) -> Optional[str]:
+def _start_code_fetch(request: "SimpleChatRequest") -> Optional["asyncio.Task[Optional[str]]"]:
     """
-    Retrieve the current code for a session-problem pair.
+    Kick off the session code lookup as a task so it runs concurrently
+    with the caller's remaining request preparation.
     
-    Args:
-        session_id: Unique session identifier
-        problem_id: Problem/activity identifier
-        
     Returns:
-        Current code or None if not found
+        Task resolving to the stored code, or None if the request has no session
+    """
+    if not (request.session_id and request.problem_id):
+        return None
+    return asyncio.create_task(
+        get_session_code(request.session_id, request.problem_id, max_chars=MAX_CODE_CONTEXT_CHARS)
+    )
+
+
+# --- SERVER-SIDE HISTORY ---
+
+async def _load_history(
+    chat_history: Optional[List[Dict[str, str]]],
+    session_id: Optional[str],
+    problem_id: str,
+) -> List[Dict[str, str]]:
+    """
+    Recent conversation for the prompt.
+    
+    History sent by the client wins (older frontends still send it);
+    otherwise the turns stored server-side for the session are used, so
+    clients only need to send the new message.
+    """
+    if chat_history is None and session_id:
+        return await get_chat_history(session_id, problem_id, limit=MAX_HISTORY_MESSAGES)
+    return (chat_history or [])[-MAX_HISTORY_MESSAGES:]
+
+
+async def _record_turn(
+    session_id: Optional[str],
+    problem_id: str,
+    user_message: str,
+    assistant_message: str,
+) -> None:
+    """Store an answered exchange for the session (out-of-scope replies are not kept)."""
+    if session_id and assistant_message != OUT_OF_SCOPE_RESPONSE:
+        await append_chat_turn(session_id, problem_id, user_message, assistant_message)
+
+
+# --- INPUT LIMITS ---
+# Only the most recent turns are forwarded to the LLM; older turns add
+# input tokens without much pedagogical value and churn the prompt prefix
+MAX_HISTORY_MESSAGES = 6
+# Hard ceilings that keep oversized payloads away from the LLM entirely
+MAX_HISTORY_CHARS = 50_000
+MAX_CODE_CONTEXT_CHARS = 4_000
+
+
+def _check_history_size(chat_history: Optional[List[Dict[str, str]]]) -> None:
+    """
+    Reject requests whose chat history is too large to be worth sending upstream.
+    
+    Raises:
+        HTTPException: 413 if the combined message content exceeds MAX_HISTORY_CHARS
+    """
+    if not chat_history:
+        return
+    total = sum(len(message.get("content", "")) for message in chat_history)
+    if total > MAX_HISTORY_CHARS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Chat history too large ({total} chars, limit {MAX_HISTORY_CHARS})"
+        )
+
+
+# --- RESPONSE SERIALIZATION ---
+
+def _json_response(model: BaseModel) -> Response:
     """
-    key = f"{session_id}:{problem_id}"
-    stored = _session_code_store.get(key)
-    if stored:
-        return stored["code"]
-    return None
+    Serialize a response model straight to JSON bytes.
+    
+    Returning a Response skips FastAPI's jsonable_encoder pass; routes declare
+    the model via `responses=` so it is documented without being re-validated.
+    """
+    return Response(content=model.model_dump_json(), media_type="application/json")
+
+
+# --- SSE FRAMING ---
+# Token-sized chunks are coalesced so each frame amortizes encoding and send cost;
+# the first chunk is always sent on its own so batching never delays TTFT
+SSE_BATCH_MAX_CHUNKS = 8
+SSE_BATCH_MAX_DELAY_SECONDS = 0.03
+# Comment frame sent when nothing else has been, so proxies keep the connection open
+SSE_HEARTBEAT_SECONDS = 15.0
+SSE_HEARTBEAT = b": ping\n\n"
+SSE_DONE = b"data: [DONE]\n\n"
+
+
+def _sse_frame(content: str) -> bytes:
+    """Format a content chunk as a Server-Sent Events data frame."""
+    return b"data: " + orjson.dumps({"content": content}) + b"\n\n"
+
+
+def _sse_text_frame(content: str) -> bytes:
+    """
+    Format a content chunk as a plain-text SSE frame (no JSON wrapping).
+    
+    Newlines are carried as multi-line `data:` fields, which SSE clients
+    rejoin with "\n".
+    """
+    if "\r" in content:
+        content = content.replace("\r\n", "\n").replace("\r", "\n")
+    return ("data: " + content.replace("\n", "\ndata: ") + "\n\n").encode()
+
+
+async def _with_heartbeat(
+    frames: AsyncGenerator[bytes, None],
+    interval: float = SSE_HEARTBEAT_SECONDS,
+) -> AsyncGenerator[bytes, None]:
+    """Relay SSE frames, inserting a heartbeat whenever `interval` passes without one."""
+    next_frame = asyncio.ensure_future(anext(frames))
+    try:
+        while True:
+            done, _ = await asyncio.wait({next_frame}, timeout=interval)
+            if not done:
+                yield SSE_HEARTBEAT
+                continue
+            try:
+                frame = next_frame.result()
+            except StopAsyncIteration:
+                return
+            yield frame
+            next_frame = asyncio.ensure_future(anext(frames))
+    finally:
+        if not next_frame.done():
+            next_frame.cancel()
+            await asyncio.gather(next_frame, return_exceptions=True)
+        await frames.aclose()
 
 
 # --- SIMPLE CHAT MODELS FOR FRONTEND ---
 
 class SimpleChatRequest(BaseModel):
     """Simple chat request from frontend"""
-    message: str = Field(..., description="User message", min_length=1, max_length=500)
+    message: Annotated[str, StringConstraints(strip_whitespace=True)] = Field(
+        ..., description="User message", min_length=1, max_length=500
+    )
     chat_history: Optional[List[Dict[str, str]]] = Field(
         default=None,
         description="Previous conversation messages for context (optional)"
     )
-    session_id: Optional[str] = Field(
+    session_id: Optional[Identifier] = Field(
         default=None,
         description="Session ID to retrieve current code context"
     )
-    problem_id: Optional[str] = Field(
+    problem_id: Optional[Identifier] = Field(
         default=None,
         description="Problem ID to retrieve current code context"
     )
@@ -91,33 +207,43 @@ class SimpleChatResponse(BaseModel):
     response: str = Field(..., description="AI response")
 
 
+# Rejections all carry the same static message, so their body is encoded once
+_OUT_OF_SCOPE_SIMPLE_BODY = (
+    SimpleChatResponse(response=OUT_OF_SCOPE_RESPONSE).model_dump_json().encode()
+)
+
+
 # --- REQUEST/RESPONSE MODELS ---
 
-class BehavioralContext(BaseModel):
-    """Optional behavioral telemetry from the learning environment"""
-    cognitive_state: Optional[str] = Field(
-        None,
+class BehavioralContext(TypedDict):
+    """
+    Optional behavioral telemetry from the learning environment.
+    
+    A TypedDict rather than a nested model: it is validated as a plain dict
+    and read with .get(), with no per-request model instance.
+    """
+    cognitive_state: NotRequired[Annotated[Optional[str], Field(
         description="ACTIVE, REFLECTIVE_PAUSE, PASSIVE_IDLE, or DISENGAGEMENT"
-    )
-    iteration_state: Optional[str] = Field(
-        None,
+    )]]
+    iteration_state: NotRequired[Annotated[Optional[str], Field(
         description="NORMAL, DELIBERATE_DEBUGGING, RAPID_GUESSING, etc."
-    )
-    provenance_state: Optional[str] = Field(
-        None,
+    )]]
+    provenance_state: NotRequired[Annotated[Optional[str], Field(
         description="INCREMENTAL_EDIT, SUSPECTED_PASTE, etc."
-    )
+    )]]
 
 
 class ChatRequest(BaseModel):
     """Request for AI tutoring assistance"""
-    problem_id: str = Field(..., description="Problem identifier")
+    problem_id: Identifier = Field(..., description="Problem identifier")
     problem_description: str = Field(
         ...,
         description="The coding problem statement or description",
         max_length=2000,  # Token management
     )
-    user_query: str = Field(
+    # Stripped once during validation (before the length checks), so every
+    # consumer - logging, cache key, firewall - sees the same normalized text
+    user_query: Annotated[str, StringConstraints(strip_whitespace=True)] = Field(
         ...,
         description="Student's question or help request",
         min_length=5,
@@ -142,6 +268,12 @@ class ChatRequest(BaseModel):
         None,
         description="Previous conversation messages within this thread"
     )
+    
+    # With a session, history is kept server-side and chat_history can be omitted
+    session_id: Optional[Identifier] = Field(
+        None,
+        description="Session ID for server-side conversation history"
+    )
 
 
 class ChatResponse(BaseModel):
@@ -160,8 +292,11 @@ class ChatResponse(BaseModel):
 
 # --- ENDPOINTS ---
 
-@router.post("", response_model=SimpleChatResponse)
-async def simple_chat(request: SimpleChatRequest):
+@router.post("", responses={200: {"model": SimpleChatResponse}})
+async def simple_chat(
+    request: SimpleChatRequest,
+    firewall: Optional[PedagogicalFirewall] = Depends(get_firewall),
+):
     """
     Simple chat endpoint for frontend - minimal interface.
     
@@ -173,21 +308,39 @@ async def simple_chat(request: SimpleChatRequest):
             detail="AI tutoring service is unavailable. Check GROQ_API_KEY configuration."
         )
     
-    logger.info(f"Simple chat request - Message length: {len(request.message)}, History: {len(request.chat_history or [])} messages")
+    _check_history_size(request.chat_history)
+    
+    # Start fetching current code from session while the rest is prepared
+    code_task = _start_code_fetch(request)
+    
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(
+            "Simple chat request - Message length: %d, History: %d messages",
+            len(request.message), len(request.chat_history or []),
+        )
+    
+    problem_id = request.problem_id or GENERAL_CHAT_PROBLEM_ID
+    try:
+        chat_history = await _load_history(request.chat_history, request.session_id, problem_id)
+    except BaseException:
+        if code_task:
+            code_task.cancel()
+        raise
     
-    # Fetch current code from session if available
-    current_code = None
-    if request.session_id and request.problem_id:
-        current_code = await _get_session_code(request.session_id, request.problem_id)
-        if current_code:
-            logger.info(f"Retrieved code context for session {request.session_id} ({len(current_code)} chars)")
+    current_code = await code_task if code_task else None
+    if current_code and logger.isEnabledFor(logging.INFO):
+        logger.info(
+            "Retrieved code context for session %s (%d chars)",
+            request.session_id, len(current_code),
+        )
     
     # Build basic context (assume general coding help)
     context = ChatContext(
         user_query=request.message,
         problem_description="General coding problem",
-        problem_id=request.problem_id or "simple-chat",
-        chat_history=request.chat_history or [],
+        problem_id=problem_id,
+        session_id=request.session_id,
+        chat_history=chat_history,
         current_code=current_code,
     )
     
@@ -195,19 +348,29 @@ async def simple_chat(request: SimpleChatRequest):
         # Process through firewall
         response = await firewall.process_request(context)
         
-        return SimpleChatResponse(
+        if response.message == OUT_OF_SCOPE_RESPONSE:
+            return Response(content=_OUT_OF_SCOPE_SIMPLE_BODY, media_type="application/json")
+        
+        if response.reasoning != "LLM_ERROR":
+            await _record_turn(request.session_id, problem_id, request.message, response.message)
+        
+        return _json_response(SimpleChatResponse(
             response=response.message
-        )
+        ))
         
     except Exception as e:
-        logger.error(f"Error processing simple chat request: {e}")
-        return SimpleChatResponse(
+        logger.error("Error processing simple chat request: %s", e)
+        return _json_response(SimpleChatResponse(
             response="Sorry, I encountered an error. Please try again."
-        )
+        ))
 
 
 @router.post("/stream")
-async def stream_chat(request: SimpleChatRequest):
+async def stream_chat(
+    request: SimpleChatRequest,
+    raw: bool = False,
+    firewall: Optional[PedagogicalFirewall] = Depends(get_firewall),
+):
     """
     Streaming chat endpoint with Server-Sent Events (SSE).
     
@@ -218,6 +381,10 @@ async def stream_chat(request: SimpleChatRequest):
         data: {"content": "chunk text"}
         data: {"content": "more text"}
         data: [DONE]
+    
+    With `?raw=true`, chunks are sent as plain text instead of JSON:
+        data: chunk text
+        data: [DONE]
     """
     if not firewall:
         raise HTTPException(
@@ -225,47 +392,86 @@ async def stream_chat(request: SimpleChatRequest):
             detail="AI tutoring service is unavailable. Check GROQ_API_KEY configuration."
         )
     
-    logger.info(f"Streaming chat request - Message length: {len(request.message)}, History: {len(request.chat_history or [])} messages")
+    _check_history_size(request.chat_history)
+    
+    # Start fetching current code from session; it overlaps with response setup
+    code_task = _start_code_fetch(request)
     
-    async def generate_response() -> AsyncGenerator[str, None]:
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(
+            "Streaming chat request - Message length: %d, History: %d messages",
+            len(request.message), len(request.chat_history or []),
+        )
+    
+    async def generate_response() -> AsyncGenerator[bytes, None]:
         """Generate SSE-formatted response chunks"""
+        frame = _sse_text_frame if raw else _sse_frame
+        buffer: List[str] = []
         try:
-            # Fetch current code from session if available
-            current_code = None
-            if request.session_id and request.problem_id:
-                current_code = await _get_session_code(request.session_id, request.problem_id)
-                if current_code:
-                    logger.info(f"Retrieved code context for session {request.session_id} ({len(current_code)} chars)")
+            problem_id = request.problem_id or GENERAL_CHAT_PROBLEM_ID
+            chat_history = await _load_history(request.chat_history, request.session_id, problem_id)
+            
+            current_code = await code_task if code_task else None
+            if current_code and logger.isEnabledFor(logging.INFO):
+                logger.info(
+                    "Retrieved code context for session %s (%d chars)",
+                    request.session_id, len(current_code),
+                )
             
             # Build context with history
             context = ChatContext(
                 user_query=request.message,
                 problem_description="General coding problem",
-                problem_id=request.problem_id or "simple-chat",
-                chat_history=request.chat_history or [],
+                problem_id=problem_id,
+                session_id=request.session_id,
+                chat_history=chat_history,
                 current_code=current_code,
             )
             
-            # Stream through firewall
+            # Stream through firewall, batching chunks into fewer SSE frames
+            reply: List[str] = []
+            last_flush = time.monotonic()
             async for chunk in firewall.stream_response(context):
-                # Format as SSE
-                data = json.dumps({"content": chunk})
-                yield f"data: {data}\n\n"
+                if not chunk:
+                    continue
+                reply.append(chunk)
+                buffer.append(chunk)
+                if (
+                    len(reply) == 1  # First token goes out unbatched (TTFT)
+                    or len(buffer) >= SSE_BATCH_MAX_CHUNKS
+                    or time.monotonic() - last_flush >= SSE_BATCH_MAX_DELAY_SECONDS
+                ):
+                    yield frame("".join(buffer))
+                    buffer.clear()
+                    last_flush = time.monotonic()
+            
+            if buffer:
+                yield frame("".join(buffer))
+                buffer.clear()
+            
+            # Like the other routes, keep refusals and the error fallback out of history
+            text = "".join(reply)
+            if reply and reply[-1] != STREAM_ERROR_CHUNK and text != OUT_OF_SCOPE_RESPONSE:
+                await _record_turn(request.session_id, problem_id, request.message, text)
             
             # Send completion signal
-            yield "data: [DONE]\n\n"
+            yield SSE_DONE
             
         except Exception as e:
-            logger.error(f"Error in streaming chat: {e}")
+            logger.error("Error in streaming chat: %s", e)
+            # Flush whatever was generated before the failure
+            if buffer:
+                yield frame("".join(buffer))
             # Send error as final message
-            error_data = json.dumps({
-                "content": "\n\nSorry, I encountered an error. Please try again."
-            })
-            yield f"data: {error_data}\n\n"
-            yield "data: [DONE]\n\n"
+            yield frame("\n\nSorry, I encountered an error. Please try again.")
+            yield SSE_DONE
+        finally:
+            # No-op once awaited; stops the lookup if history loading failed first
+            if code_task:
+                code_task.cancel()
     
     return StreamingResponse(
-        generate_response(),
+        _with_heartbeat(generate_response()),
         media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache",
@@ -275,8 +481,11 @@ async def stream_chat(request: SimpleChatRequest):
     )
 
 
-@router.post("/ask", response_model=ChatResponse)
-async def ask_tutor(request: ChatRequest):
+@router.post("/ask", responses={200: {"model": ChatResponse}})
+async def ask_tutor(
+    request: ChatRequest,
+    firewall: Optional[PedagogicalFirewall] = Depends(get_firewall),
+):
     """
     Get Socratic tutoring help on a coding problem.
     
@@ -295,38 +504,71 @@ async def ask_tutor(request: ChatRequest):
             detail="AI tutoring service is unavailable. Check OpenAI API configuration."
         )
     
-    logger.info(
-        f"Chat request - Problem: {request.problem_id}, "
-        f"Query length: {len(request.user_query)}, "
-        f"History: {len(request.chat_history or [])} messages"
-    )
+    _check_history_size(request.chat_history)
+    
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(
+            "Chat request - Problem: %s, Query length: %d, History: %d messages",
+            request.problem_id, len(request.user_query), len(request.chat_history or []),
+        )
+    
+    chat_history = await _load_history(request.chat_history, request.session_id, request.problem_id)
+    
+    # Only first-turn questions are cached: with history, the answer
+    # depends on the conversation, which is not part of the key. The
+    # problem text is hashed into the key, like the firewall's response
+    # cache partition, so a reused or edited problem_id never serves a stale reply
+    cache_key = None
+    if not chat_history:
+        behavior = request.behavioral_context or {}
+        cache_key = LLMCache.make_key(
+            request.problem_id,
+            request.user_query,
+            desc=hashlib.md5(request.problem_description.encode()).hexdigest(),
+            cs=behavior.get("cognitive_state"),
+            its=behavior.get("iteration_state"),
+            ps=behavior.get("provenance_state"),
+        )
+        cached = tutor_cache.get(cache_key)
+        if cached is not None:
+            await _record_turn(request.session_id, request.problem_id, request.user_query, cached["message"])
+            return _json_response(ChatResponse.model_construct(**cached))
     
     # Build context
     context = ChatContext(
         user_query=request.user_query,
         problem_description=request.problem_description,
         problem_id=request.problem_id,
-        chat_history=request.chat_history or [],
+        session_id=request.session_id,
+        chat_history=chat_history,
     )
     
     # Add behavioral context if provided
     if request.behavioral_context:
-        context.cognitive_state = request.behavioral_context.cognitive_state
-        context.iteration_state = request.behavioral_context.iteration_state
-        context.provenance_state = request.behavioral_context.provenance_state
+        context.cognitive_state = request.behavioral_context.get("cognitive_state")
+        context.iteration_state = request.behavioral_context.get("iteration_state")
+        context.provenance_state = request.behavioral_context.get("provenance_state")
     
     try:
         # Process through firewall
         response = await firewall.process_request(context)
         
-        return ChatResponse(
+        chat_response = ChatResponse(
             message=response.message,
             is_allowed=response.is_allowed,
             intervention_triggered=response.intervention_triggered,
         )
+        # Don't pin the transient fallback message in the cache
+        if cache_key and response.reasoning != "LLM_ERROR":
+            # Timestamp is left out so hits get a fresh one from the default_factory
+            tutor_cache.set(cache_key, chat_response.model_dump(exclude={"timestamp"}))
+        if response.reasoning != "LLM_ERROR":
+            await _record_turn(request.session_id, request.problem_id, request.user_query, response.message)
+        
+        return _json_response(chat_response)
         
     except Exception as e:
-        logger.error(f"Error processing chat request: {e}")
+        logger.error("Error processing chat request: %s", e)
         raise HTTPException(
             status_code=500,
             detail="Failed to process your request. Please try again."
@@ -335,14 +577,17 @@ async def ask_tutor(request: ChatRequest):
 
 class HintRequest(BaseModel):
     """Request for a proactive hint"""
-    problem_id: str = Field(..., description="Problem identifier")
+    problem_id: Identifier = Field(..., description="Problem identifier")
     problem_description: str = Field(..., description="Problem statement")
     current_code: Optional[str] = Field(None, description="Current code attempt")
     cognitive_state: Optional[str] = Field(None, description="Current cognitive state")
 
 
-@router.post("/hint", response_model=ChatResponse)
-async def get_hint(request: HintRequest):
+@router.post("/hint", responses={200: {"model": ChatResponse}})
+async def get_hint(
+    request: HintRequest,
+    firewall: Optional[PedagogicalFirewall] = Depends(get_firewall),
+):
     """
     Get a proactive hint when stuck.
     
@@ -358,7 +603,7 @@ async def get_hint(request: HintRequest):
             detail="AI tutoring service is unavailable"
         )
     
-    logger.info(f"Hint requested - Problem: {request.problem_id}")
+    logger.info("Hint requested - Problem: %s", request.problem_id)
     
     try:
         hint = await firewall.generate_hint(
@@ -367,22 +612,28 @@ async def get_hint(request: HintRequest):
             cognitive_state=request.cognitive_state,
         )
         
-        return ChatResponse(
+        return _json_response(ChatResponse(
             message=hint,
             is_allowed=True,
             intervention_triggered=True,
-        )
+        ))
         
     except Exception as e:
-        logger.error(f"Error generating hint: {e}")
+        logger.error("Error generating hint: %s", e)
         raise HTTPException(
             status_code=500,
             detail="Failed to generate hint"
         )
 
 
+@router.get("/cache/stats")
+async def cache_stats():
+    """Hit-rate counters for the tutoring response cache"""
+    return tutor_cache.stats()
+
+
 @router.get("/health")
-async def health_check():
+async def health_check(firewall: Optional[PedagogicalFirewall] = Depends(get_firewall)):
     """Check if AI tutoring service is operational"""
     if not firewall:
         return {
@@ -393,4 +644,8 @@ async def health_check():
     return {
         "status": "operational",
         "model": firewall.llm.model,
+        "validator_model": firewall.validator_llm.model,
+        "llm_in_flight": firewall.llm_in_flight,
+        "llm_concurrency_limit": firewall.max_concurrent_llm_calls,
+        "response_cache": firewall.response_cache.stats(),
     }
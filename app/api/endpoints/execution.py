@@ -2,36 +2,68 @@
 FastAPI endpoints for code execution with behavioral telemetry integration.
 """
 
-from fastapi import APIRouter, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Request
+from fastapi.responses import Response
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
+from typing_extensions import Annotated, NotRequired, TypedDict
 from datetime import datetime
+import asyncio
 import logging
 
+from ..schemas import Identifier
+from ...services.events import EventBatcher
 from ...services.execution import DockerExecutor, ExecutionResult
+from ...services.session import store_session_code
 
 logger = logging.getLogger(__name__)
 
-# Initialize executor (singleton)
-executor = DockerExecutor()
-
 router = APIRouter(prefix="/api/execution", tags=["execution"])
 
 
+# --- DEPENDENCIES ---
+
+async def get_executor(request: Request) -> DockerExecutor:
+    """
+    Shared DockerExecutor created in the app lifespan.
+    
+    Raises:
+        HTTPException: 503 if Docker was unavailable at startup
+    """
+    executor = request.app.state.executor
+    if executor is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Execution service unavailable"
+        )
+    return executor
+
+
+async def get_event_batcher(request: Request) -> EventBatcher:
+    """Shared write-behind queue for execution events (started in the app lifespan)."""
+    return request.app.state.event_batcher
+
+
 # --- REQUEST/RESPONSE MODELS ---
 
-class TestCase(BaseModel):
-    """Individual test case for code validation"""
-    input: str = Field(default="", description="Standard input for the test")
-    expected_output: str = Field(..., description="Expected program output")
-    description: Optional[str] = Field(None, description="Test case description")
+class TestCase(TypedDict):
+    """
+    Individual test case for code validation.
+    
+    A TypedDict rather than a nested model: validated test cases are
+    already the plain dicts DockerExecutor.execute_with_tests consumes.
+    A missing `input` means empty stdin.
+    """
+    input: NotRequired[Annotated[str, Field(description="Standard input for the test")]]
+    expected_output: Annotated[str, Field(description="Expected program output")]
+    description: NotRequired[Annotated[Optional[str], Field(description="Test case description")]]
 
 
 class ExecutionRequest(BaseModel):
     """Request body for code execution"""
-    session_id: str = Field(..., description="Unique session identifier")
+    session_id: Identifier = Field(..., description="Unique session identifier")
     code: str = Field(..., description="Python code to execute")
-    problem_id: str = Field(..., description="Problem/activity identifier")
+    problem_id: Identifier = Field(..., description="Problem/activity identifier")
     stdin: Optional[str] = Field(default="", description="Standard input")
     test_cases: Optional[List[TestCase]] = Field(None, description="Test cases for validation")
     
@@ -58,10 +90,12 @@ class ExecutionResponse(BaseModel):
 
 # --- ENDPOINTS ---
 
-@router.post("/run", response_model=ExecutionResponse)
+@router.post("/run", responses={200: {"model": ExecutionResponse}})
 async def run_code(
     request: ExecutionRequest,
-    background_tasks: BackgroundTasks
+    background_tasks: BackgroundTasks,
+    executor: DockerExecutor = Depends(get_executor),
+    events: EventBatcher = Depends(get_event_batcher),
 ):
     """
     Execute Python code in a sandboxed Docker container.
@@ -80,24 +114,15 @@ async def run_code(
     - Read-only filesystem
     """
     
-    logger.info(f"Execution request for session {request.session_id}, problem {request.problem_id}")
+    logger.info("Execution request for session %s, problem %s", request.session_id, request.problem_id)
     
     try:
-        # Store code in session for chat context (import here to avoid circular dependency)
-        from .chat import _store_session_code
-        background_tasks.add_task(
-            _store_session_code,
-            request.session_id,
-            request.problem_id,
-            request.code
-        )
-        
         # Execute code
         if request.test_cases:
             # Run with test validation
             result = await executor.execute_with_tests(
                 code=request.code,
-                test_cases=[tc.dict() for tc in request.test_cases]
+                test_cases=request.test_cases
             )
         else:
             # Simple execution
@@ -106,37 +131,45 @@ async def run_code(
                 stdin=request.stdin or ""
             )
         
+        # Single clock read shared by the flags, the stored event and the response
+        now = datetime.now()
+        
         # Prepare behavioral flags (to be analyzed by Data Fusion Engine)
         behavioral_flags = _analyze_execution_behavior(
             result=result,
-            telemetry=request.telemetry
+            telemetry=request.telemetry,
+            now=now
         )
         
-        # Store execution event asynchronously (doesn't block response)
+        # Store session code and queue the execution event in one
+        # background task (runs after the response is sent)
         background_tasks.add_task(
-            _store_execution_event,
+            _persist_execution,
+            events,
             session_id=request.session_id,
             problem_id=request.problem_id,
             code=request.code,
             result=result,
             telemetry=request.telemetry,
-            behavioral_flags=behavioral_flags
+            behavioral_flags=behavioral_flags,
+            now=now
         )
         
-        # Return response immediately
-        return ExecutionResponse(
+        # Return response immediately (pre-serialized; the route documents the schema)
+        response = ExecutionResponse(
             status=result.status,
             output=result.output,
             error=result.error if result.error else None,
             execution_time=result.execution_time,
             exit_code=result.exit_code,
             test_results=result.test_results,
-            timestamp=datetime.now(),
+            timestamp=now,
             behavioral_flags=behavioral_flags
         )
+        return Response(content=response.model_dump_json(), media_type="application/json")
         
     except Exception as e:
-        logger.error(f"Execution failed: {e}", exc_info=True)
+        logger.error("Execution failed: %s", e, exc_info=True)
         raise HTTPException(
             status_code=500,
             detail=f"Execution service error: {str(e)}"
@@ -144,13 +177,14 @@ async def run_code(
 
 
 @router.get("/health")
-async def health_check():
+async def health_check(executor: DockerExecutor = Depends(get_executor)):
     """
     Check if the execution service is healthy.
     
     Returns Docker status and configuration.
     """
-    health = executor.health_check()
+    # Docker SDK calls are blocking; keep them off the event loop
+    health = await asyncio.to_thread(executor.health_check)
     
     if health["status"] != "healthy":
         raise HTTPException(
@@ -165,7 +199,8 @@ async def health_check():
 
 def _analyze_execution_behavior(
     result: ExecutionResult,
-    telemetry: Optional[Dict[str, Any]]
+    telemetry: Optional[Dict[str, Any]],
+    now: datetime
 ) -> Dict[str, Any]:
     """
     Analyze execution in context of behavioral monitoring.
@@ -174,6 +209,11 @@ def _analyze_execution_behavior(
     - Cognitive State Differentiation (Figure 8): last_run_was_error
     - Iteration Quality Assessment (Figure 7): run intervals
     
+    Args:
+        result: Execution result
+        telemetry: Raw telemetry from the frontend
+        now: Request timestamp (read once by the caller)
+    
     Returns flags for the Data Fusion Engine.
     """
     if not telemetry:
@@ -182,46 +222,93 @@ def _analyze_execution_behavior(
     flags = {
         "last_run_was_error": result.status == "error",
         "execution_time": result.execution_time,
-        "timestamp": datetime.now().isoformat()
+        "timestamp": now.isoformat()
     }
     
     # Calculate run interval if available
-    if "last_run_timestamp" in telemetry:
-        try:
-            last_run = datetime.fromisoformat(telemetry["last_run_timestamp"])
-            interval = (datetime.now() - last_run).total_seconds()
-            flags["last_run_interval_seconds"] = interval
-            
-            # Flag rapid-fire attempts (< 10 seconds, as per thesis)
-            if interval < 10:
-                flags["rapid_iteration"] = True
-        except:
-            pass
+    interval = _run_interval_seconds(telemetry, now)
+    if interval is not None:
+        flags["last_run_interval_seconds"] = interval
+        
+        # Flag rapid-fire attempts (< 10 seconds, as per thesis)
+        if interval < 10:
+            flags["rapid_iteration"] = True
     
     return flags
 
 
-async def _store_execution_event(
+def _run_interval_seconds(telemetry: Dict[str, Any], now: datetime) -> Optional[float]:
+    """
+    Seconds since the previous run, or None if the telemetry doesn't say.
+    
+    Prefers the interval the frontend already computed; otherwise parses
+    `last_run_timestamp`, pre-checking its shape so malformed values are
+    skipped without raising.
+    """
+    interval = telemetry.get("last_run_interval_seconds")
+    if isinstance(interval, (int, float)) and not isinstance(interval, bool):
+        return float(interval)
+    
+    ts = telemetry.get("last_run_timestamp")
+    if not (isinstance(ts, str) and len(ts) >= 19 and ts[4] == "-" and ts[7] == "-"):
+        return None
+    try:
+        return (now - datetime.fromisoformat(ts)).total_seconds()
+    except (ValueError, TypeError):
+        # Shape matched but not parseable, or timezone-aware vs naive mismatch
+        return None
+
+
+async def _persist_execution(
+    events: EventBatcher,
+    session_id: str,
+    problem_id: str,
+    code: str,
+    result: ExecutionResult,
+    telemetry: Optional[Dict[str, Any]],
+    behavioral_flags: Dict[str, Any],
+    now: datetime
+):
+    """
+    Post-response persistence for a run: session code for chat context,
+    then the execution event for behavioral analysis.
+    """
+    await store_session_code(session_id, problem_id, code)
+    _store_execution_event(
+        events,
+        session_id=session_id,
+        problem_id=problem_id,
+        code=code,
+        result=result,
+        telemetry=telemetry,
+        behavioral_flags=behavioral_flags,
+        now=now
+    )
+
+
+def _store_execution_event(
+    events: EventBatcher,
     session_id: str,
     problem_id: str,
     code: str,
     result: ExecutionResult,
     telemetry: Optional[Dict[str, Any]],
-    behavioral_flags: Dict[str, Any]
+    behavioral_flags: Dict[str, Any],
+    now: datetime
 ):
     """
-    Store execution event in database for retrospective analysis.
+    Queue execution event for retrospective analysis.
     
     This data feeds into:
     - Run-Attempt Timeline Analysis (Section 1.2.5)
     - Data Fusion Engine for integrity verification
     
-    TODO: Implement database persistence
+    Events are written to the database in batches by EventBatcher.
     """
     event_data = {
         "session_id": session_id,
         "problem_id": problem_id,
-        "timestamp": datetime.now(),
+        "timestamp": now,
         "event_type": "run_attempt",
         "code_snapshot": code,
         "output": result.output,
@@ -232,30 +319,27 @@ async def _store_execution_event(
         "behavioral_flags": behavioral_flags
     }
     
-    # TODO: Insert into database (Sessions table, Telemetry Events table)
-    logger.info(f"Storing execution event for session {session_id}")
-    # await db.telemetry_events.insert(event_data)
-    pass
+    events.put(event_data)
 
 
 # --- TESTING/DEBUG ENDPOINTS (Remove in production) ---
 
 @router.post("/test/simple")
-async def test_simple_execution():
+async def test_simple_execution(executor: DockerExecutor = Depends(get_executor)):
     """Quick test endpoint to verify Docker execution works"""
     result = await executor.execute_code("print('Hello from Docker!')")
     return result.to_dict()
 
 
 @router.post("/test/timeout")
-async def test_timeout():
+async def test_timeout(executor: DockerExecutor = Depends(get_executor)):
     """Test timeout handling"""
     result = await executor.execute_code("import time; time.sleep(10)")
     return result.to_dict()
 
 
 @router.post("/test/memory")
-async def test_memory_limit():
+async def test_memory_limit(executor: DockerExecutor = Depends(get_executor)):
     """Test memory limit enforcement"""
     result = await executor.execute_code("data = 'x' * (200 * 1024 * 1024)")  # Try to allocate 200MB
     return result.to_dict()
\ No newline at end of file
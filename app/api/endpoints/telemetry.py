@@ -5,14 +5,18 @@ Implements the backend side of Figure 11 architecture.
 Frontend sends raw telemetry → Backend applies Data Fusion → Returns CES + States
 """
 
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Any, Dict, Optional, Union
+from typing_extensions import Annotated
 from datetime import datetime
 import logging
+import msgspec
 
+from ..schemas import IDENTIFIER_MAX_LENGTH, IDENTIFIER_PATTERN, Identifier
 from ...services.behavior_engine.metrics import SessionMetrics
-from ...services.behavior_engine.data_fusion import DataFusionEngine
+from ...services.behavior_engine.data_fusion import STATE_VALUES, DataFusionEngine
 from ...services.behavior_engine.ces_calculator import CESCalculator
 
 logger = logging.getLogger(__name__)
@@ -31,7 +35,7 @@ class TelemetryRequest(BaseModel):
     Raw telemetry data from frontend (Figure 11: Stage 1 - Telemetry Capture)
     Frontend only collects and buffers raw behavioral signals.
     """
-    problem_id: str = Field(..., description="Problem/activity identifier")
+    problem_id: Identifier = Field(..., description="Problem/activity identifier")
     
     # Raw metrics collected by frontend
     session_duration_minutes: float = Field(..., description="Total session time in minutes")
@@ -80,9 +84,119 @@ class TelemetryResponse(BaseModel):
     timestamp: datetime = Field(default_factory=datetime.now)
 
 
+# msgspec mirrors of the models above for /analyze_fast: JSON is decoded,
+# validated and encoded in C without going through Pydantic at all.
+class TelemetryRequestStruct(msgspec.Struct):
+    problem_id: Annotated[str, msgspec.Meta(
+        min_length=1, max_length=IDENTIFIER_MAX_LENGTH, pattern=IDENTIFIER_PATTERN
+    )]
+    session_duration_minutes: float
+    total_keystrokes: int
+    total_run_attempts: int
+    total_idle_minutes: float
+    focus_violation_count: int
+    net_code_change: int
+    last_edit_size_chars: int
+    last_run_interval_seconds: float
+    is_semantic_change: bool
+    current_idle_duration: float
+    is_window_focused: bool
+    last_run_was_error: bool
+    recent_burst_size_chars: int = 0
+
+
+class TelemetryResponseStruct(msgspec.Struct):
+    kpm: float
+    ad: float
+    ir: float
+    fvc: int
+    ces: float
+    ces_classification: str
+    provenance_state: str
+    iteration_state: str
+    cognitive_state: str
+    effective_kpm: float
+    effective_ad: float
+    effective_ir: float
+    integrity_penalty: float
+    timestamp: datetime
+
+
+# Lax mode converts like Pydantic's default (e.g. 3.0 or "3" for an int field)
+_TELEMETRY_DECODER = msgspec.json.Decoder(TelemetryRequestStruct, strict=False)
+_TELEMETRY_ENCODER = msgspec.json.Encoder()
+
+
+# --- ANALYSIS PIPELINE ---
+
+def _analyze(request: Union[TelemetryRequest, TelemetryRequestStruct]) -> Dict[str, Any]:
+    """
+    Run Data Fusion + CES on a validated telemetry request.
+    
+    Shared by both routes; the request and response types only differ in
+    how they are (de)serialized.
+    
+    Returns:
+        Response fields (everything except the timestamp); float fields are
+        always floats so both routes encode e.g. 0.0 rather than 0
+    """
+    # Step 1: Convert request to SessionMetrics DTO
+    metrics = SessionMetrics(
+        duration_minutes=request.session_duration_minutes,
+        total_keystrokes=request.total_keystrokes,
+        total_run_attempts=request.total_run_attempts,
+        total_idle_minutes=request.total_idle_minutes,
+        focus_violation_count=request.focus_violation_count,
+        net_code_change=request.net_code_change,
+        last_edit_size_chars=request.last_edit_size_chars,
+        last_run_interval_seconds=request.last_run_interval_seconds,
+        is_semantic_change=request.is_semantic_change,
+        current_idle_duration=request.current_idle_duration,
+        is_window_focused=request.is_window_focused,
+        last_run_was_error=request.last_run_was_error,
+        recent_burst_size_chars=request.recent_burst_size_chars
+    )
+    
+    # Step 2: Apply Data Fusion (Figure 11: Stage 2)
+    # This performs the 3 classification pipelines:
+    # - Provenance & Authenticity (Figure 5)
+    # - Iteration Quality (Figure 6)
+    # - Cognitive State (Figure 7)
+    fusion_insights = fusion_engine.analyze(metrics)
+    
+    # Step 3: Calculate CES (Figure 11: Stage 3)
+    ces_result = ces_calculator.calculate(metrics, fusion_insights)
+    
+    logger.info("CES computed: %.3f (%s)", ces_result["ces"], ces_result["classification"])
+    
+    # Step 4: Collect all computed data
+    return dict(
+        # Basic metrics
+        kpm=float(ces_result["kpm"]),
+        ad=float(ces_result["ad"]),
+        ir=float(ces_result["ir"]),
+        fvc=metrics.focus_violation_count,
+        
+        # CES Score
+        ces=float(ces_result["ces"]),
+        ces_classification=ces_result["classification"],
+        
+        # Data Fusion States
+        provenance_state=STATE_VALUES[fusion_insights.provenance_state],
+        iteration_state=STATE_VALUES[fusion_insights.iteration_state],
+        cognitive_state=STATE_VALUES[fusion_insights.cognitive_state],
+        
+        # Effective metrics (post-fusion)
+        effective_kpm=float(fusion_insights.effective_kpm),
+        effective_ad=float(fusion_insights.effective_ad),
+        effective_ir=float(fusion_insights.effective_ir),
+        integrity_penalty=float(fusion_insights.integrity_penalty)
+    )
+
+
 # --- ENDPOINTS ---
 
-@router.post("/analyze", response_model=TelemetryResponse)
+@router.post("/analyze", responses={200: {"model": TelemetryResponse}})
 async def analyze_telemetry(request: TelemetryRequest):
     """
     Analyzes raw telemetry and returns computed behavioral insights.
@@ -99,66 +213,47 @@ async def analyze_telemetry(request: TelemetryRequest):
     - Returns: Computed CES, states, and effective metrics
     """
     
-    logger.info(f"Processing telemetry for problem {request.problem_id}")
+    logger.info("Processing telemetry for problem %s", request.problem_id)
     
     try:
-        # Step 1: Convert request to SessionMetrics DTO
-        metrics = SessionMetrics(
-            duration_minutes=request.session_duration_minutes,
-            total_keystrokes=request.total_keystrokes,
-            total_run_attempts=request.total_run_attempts,
-            total_idle_minutes=request.total_idle_minutes,
-            focus_violation_count=request.focus_violation_count,
-            net_code_change=request.net_code_change,
-            last_edit_size_chars=request.last_edit_size_chars,
-            last_run_interval_seconds=request.last_run_interval_seconds,
-            is_semantic_change=request.is_semantic_change,
-            current_idle_duration=request.current_idle_duration,
-            is_window_focused=request.is_window_focused,
-            last_run_was_error=request.last_run_was_error,
-            recent_burst_size_chars=request.recent_burst_size_chars
-        )
-        
-        # Step 2: Apply Data Fusion (Figure 11: Stage 2)
-        # This performs the 3 classification pipelines:
-        # - Provenance & Authenticity (Figure 5)
-        # - Iteration Quality (Figure 6)
-        # - Cognitive State (Figure 7)
-        fusion_insights = fusion_engine.analyze(metrics)
-        
-        # Step 3: Calculate CES (Figure 11: Stage 3)
-        ces_result = ces_calculator.calculate(metrics, fusion_insights)
+        # Trusted internal DTO - every field is computed server-side from input
+        # already validated at the FastAPI boundary, so skip re-validation
+        response = TelemetryResponse.model_construct(**_analyze(request))
         
-        # Step 4: Prepare response with all computed data
-        response = TelemetryResponse(
-            # Basic metrics
-            kpm=ces_result["kpm"],
-            ad=ces_result["ad"],
-            ir=ces_result["ir"],
-            fvc=metrics.focus_violation_count,
-            
-            # CES Score
-            ces=ces_result["ces"],
-            ces_classification=ces_result["classification"],
-            
-            # Data Fusion States
-            provenance_state=fusion_insights.provenance_state.value,
-            iteration_state=fusion_insights.iteration_state.value,
-            cognitive_state=fusion_insights.cognitive_state.value,
-            
-            # Effective metrics (post-fusion)
-            effective_kpm=fusion_insights.effective_kpm,
-            effective_ad=fusion_insights.effective_ad,
-            effective_ir=fusion_insights.effective_ir,
-            integrity_penalty=fusion_insights.integrity_penalty
-        )
+        # Pre-serialized; the route documents the schema via `responses=`
+        return Response(content=response.model_dump_json(), media_type="application/json")
         
-        logger.info(f"CES computed: {ces_result['ces']:.3f} ({ces_result['classification']})")
-        
-        return response
+    except Exception as e:
+        # Traceback is logged by the server when the exception propagates
+        logger.error("Telemetry analysis failed: %s", e)
+        raise
+
+
+@router.post("/analyze_fast", responses={200: {"model": TelemetryResponse}})
+async def analyze_telemetry_fast(request: Request):
+    """
+    Same pipeline as /analyze, preferred for high-throughput clients.
+    
+    The body is decoded and validated straight into a msgspec Struct and the
+    result is encoded the same way, skipping Pydantic on both sides. Request
+    and response JSON are identical to /analyze.
+    """
+    try:
+        telemetry = _TELEMETRY_DECODER.decode(await request.body())
+    except msgspec.ValidationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except msgspec.DecodeError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid JSON: {e}")
+    
+    logger.info("Processing telemetry for problem %s", telemetry.problem_id)
+    
+    try:
+        response = TelemetryResponseStruct(**_analyze(telemetry), timestamp=datetime.now())
+        return Response(content=_TELEMETRY_ENCODER.encode(response), media_type="application/json")
         
     except Exception as e:
-        logger.error(f"Telemetry analysis failed: {e}", exc_info=True)
+        # Traceback is logged by the server when the exception propagates
+        logger.error("Telemetry analysis failed: %s", e)
         raise
 
 
@@ -0,0 +1,18 @@
+"""
+Field types shared by the API request models.
+"""
+
+from pydantic import Field, StringConstraints
+from typing_extensions import Annotated
+
+# Session/problem identifiers: short, URL- and key-safe. Checked in
+# pydantic-core (strict, no coercion) so oversized or odd IDs are rejected
+# before they reach cache keys, store keys or log lines.
+IDENTIFIER_MAX_LENGTH = 64
+IDENTIFIER_PATTERN = r"^[A-Za-z0-9_-]+$"
+
+Identifier = Annotated[
+    str,
+    StringConstraints(min_length=1, max_length=IDENTIFIER_MAX_LENGTH, pattern=IDENTIFIER_PATTERN),
+    Field(strict=True),
+]
@@ -1,17 +1,99 @@
 # app/main.py
+import asyncio
+import logging
+import logging.handlers
+import queue
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from .api.endpoints import execution, telemetry, chat, ai_generate
+from .services.ai_orchestrator import PedagogicalFirewall
+from .services.ai_orchestrator.http_client import close_http_client
+from .services.events import EventBatcher
+from .services.execution import DockerExecutor
+
+logger = logging.getLogger(__name__)
+
+
+def _start_queued_logging() -> logging.handlers.QueueListener:
+    """
+    Route root logging through a queue drained by a background thread.
+    
+    Request handlers only enqueue records; formatting and writing to the
+    real handlers (stdout by default) happens off the event loop.
+    """
+    root = logging.getLogger()
+    handlers = root.handlers[:] or [logging.StreamHandler()]
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return listener
+
+
+async def _create_services(app: FastAPI) -> None:
+    """
+    Construct the shared service singletons on app.state.
+    
+    A service that fails to initialize is stored as None so the rest of the
+    API still starts; its endpoints report 503 instead.
+    """
+    try:
+        app.state.firewall = PedagogicalFirewall()
+    except Exception as e:
+        logger.error("Failed to initialize PedagogicalFirewall: %s", e)
+        app.state.firewall = None
 
-app = FastAPI(title="rbAI Backend", version="1.0.0")
+    try:
+        # Constructor pings the Docker daemon (blocking SDK call)
+        app.state.executor = await asyncio.to_thread(DockerExecutor)
+    except Exception as e:
+        logger.error("Failed to initialize DockerExecutor: %s", e)
+        app.state.executor = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    listener = _start_queued_logging()
+    try:
+        await _create_services(app)
+        app.state.event_batcher = EventBatcher(max_queue=10_000, max_batch=100, max_delay_seconds=0.2)
+        app.state.event_batcher.start()
+        if app.state.firewall is not None:
+            # Fire-and-forget; the reference keeps the task from being collected
+            app.state.llm_warmup = asyncio.create_task(app.state.firewall.warmup())
+        try:
+            yield
+        finally:
+            await app.state.event_batcher.stop()
+            await close_http_client()
+            if app.state.executor is not None:
+                await app.state.executor.aclose()
+    finally:
+        listener.stop()
+
+
+app = FastAPI(
+    title="rbAI Backend",
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
 
 # CORS for frontend
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["http://localhost:5173"],  # Vite default port
+    allow_origins=("http://localhost:5173",),  # Vite default port
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    # Explicit lists let preflight responses use precomputed headers
+    allow_methods=("GET", "POST", "OPTIONS"),
+    allow_headers=("Content-Type", "Authorization"),
 )
 
 # Include routers
@@ -26,4 +108,20 @@ async def root():
 
 @app.get("/health")
 async def health():
-    return {"status": "healthy", "service": "rbAI"}
\ No newline at end of file
+    return {"status": "healthy", "service": "rbAI"}
+
+
+if __name__ == "__main__":
+    import os
+    import uvicorn
+
+    # C-implemented event loop and HTTP parser (both ship with uvicorn[standard]);
+    # "auto" uses uvloop where it is installed (not on Windows) and asyncio otherwise
+    uvicorn.run(
+        "app.main:app",
+        host=os.getenv("HOST", "0.0.0.0"),
+        port=int(os.getenv("PORT", "8000")),
+        workers=int(os.getenv("WEB_CONCURRENCY", "1")),
+        loop="auto",
+        http="httptools",
+    )
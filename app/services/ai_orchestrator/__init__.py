@@ -6,7 +6,7 @@ Integrates with behavioral engine for context-aware interventions.
 """
 
 from .firewall import PedagogicalFirewall
-from .llm_client import LLMClient
-from .llm_client_groq import LLMClientGroq
+from .llm_client import LLMClient, get_llm_client
+from .llm_client_groq import LLMClientGroq, get_groq_client
 
-__all__ = ["PedagogicalFirewall", "LLMClient", "LLMClientGroq"]
+__all__ = ["PedagogicalFirewall", "LLMClient", "get_llm_client", "LLMClientGroq", "get_groq_client"]
@@ -5,20 +5,112 @@ Coordinates scope validation, behavioral context integration, and Socratic tutor
 Stateless design for single-shot interactions focused on learning support.
 """
 
+import asyncio
+import functools
+import hashlib
 import logging
-from typing import Optional, AsyncGenerator, List, Dict
+import os
+import re
+from contextlib import asynccontextmanager
+from typing import Optional, AsyncGenerator, AsyncIterator, List, Dict, Union
 from dataclasses import dataclass, field
 
-from .llm_client_groq import LLMClientGroq
+from ..cache import SemanticCache
+from .llm_client import LLMClient
+from .llm_client_groq import LLMClientGroq, get_groq_client
+from .single_flight import SingleFlight
+from .tokens import encoding_name_for_model, tail_snippet
 from .policies import ScopePolicy, InterventionPolicy
 from .prompts import (
     SCOPE_VALIDATOR,
+    SOCRATIC_TUTOR_BASE,
     build_socratic_prompt,
     OUT_OF_SCOPE_RESPONSE,
 )
 
 logger = logging.getLogger(__name__)
 
+# Fingerprint of the static tutor system prompt; changes whenever the prompt
+# does, so provider prefix-cache keys never straddle two prompt versions
+_SYSTEM_PROMPT_HASH = hashlib.md5(SOCRATIC_TUTOR_BASE.system.encode()).hexdigest()[:8]
+
+
+def _prompt_cache_key(problem_id: Optional[str]) -> str:
+    """Provider prompt-cache key shared by all requests on the same problem."""
+    return f"{_SYSTEM_PROMPT_HASH}:{problem_id}"
+
+
+# --- SEMANTIC RESPONSE CACHE ---
+# Near-duplicate first-turn questions ("how do I start?") on the same problem
+# and learner state reuse an earlier Socratic reply instead of a full LLM call.
+# Strict: one substituted word ("starts positive" / "starts negative") keeps a
+# typical question below this, so only filler-word variations match
+RESPONSE_CACHE_THRESHOLD = 0.95
+RESPONSE_CACHE_TTL_SECONDS = 7 * 24 * 3600
+RESPONSE_CACHE_MAX_ENTRIES = 2048
+
+_DIGIT_RE = re.compile(r"\d")
+
+# problem_id used by chat endpoints when the client sends none; such chats
+# share no problem, so their replies are never cached
+GENERAL_CHAT_PROBLEM_ID = "simple-chat"
+
+# --- SPECULATIVE GENERATION ---
+# Borderline queries are validated while the Socratic reply is already being
+# generated; the reply is dropped if the validator rejects the query
+SCOPE_VALIDATION_TIMEOUT_SECONDS = 5.0
+SPECULATIVE_BUFFER_CHUNKS = 64
+
+# --- SCOPE VALIDATOR MODEL ---
+# The validator answers with a single label, so a small fast model suffices.
+# If accuracy regresses, set LLM_VALIDATOR_MODEL to a larger non-reasoning
+# model (e.g. llama-3.3-70b-versatile). Reasoning models such as the tutor's
+# gpt-oss also work, but think before answering, so validation is slower.
+VALIDATOR_MODEL = os.getenv("LLM_VALIDATOR_MODEL", "llama-3.1-8b-instant")
+
+# --- WARMUP ---
+# Opt-in: how long the first requests may wait for the startup warmup call
+# (connection pool + provider prefix cache) before going ahead cold
+WARMUP_WAIT_SECONDS = float(os.getenv("LLM_WARMUP_WAIT_SECONDS", "0"))
+
+
+def _response_cache_namespace(context: "ChatContext") -> Optional[str]:
+    """
+    Cache partition for a request, or None if its reply must not be shared.
+
+    Replies that depend on conversation history or the student's code are
+    never cached, and neither are queries with numbers in them: "what is
+    2**10" and "what is 2**12" embed identically but need different answers.
+    General chats (no problem) are not cached either. The problem text is
+    hashed into the partition, so a problem_id whose description changes,
+    or is reused for another problem, never serves stale replies.
+    """
+    if context.problem_id in (None, GENERAL_CHAT_PROBLEM_ID):
+        return None
+    if context.chat_history or context.current_code:
+        return None
+    if _DIGIT_RE.search(context.user_query):
+        return None
+    return "|".join((
+        _SYSTEM_PROMPT_HASH,
+        context.problem_id,
+        hashlib.md5(context.problem_description.encode()).hexdigest(),
+        context.cognitive_state or "",
+        context.iteration_state or "",
+        context.provenance_state or "",
+    ))
+
+
+def _discard_task(task: Optional[asyncio.Task]) -> None:
+    """Cancel a speculative task, or consume its outcome if it already finished."""
+    if task is None:
+        return
+    if task.done():
+        if not task.cancelled():
+            task.exception()  # Mark retrieved so asyncio doesn't log it
+    else:
+        task.cancel()
+
 
 @dataclass
 class ChatContext:
@@ -43,9 +135,10 @@ class ChatContext:
     
     # Metadata
     problem_id: Optional[str] = None
+    session_id: Optional[str] = None
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class ChatResponse:
     """Structured response from the pedagogical firewall"""
     message: str
@@ -54,6 +147,30 @@ class ChatResponse:
     intervention_triggered: bool = False
 
 
+# Immutable, so the fixed reject/fallback replies are built once and shared
+_LLM_VALIDATION_FAILED_RESPONSE = ChatResponse(
+    message=OUT_OF_SCOPE_RESPONSE,
+    is_allowed=False,
+    reasoning="LLM_VALIDATION_FAILED",
+)
+_LLM_ERROR_RESPONSE = ChatResponse(
+    message=(
+        "I'm having trouble processing your request right now. "
+        "Please try rephrasing your question or try again in a moment."
+    ),
+    is_allowed=True,
+    reasoning="LLM_ERROR",
+)
+# Final chunk of a stream that failed mid-generation
+STREAM_ERROR_CHUNK = "\n\n" + _LLM_ERROR_RESPONSE.message
+
+
+@functools.lru_cache(maxsize=None)
+def _policy_blocked_response(reason: str) -> ChatResponse:
+    """Shared reply for a request rejected by the policy filter (one per reason)."""
+    return ChatResponse(message=OUT_OF_SCOPE_RESPONSE, is_allowed=False, reasoning=reason)
+
+
 class PedagogicalFirewall:
     """
     Main orchestrator for AI-powered learning support.
@@ -71,15 +188,189 @@ class PedagogicalFirewall:
     - Safe: Filters out-of-scope and harmful requests
     """
     
-    def __init__(self, llm_client: Optional[LLMClientGroq] = None):
+    def __init__(
+        self,
+        llm_client: Optional[Union[LLMClientGroq, LLMClient]] = None,
+        validator_client: Optional[Union[LLMClientGroq, LLMClient]] = None,
+    ):
         """
-        Initialize firewall with Groq LLM client.
+        Initialize firewall with an LLM client.
+        
+        Both clients expose the same complete/stream_complete/validate_scope
+        interface, so the pipeline below runs unchanged on either.
         
         Args:
-            llm_client: Optional pre-configured LLMClientGroq (creates default if None)
+            llm_client: Optional pre-configured client (uses the shared Groq client if None)
+            validator_client: Client for scope validation (defaults to the shared
+                Groq client for VALIDATOR_MODEL, or llm_client if one was given)
         """
-        self.llm = llm_client or LLMClientGroq()
-        logger.info("PedagogicalFirewall initialized with Groq")
+        self.llm = llm_client or get_groq_client()
+        if validator_client is None:
+            validator_client = llm_client or get_groq_client(VALIDATOR_MODEL)
+        self.validator_llm = validator_client
+        
+        # Backpressure on provider calls: bursts queue here instead of
+        # tripping rate limits or exhausting the HTTP connection pool
+        self.max_concurrent_llm_calls = int(os.getenv("LLM_CONCURRENCY", "16"))
+        self._llm_sem = asyncio.Semaphore(self.max_concurrent_llm_calls)
+        self.llm_in_flight = 0
+        
+        # Set once the startup warmup call has finished (successfully or not)
+        self.warmed = asyncio.Event()
+        
+        # Identical cacheable questions arriving together share one completion
+        self._single_flight = SingleFlight()
+        
+        self.response_cache = SemanticCache(
+            threshold=RESPONSE_CACHE_THRESHOLD,
+            max_entries=RESPONSE_CACHE_MAX_ENTRIES,
+            ttl_seconds=RESPONSE_CACHE_TTL_SECONDS,
+        )
+        
+        logger.info("PedagogicalFirewall initialized with %s", type(self.llm).__name__)
+    
+    @asynccontextmanager
+    async def _llm_slot(self) -> AsyncIterator[None]:
+        """Hold one of the bounded LLM call slots for the duration of a provider call."""
+        async with self._llm_sem:
+            self.llm_in_flight += 1
+            try:
+                yield
+            finally:
+                self.llm_in_flight -= 1
+    
+    async def warmup(self) -> None:
+        """
+        Issue a 1-token completion with the tutor system prompt.
+        
+        Opens the upstream HTTP/2 connection and primes the provider's prefix
+        cache so the first student doesn't pay the cold-start latency.
+        Failures are logged and ignored.
+        """
+        try:
+            async with self._llm_slot():
+                await self.llm.complete(
+                    system_prompt=SOCRATIC_TUTOR_BASE.system,
+                    user_prompt="ok",
+                    temperature=0.0,
+                    max_retries=0,
+                    prompt_cache_key=_prompt_cache_key(None),
+                    max_tokens=1,
+                )
+            logger.info("LLM warmup completed")
+        except Exception as e:
+            logger.warning("LLM warmup failed: %s", e)
+        finally:
+            self.warmed.set()
+    
+    async def _wait_for_warmup(self) -> None:
+        """Give an in-flight warmup up to WARMUP_WAIT_SECONDS to finish."""
+        if WARMUP_WAIT_SECONDS <= 0 or self.warmed.is_set():
+            return
+        try:
+            await asyncio.wait_for(self.warmed.wait(), timeout=WARMUP_WAIT_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+    
+    # --- PIPELINE STEPS (shared by process_request and stream_response) ---
+    
+    @staticmethod
+    def _policy_filter(context: ChatContext) -> tuple[bool, str]:
+        """STEP 1: rule-based scope filter; returns (is_allowed, reason)."""
+        is_allowed, filter_reason = ScopePolicy.quick_filter(context.user_query)
+        if not is_allowed:
+            logger.warning("Request blocked by policy: %s", filter_reason)
+        return is_allowed, filter_reason
+    
+    @staticmethod
+    def _intervention_mode(context: ChatContext) -> bool:
+        """STEP 3: whether the learner's behavioral state calls for an intervention."""
+        if not (context.cognitive_state and context.iteration_state):
+            return False
+        
+        intervention_mode = InterventionPolicy.should_intervene(
+            context.cognitive_state,
+            context.iteration_state,
+        )
+        if intervention_mode:
+            logger.info(
+                "Intervention triggered - Cognitive: %s, Iteration: %s",
+                context.cognitive_state, context.iteration_state,
+            )
+        return intervention_mode
+    
+    @staticmethod
+    def _build_prompts(context: ChatContext) -> tuple[str, str, str]:
+        """STEP 4 input: (system, context, user) prompts for the Socratic tutor."""
+        return build_socratic_prompt(
+            user_query=context.user_query,
+            problem_description=context.problem_description,
+            current_code=context.current_code,
+            cognitive_state=context.cognitive_state,
+            iteration_state=context.iteration_state,
+            provenance_state=context.provenance_state,
+        )
+    
+    async def _check_scope(self, user_query: str) -> bool:
+        """
+        Run the LLM scope validator; fails open on error or timeout.
+        
+        Returns:
+            True if the query may be answered
+        """
+        try:
+            async with self._llm_slot():
+                is_in_scope = await asyncio.wait_for(
+                    self.validator_llm.validate_scope(
+                        user_query,
+                        (SCOPE_VALIDATOR.system, SCOPE_VALIDATOR.user)
+                    ),
+                    timeout=SCOPE_VALIDATION_TIMEOUT_SECONDS,
+                )
+        except Exception as e:
+            logger.error("Scope validation error: %r", e)
+            # Fail open - allow request if validation fails
+            return True
+        
+        if not is_in_scope:
+            logger.info("Request rejected by LLM scope validator")
+        return is_in_scope
+    
+    def _start_scope_check(self, context: ChatContext, filter_reason: str) -> Optional[asyncio.Task]:
+        """Start LLM scope validation in the background if the policy filter asked for it."""
+        if filter_reason != "NEEDS_LLM_VALIDATION":
+            return None
+        return asyncio.create_task(self._check_scope(context.user_query))
+    
+    async def _generate(self, context: ChatContext, prompts: tuple[str, str, str]) -> str:
+        """Single Socratic completion, holding an LLM slot for the provider call."""
+        system_prompt, context_prompt, user_prompt = prompts
+        await self._wait_for_warmup()
+        async with self._llm_slot():
+            return await self.llm.complete(
+                system_prompt=system_prompt,
+                user_prompt=user_prompt,
+                chat_history=context.chat_history,
+                temperature=0.7,  # Balanced creativity for Socratic questions
+                context_prompt=context_prompt,
+                prompt_cache_key=_prompt_cache_key(context.problem_id),
+            )
+    
+    async def _stream(self, context: ChatContext, prompts: tuple[str, str, str]) -> AsyncGenerator[str, None]:
+        """Streaming Socratic completion with chat history."""
+        system_prompt, context_prompt, user_prompt = prompts
+        await self._wait_for_warmup()
+        # The slot is held for the whole stream: the upstream connection is busy until it ends
+        async with self._llm_slot():
+            async for chunk in self.llm.stream_complete(
+                system_prompt=system_prompt,
+                user_prompt=user_prompt,
+                chat_history=context.chat_history,
+                temperature=0.7,
+                context_prompt=context_prompt,
+                prompt_cache_key=_prompt_cache_key(context.problem_id),
+            ):
+                yield chunk
     
     async def process_request(self, context: ChatContext) -> ChatResponse:
         """
@@ -97,75 +388,60 @@ class PedagogicalFirewall:
         Returns:
             ChatResponse with message and metadata
         """
-        logger.info(
-            f"Processing request - Problem: {context.problem_id}"
-        )
+        logger.info("Processing request - Problem: %s", context.problem_id)
         
         # STEP 1: Quick policy-based filter
-        is_allowed, filter_reason = ScopePolicy.quick_filter(context.user_query)
+        is_allowed, filter_reason = self._policy_filter(context)
         
         if not is_allowed:
-            logger.warning(f"Request blocked by policy: {filter_reason}")
-            return ChatResponse(
-                message=OUT_OF_SCOPE_RESPONSE,
-                is_allowed=False,
-                reasoning=filter_reason,
-            )
-        
-        # STEP 2: LLM scope validation (for borderline or unclear cases)
-        if filter_reason == "NEEDS_LLM_VALIDATION":
-            try:
-                is_in_scope = await self.llm.validate_scope(
-                    context.user_query,
-                    (SCOPE_VALIDATOR.system, SCOPE_VALIDATOR.user)
-                )
-                
-                if not is_in_scope:
-                    logger.info("Request rejected by LLM scope validator")
-                    return ChatResponse(
-                        message=OUT_OF_SCOPE_RESPONSE,
-                        is_allowed=False,
-                        reasoning="LLM_VALIDATION_FAILED",
-                    )
-                    
-            except Exception as e:
-                logger.error(f"Scope validation error: {e}")
-                # Fail open - allow request if validation fails
-                pass
+            return _policy_blocked_response(filter_reason)
         
-        # STEP 3: Check if behavioral intervention is needed
-        intervention_mode = False
-        if context.cognitive_state and context.iteration_state:
-            intervention_mode = InterventionPolicy.should_intervene(
-                context.cognitive_state,
-                context.iteration_state,
-            )
-            
-            if intervention_mode:
-                logger.info(
-                    f"Intervention triggered - Cognitive: {context.cognitive_state}, "
-                    f"Iteration: {context.iteration_state}"
-                )
+        # STEP 2: LLM scope validation (for borderline or unclear cases).
+        # Runs concurrently with generation; its verdict gates the reply.
+        scope_check = self._start_scope_check(context, filter_reason)
+        generation: Optional[asyncio.Task] = None
         
-        # STEP 4: Generate Socratic response with behavioral context and history
         try:
-            system_prompt, user_prompt = build_socratic_prompt(
-                user_query=context.user_query,
-                problem_description=context.problem_description,
-                current_code=context.current_code,
-                cognitive_state=context.cognitive_state,
-                iteration_state=context.iteration_state,
-                provenance_state=context.provenance_state,
-            )
+            # STEP 3: Check if behavioral intervention is needed
+            intervention_mode = self._intervention_mode(context)
             
-            response_text = await self.llm.complete(
-                system_prompt=system_prompt,
-                user_prompt=user_prompt,
-                chat_history=context.chat_history,
-                temperature=0.7,  # Balanced creativity for Socratic questions
-            )
+            # STEP 4: Generate Socratic response with behavioral context and history
+            cache_namespace = _response_cache_namespace(context)
+            response_text = None
+            if cache_namespace is not None:
+                response_text = self.response_cache.get(context.user_query, namespace=cache_namespace)
             
-            logger.info("Socratic response generated successfully")
+            if response_text is None:
+                try:
+                    prompts = self._build_prompts(context)
+                    # Speculative: starts before the scope verdict is in
+                    if cache_namespace is not None:
+                        # Same partition the reply would be cached under, so sharing is safe
+                        generation = asyncio.create_task(self._single_flight.do(
+                            (cache_namespace, context.user_query),
+                            lambda: self._generate(context, prompts),
+                        ))
+                    else:
+                        generation = asyncio.create_task(self._generate(context, prompts))
+                    
+                    if scope_check is not None and not await scope_check:
+                        return _LLM_VALIDATION_FAILED_RESPONSE
+                    
+                    response_text = await generation
+                    logger.info("Socratic response generated successfully")
+                    
+                except Exception as e:
+                    logger.error("Failed to generate Socratic response: %s", e)
+                    
+                    # Fallback response
+                    return _LLM_ERROR_RESPONSE
+                
+                if cache_namespace is not None:
+                    self.response_cache.set(context.user_query, response_text, namespace=cache_namespace)
+            else:
+                if scope_check is not None and not await scope_check:
+                    return _LLM_VALIDATION_FAILED_RESPONSE
+                logger.info("Socratic response served from semantic cache")
             
             return ChatResponse(
                 message=response_text,
@@ -173,19 +449,9 @@ class PedagogicalFirewall:
                 reasoning=filter_reason,
                 intervention_triggered=intervention_mode,
             )
-            
-        except Exception as e:
-            logger.error(f"Failed to generate Socratic response: {e}")
-            
-            # Fallback response
-            return ChatResponse(
-                message=(
-                    "I'm having trouble processing your request right now. "
-                    "Please try rephrasing your question or try again in a moment."
-                ),
-                is_allowed=True,
-                reasoning="LLM_ERROR",
-            )
+        finally:
+            _discard_task(scope_check)
+            _discard_task(generation)
     
     async def generate_hint(
         self,
@@ -210,7 +476,8 @@ class PedagogicalFirewall:
         hint_query = "I'm stuck and need a hint to get started."
         
         if current_code:
-            hint_query = f"I'm stuck. Here's my current code:\n```\n{current_code[:200]}...\n```\nWhat should I focus on?"
+            snippet = tail_snippet(encoding_name_for_model(self.llm.model), current_code)
+            hint_query = f"I'm stuck. Here's my current code:\n```\n{snippet}\n```\nWhat should I focus on?"
         
         context = ChatContext(
             user_query=hint_query,
@@ -234,73 +501,78 @@ class PedagogicalFirewall:
         Yields:
             String chunks as they're generated from the LLM
         """
-        logger.info(f"Streaming request - Problem: {context.problem_id}")
+        logger.info("Streaming request - Problem: %s", context.problem_id)
         
         # STEP 1: Quick policy-based filter
-        is_allowed, filter_reason = ScopePolicy.quick_filter(context.user_query)
+        is_allowed, filter_reason = self._policy_filter(context)
         
         if not is_allowed:
-            logger.warning(f"Request blocked by policy: {filter_reason}")
             yield OUT_OF_SCOPE_RESPONSE
             return
         
-        # STEP 2: LLM scope validation (for borderline cases)
-        if filter_reason == "NEEDS_LLM_VALIDATION":
+        # STEP 2: LLM scope validation (for borderline cases).
+        # Runs concurrently with the stream; output is held back until it passes.
+        scope_check = self._start_scope_check(context, filter_reason)
+        next_chunk: Optional[asyncio.Task] = None
+        stream: Optional[AsyncGenerator[str, None]] = None
+        
+        try:
+            # STEP 3: Log a behavioral intervention; streams carry no flag for it
+            self._intervention_mode(context)
+            
+            # STEP 4: Stream Socratic response with behavioral context
             try:
-                is_in_scope = await self.llm.validate_scope(
-                    context.user_query,
-                    (SCOPE_VALIDATOR.system, SCOPE_VALIDATOR.user)
-                )
+                prompts = self._build_prompts(context)
+                stream = self._stream(context, prompts)
                 
-                if not is_in_scope:
-                    logger.info("Request rejected by LLM scope validator")
-                    yield OUT_OF_SCOPE_RESPONSE
-                    return
+                if scope_check is not None:
+                    # Buffer speculative chunks until the verdict arrives
+                    buffered: List[str] = []
+                    stream_done = False
+                    next_chunk = asyncio.create_task(anext(stream))
+                    while not scope_check.done() and len(buffered) < SPECULATIVE_BUFFER_CHUNKS:
+                        await asyncio.wait({next_chunk, scope_check}, return_when=asyncio.FIRST_COMPLETED)
+                        if not next_chunk.done():
+                            break
+                        try:
+                            buffered.append(next_chunk.result())
+                        except StopAsyncIteration:
+                            stream_done = True
+                            next_chunk = None
+                            break
+                        next_chunk = asyncio.create_task(anext(stream))
                     
+                    if not await scope_check:
+                        yield OUT_OF_SCOPE_RESPONSE
+                        return
+                    
+                    for chunk in buffered:
+                        yield chunk
+                    if next_chunk is not None:
+                        try:
+                            chunk = await next_chunk
+                        except StopAsyncIteration:
+                            stream_done = True
+                        else:
+                            yield chunk
+                        next_chunk = None
+                    if stream_done:
+                        logger.info("Streaming response completed successfully")
+                        return
+                
+                async for chunk in stream:
+                    yield chunk
+                
+                logger.info("Streaming response completed successfully")
+                
             except Exception as e:
-                logger.error(f"Scope validation error: {e}")
-                # Fail open - allow request if validation fails
-                pass
-        
-        # STEP 3: Check if behavioral intervention is needed
-        intervention_mode = False
-        if context.cognitive_state and context.iteration_state:
-            intervention_mode = InterventionPolicy.should_intervene(
-                context.cognitive_state,
-                context.iteration_state,
-            )
-            
-            if intervention_mode:
-                logger.info(
-                    f"Intervention triggered - Cognitive: {context.cognitive_state}, "
-                    f"Iteration: {context.iteration_state}"
-                )
-        
-        # STEP 4: Stream Socratic response with behavioral context
-        try:
-            system_prompt, user_prompt = build_socratic_prompt(
-                user_query=context.user_query,
-                problem_description=context.problem_description,
-                current_code=context.current_code,
-                cognitive_state=context.cognitive_state,
-                iteration_state=context.iteration_state,
-                provenance_state=context.provenance_state,
-            )
-            
-            # Stream chunks from LLM with chat history
-            async for chunk in self.llm.stream_complete(
-                system_prompt=system_prompt,
-                user_prompt=user_prompt,
-                chat_history=context.chat_history,
-                temperature=0.7,
-            ):
-                yield chunk
-            
-            logger.info("Streaming response completed successfully")
-            
-        except Exception as e:
-            logger.error(f"Failed to stream Socratic response: {e}")
-            yield (
-                "\n\nI'm having trouble processing your request right now. "
-                "Please try rephrasing your question or try again in a moment."
-            )
+                logger.error("Failed to stream Socratic response: %s", e)
+                yield STREAM_ERROR_CHUNK
+        finally:
+            _discard_task(scope_check)
+            if next_chunk is not None:
+                _discard_task(next_chunk)
+                # Let the cancellation unwind the generator before closing it
+                await asyncio.gather(next_chunk, return_exceptions=True)
+            if stream is not None:
+                await stream.aclose()
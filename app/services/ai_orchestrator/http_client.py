@@ -0,0 +1,50 @@
+"""
+Shared HTTP transport for the LLM clients.
+
+All SDK clients in the process reuse one HTTP/2-enabled httpx client, so
+concurrent completions and streams are multiplexed over a small pool of
+upstream connections instead of opening a socket per request.
+"""
+
+import functools
+import os
+
+import httpx
+from openai import DefaultAsyncHttpxClient
+
+
+@functools.cache
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Return the process-wide async HTTP client used by the OpenAI SDK.
+
+    Pool size can be tuned with LLM_MAX_CONNECTIONS and
+    LLM_MAX_KEEPALIVE_CONNECTIONS.
+    """
+    return DefaultAsyncHttpxClient(
+        http2=True,
+        # Per-call timeouts override the read budget; connects fail fast
+        timeout=httpx.Timeout(10.0, connect=5.0),
+        limits=httpx.Limits(
+            max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", "200")),
+            max_keepalive_connections=int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "100")),
+        ),
+    )
+
+
+async def close_http_client() -> None:
+    """
+    Close the shared client's pooled connections (app shutdown).
+
+    The memoized LLM clients hold the closed transport, so their factories
+    are cleared too; the next lifespan in this process builds fresh ones.
+    """
+    # Imported here: both client modules import this one
+    from .llm_client import get_llm_client
+    from .llm_client_groq import get_groq_client
+
+    if get_http_client.cache_info().currsize:
+        await get_http_client().aclose()
+        get_http_client.cache_clear()
+    get_groq_client.cache_clear()
+    get_llm_client.cache_clear()
@@ -5,13 +5,40 @@ Lightweight implementation without LangChain overhead.
 
 import os
 import logging
-from typing import Optional
+import functools
+import time
+from typing import Optional, AsyncGenerator, List, Dict
 from openai import AsyncOpenAI
 from openai import APIError, RateLimitError, APITimeoutError
+from openai import APIConnectionError, InternalServerError
+
+from .http_client import get_http_client
+from .retry import (
+    MAX_RETRIES,
+    RATE_LIMIT_BASE_SECONDS,
+    SERVER_ERROR_BASE_SECONDS,
+    TIMEOUT_BASE_SECONDS,
+    Backoff,
+)
+from .scope_cache import new_scope_cache, scope_cache_key
+from .scope_classifier import classify_scope, verdict_max_tokens
+from .single_flight import SingleFlight
+from .tokens import build_messages, encoding_name_for_model, prefix_cacheable
 
 logger = logging.getLogger(__name__)
 
 
+def _cached_tokens(usage) -> int:
+    """Prompt tokens served from the provider's prefix cache (0 if not reported)."""
+    details = getattr(usage, "prompt_tokens_details", None)
+    return getattr(details, "cached_tokens", None) or 0
+
+
+def _log_ttft(started: float) -> None:
+    """Record time-to-first-token for a request started at `started` (perf_counter)."""
+    logger.info("llm.ttft_ms=%.0f", (time.perf_counter() - started) * 1000)
+
+
 class LLMClient:
     """
     Async wrapper for OpenAI API with token budget management.
@@ -42,26 +69,50 @@ class LLMClient:
                 "or pass api_key parameter."
             )
         
-        self.client = AsyncOpenAI(api_key=self.api_key)
+        # Retries are handled by complete() with jittered backoff, not the SDK
+        self.client = AsyncOpenAI(
+            api_key=self.api_key,
+            http_client=get_http_client(),
+            max_retries=0,
+        )
         self.model = model
+        # Name only; the encoding itself loads lazily on the first count
+        self._encoding = encoding_name_for_model(model)
+        
+        self._scope_cache = new_scope_cache()
+        # Identical concurrent validations share one call
+        self._scope_flights = SingleFlight()
+        self._verdict_max_tokens = verdict_max_tokens(model)
         
-        logger.info(f"LLMClient initialized with model: {model}")
+        logger.info("LLMClient initialized with model: %s", model)
     
     async def complete(
         self,
         system_prompt: str,
         user_prompt: str,
+        chat_history: Optional[List[Dict[str, str]]] = None,
         temperature: float = 0.7,
-        max_retries: int = 2,
+        max_retries: int = MAX_RETRIES,
+        context_prompt: Optional[str] = None,
+        prompt_cache_key: Optional[str] = None,
+        max_tokens: Optional[int] = None,
     ) -> str:
         """
         Generate completion with token management and retry logic.
         
+        The response is streamed internally and assembled from deltas, so
+        time-to-first-token is observable even for non-streaming callers.
+        
         Args:
-            system_prompt: System instructions
+            system_prompt: System instructions (keep static for provider prompt caching)
             user_prompt: User query
+            chat_history: Previous conversation messages for context
             temperature: Sampling temperature (0.7 for balanced creativity)
             max_retries: Number of retry attempts on failure
+            context_prompt: Per-request system context, sent after the static prefix
+            prompt_cache_key: Stable key routing requests with a shared prefix
+                to the same provider cache
+            max_tokens: Output token cap (defaults to MAX_OUTPUT_TOKENS)
             
         Returns:
             Generated response text
@@ -69,90 +120,226 @@ class LLMClient:
         Raises:
             RuntimeError: If all retries fail
         """
-        # Validate token budget (rough estimation: ~4 chars per token)
-        estimated_input_tokens = (len(system_prompt) + len(user_prompt)) // 4
-        if estimated_input_tokens > self.MAX_INPUT_TOKENS:
-            logger.warning(
-                f"Input may exceed token budget: ~{estimated_input_tokens} tokens "
-                f"(limit: {self.MAX_INPUT_TOKENS})"
-            )
-        
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt},
-        ]
+        messages = self._build_messages(system_prompt, user_prompt, chat_history, context_prompt)
+        # Built once; every retry sends the same request
+        extra_body = self._cache_key_body(prompt_cache_key, system_prompt)
         
+        backoff = Backoff()
         for attempt in range(max_retries + 1):
             try:
-                logger.debug(f"Requesting completion (attempt {attempt + 1}/{max_retries + 1})")
+                logger.debug("Requesting completion (attempt %s/%s)", attempt + 1, max_retries + 1)
                 
-                response = await self.client.chat.completions.create(
+                started = time.perf_counter()
+                stream = await self.client.chat.completions.create(
                     model=self.model,
                     messages=messages,
                     temperature=temperature,
-                    max_tokens=self.MAX_OUTPUT_TOKENS,
+                    max_tokens=max_tokens or self.MAX_OUTPUT_TOKENS,
+                    stream=True,
+                    stream_options={"include_usage": True},
                     timeout=10.0,  # 10 second timeout
+                    extra_body=extra_body,
                 )
                 
-                # Extract response
-                content = response.choices[0].message.content
+                # Assemble the response from deltas
+                parts: List[str] = []
+                usage = None
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        if not parts:
+                            _log_ttft(started)
+                        parts.append(chunk.choices[0].delta.content)
+                    if chunk.usage:
+                        usage = chunk.usage  # Final chunk, no choices
+                content = "".join(parts)
                 
                 # Log token usage for monitoring
-                usage = response.usage
-                logger.info(
-                    f"Completion successful - Tokens: {usage.prompt_tokens} in, "
-                    f"{usage.completion_tokens} out, {usage.total_tokens} total"
-                )
+                if usage:
+                    logger.info(
+                        "Completion successful - Tokens: %s in (%s cached), %s out, %s total",
+                        usage.prompt_tokens, _cached_tokens(usage),
+                        usage.completion_tokens, usage.total_tokens,
+                    )
                 
                 return content
                 
             except RateLimitError as e:
-                logger.warning(f"Rate limit hit (attempt {attempt + 1}): {e}")
+                logger.warning("Rate limit hit (attempt %s): %s", attempt + 1, e)
                 if attempt == max_retries:
                     raise RuntimeError("OpenAI rate limit exceeded. Try again later.")
-                # Exponential backoff would go here in production
+                await backoff.wait(e, attempt, RATE_LIMIT_BASE_SECONDS)
                 
             except APITimeoutError as e:
-                logger.warning(f"Timeout (attempt {attempt + 1}): {e}")
+                logger.warning("Timeout (attempt %s): %s", attempt + 1, e)
                 if attempt == max_retries:
                     raise RuntimeError("OpenAI request timed out. Try again later.")
+                await backoff.wait(e, attempt, TIMEOUT_BASE_SECONDS)
+                
+            except (APIConnectionError, InternalServerError) as e:
+                logger.warning("Server error (attempt %s): %s", attempt + 1, e)
+                if attempt == max_retries:
+                    raise RuntimeError("OpenAI service unavailable. Try again later.")
+                await backoff.wait(e, attempt, SERVER_ERROR_BASE_SECONDS)
                     
             except APIError as e:
-                logger.error(f"OpenAI API error: {e}")
+                logger.error("OpenAI API error: %s", e)
                 raise RuntimeError(f"AI service error: {str(e)}")
                 
             except Exception as e:
-                logger.error(f"Unexpected error in LLM completion: {e}")
+                logger.error("Unexpected error in LLM completion: %s", e)
                 raise RuntimeError(f"Failed to generate response: {str(e)}")
         
         raise RuntimeError("Failed to get completion after all retries")
     
-    async def validate_scope(self, user_query: str, validator_prompt: tuple[str, str]) -> bool:
+    def _build_messages(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        chat_history: Optional[List[Dict[str, str]]],
+        context_prompt: Optional[str],
+    ) -> List[Dict[str, str]]:
+        """Chat messages for a request, trimmed to MAX_INPUT_TOKENS (see build_messages)."""
+        return build_messages(
+            self._encoding,
+            system_prompt,
+            user_prompt,
+            chat_history,
+            context_prompt,
+            self.MAX_INPUT_TOKENS,
+        )
+    
+    def _cache_key_body(
+        self,
+        prompt_cache_key: Optional[str],
+        system_prompt: str,
+    ) -> Optional[Dict[str, str]]:
+        """
+        Extra request body carrying the prompt cache key. Skipped when the
+        static prefix is below the provider's cacheable minimum, where the key
+        would only constrain routing without ever producing a cache hit.
+        """
+        if prompt_cache_key and prefix_cacheable(self._encoding, system_prompt):
+            return {"prompt_cache_key": prompt_cache_key}
+        return None
+    
+    async def stream_complete(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        chat_history: Optional[List[Dict[str, str]]] = None,
+        temperature: float = 0.7,
+        context_prompt: Optional[str] = None,
+        prompt_cache_key: Optional[str] = None,
+    ) -> AsyncGenerator[str, None]:
+        """
+        Generate streaming completion; same interface as LLMClientGroq.stream_complete.
+        
+        Args:
+            system_prompt: System instructions
+            user_prompt: User query
+            chat_history: Previous conversation messages for context
+            temperature: Sampling temperature (0.7 for balanced creativity)
+            context_prompt: Per-request system context, sent after the static prefix
+            prompt_cache_key: Stable key routing requests with a shared prefix
+                to the same provider cache
+            
+        Yields:
+            String chunks as they're generated
+            
+        Raises:
+            RuntimeError: If streaming fails
+        """
+        messages = self._build_messages(system_prompt, user_prompt, chat_history, context_prompt)
+        
+        try:
+            logger.debug("Requesting streaming completion")
+            
+            started = time.perf_counter()
+            stream = await self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=self.MAX_OUTPUT_TOKENS,
+                stream=True,
+                timeout=30.0,  # Longer timeout for streaming
+                extra_body=self._cache_key_body(prompt_cache_key, system_prompt),
+            )
+            
+            first = True
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    if first:
+                        _log_ttft(started)
+                        first = False
+                    yield chunk.choices[0].delta.content
+            
+            logger.info("Streaming completion successful")
+            
+        except RateLimitError as e:
+            logger.warning("Rate limit hit during streaming: %s", e)
+            raise RuntimeError("Rate limit exceeded. Please try again later.")
+            
+        except APITimeoutError as e:
+            logger.warning("Timeout during streaming: %s", e)
+            raise RuntimeError("Request timed out. Please try again.")
+            
+        except APIError as e:
+            logger.error("OpenAI API error during streaming: %s", e)
+            raise RuntimeError(f"AI service error: {str(e)}")
+            
+        except Exception as e:
+            logger.error("Unexpected error in streaming: %s", e)
+            raise RuntimeError(f"Failed to stream response: {str(e)}")
+    
+    async def validate_scope(
+        self,
+        user_query: str,
+        validator_prompt: tuple[str, str],
+        fresh: bool = False,
+    ) -> bool:
         """
         Quick scope validation (optimized for low token usage).
         
+        Verdicts are memoized per normalized query, so a recurring borderline
+        question costs one validator call instead of one per request; cache
+        misses for the same query share one in-flight call.
+        
         Args:
             user_query: User's question/request
             validator_prompt: (system, user) prompt tuple
+            fresh: Bypass the verdict cache and always ask the model
             
         Returns:
             True if in scope, False otherwise
         """
-        system_prompt, user_template = validator_prompt
+        cache_key = scope_cache_key(user_query, validator_prompt)
+        
+        if not fresh:
+            cached = self._scope_cache.get(cache_key)
+            if cached is not None:
+                return cached
         
         try:
-            response = await self.complete(
-                system_prompt=system_prompt,
-                user_prompt=user_template.format(user_query=user_query),
-                temperature=0.0,  # Deterministic for validation
-            )
-            
-            result = response.strip().upper()
-            logger.debug(f"Scope validation result: {result}")
-            
-            return "IN_SCOPE" in result
+            # Joins an identical validation already in flight (never a shared prompt)
+            in_scope = await self._scope_flights.do(cache_key, lambda: classify_scope(
+                self.complete, user_query, validator_prompt, self._verdict_max_tokens
+            ))
+            # Only real verdicts are cached; fail-open results below are not
+            self._scope_cache[cache_key] = in_scope
+            return in_scope
             
         except Exception as e:
-            logger.error(f"Scope validation failed: {e}")
+            logger.error("Scope validation failed: %s", e)
             # Fail open: allow request through if validation fails
             return True
+
+
+@functools.cache
+def get_llm_client(model: str = "gpt-4o-mini") -> LLMClient:
+    """
+    Return a shared LLMClient for the given model.
+    
+    Memoized per model name, like get_groq_client, so callers never build a
+    second AsyncOpenAI instance or pay for fresh TLS handshakes.
+    """
+    return LLMClient(model=model)
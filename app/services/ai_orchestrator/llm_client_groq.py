@@ -4,15 +4,42 @@ Uses Groq's OpenAI-compatible API for fast inference with LPU architecture.
 """
 
 import os
+import asyncio
 import logging
-from dotenv import load_dotenv
-from typing import Optional, AsyncGenerator, List, Dict
+import functools
+import time
+from typing import Any, Optional, AsyncGenerator, List, Dict, Union
 from openai import AsyncOpenAI
 from openai import APIError, RateLimitError, APITimeoutError
+from openai import APIConnectionError, InternalServerError
+
+from .http_client import get_http_client
+from .rate_limit import get_rate_limiter
+from .retry import (
+    MAX_RETRIES,
+    RATE_LIMIT_BASE_SECONDS,
+    SERVER_ERROR_BASE_SECONDS,
+    TIMEOUT_BASE_SECONDS,
+    Backoff,
+)
+from .scope_cache import new_scope_cache, scope_cache_key
+from .scope_classifier import classify_scope, verdict_max_tokens
+from .single_flight import SingleFlight
+from .tokens import build_messages, encoding_name_for_model, prefix_cacheable
 
 logger = logging.getLogger(__name__)
 
-load_dotenv()
+
+def _cached_tokens(usage) -> int:
+    """Prompt tokens served from the provider's prefix cache (0 if not reported)."""
+    details = getattr(usage, "prompt_tokens_details", None)
+    return getattr(details, "cached_tokens", None) or 0
+
+
+def _log_ttft(started: float) -> None:
+    """Record time-to-first-token for a request started at `started` (perf_counter)."""
+    logger.info("llm.ttft_ms=%.0f", (time.perf_counter() - started) * 1000)
+
 
 class LLMClientGroq:
     """
@@ -35,6 +62,10 @@ class LLMClientGroq:
     MAX_INPUT_TOKENS = 1000   # Limit context size
     MAX_OUTPUT_TOKENS = 500   # Sufficient for detailed explanations with code examples
     
+    # Groq caches shared prompt prefixes automatically and does not accept an
+    # explicit routing key, so prompt_cache_key is not forwarded
+    SUPPORTS_PROMPT_CACHE_KEY = False
+    
     def __init__(self, api_key: Optional[str] = None, model: str = "openai/gpt-oss-120b"):
         """
         Initialize Groq client using OpenAI compatibility.
@@ -53,11 +84,60 @@ class LLMClientGroq:
         # Use OpenAI client with Groq's base URL
         self.client = AsyncOpenAI(
             base_url="https://api.groq.com/openai/v1",
-            api_key=self.api_key
+            api_key=self.api_key,
+            http_client=get_http_client(),
+            max_retries=0,  # Retries use our jittered backoff instead of the SDK's
         )
         self.model = model
+        # Name only; the encoding itself loads lazily on the first count
+        self._encoding = encoding_name_for_model(model)
+        
+        self._scope_cache = new_scope_cache()
+        # Identical concurrent validations share one call
+        self._scope_flights = SingleFlight()
+        self._verdict_max_tokens = verdict_max_tokens(model)
+        
+        # Paces outbound calls under the model's RPM quota (shared per model)
+        self._rate_limiter = get_rate_limiter(model)
         
-        logger.info(f"LLMClientGroq initialized with model: {model}")
+        # Caps how many complete_batch() requests are in flight at once
+        self._batch_sem = asyncio.Semaphore(int(os.getenv("GROQ_CONCURRENCY", "16")))
+        
+        logger.info("LLMClientGroq initialized with model: %s", model)
+    
+    def _build_messages(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        chat_history: Optional[List[Dict[str, str]]] = None,
+        context_prompt: Optional[str] = None,
+    ) -> List[Dict[str, str]]:
+        """Chat messages for a request, trimmed to MAX_INPUT_TOKENS (see build_messages)."""
+        return build_messages(
+            self._encoding,
+            system_prompt,
+            user_prompt,
+            chat_history,
+            context_prompt,
+            self.MAX_INPUT_TOKENS,
+        )
+    
+    def _cache_key_body(
+        self,
+        prompt_cache_key: Optional[str],
+        system_prompt: str,
+    ) -> Optional[Dict[str, str]]:
+        """
+        Extra request body carrying the prompt cache key, if the provider takes
+        one and the static prefix is long enough to be cached at all.
+        """
+        if (
+            prompt_cache_key
+            and self.SUPPORTS_PROMPT_CACHE_KEY
+            and prefix_cacheable(self._encoding, system_prompt)
+        ):
+            return {"prompt_cache_key": prompt_cache_key}
+        return None
     
     async def complete(
         self,
@@ -65,17 +145,23 @@ class LLMClientGroq:
         user_prompt: str,
         chat_history: Optional[List[Dict[str, str]]] = None,
         temperature: float = 0.7,
-        max_retries: int = 2,
+        max_retries: int = MAX_RETRIES,
+        context_prompt: Optional[str] = None,
+        prompt_cache_key: Optional[str] = None,
+        max_tokens: Optional[int] = None,
     ) -> str:
         """
         Generate completion with token management, chat history, and retry logic.
         
         Args:
-            system_prompt: System instructions
+            system_prompt: System instructions (keep static for provider prompt caching)
             user_prompt: User query
             chat_history: Previous conversation messages for context
             temperature: Sampling temperature (0.7 for balanced creativity)
             max_retries: Number of retry attempts on failure
+            context_prompt: Optional per-request system context, sent after system_prompt
+            prompt_cache_key: Stable key for provider prefix caching (if supported)
+            max_tokens: Output token cap (defaults to MAX_OUTPUT_TOKENS)
             
         Returns:
             Generated response text
@@ -83,34 +169,26 @@ class LLMClientGroq:
         Raises:
             RuntimeError: If all retries fail
         """
-        # Validate token budget (rough estimation: ~4 chars per token)
-        estimated_input_tokens = (len(system_prompt) + len(user_prompt)) // 4
-        if estimated_input_tokens > self.MAX_INPUT_TOKENS:
-            logger.warning(
-                f"Input may exceed token budget: ~{estimated_input_tokens} tokens "
-                f"(limit: {self.MAX_INPUT_TOKENS})"
-            )
-        
-        # Build messages with chat history
-        messages = [{"role": "system", "content": system_prompt}]
-        
-        # Add chat history if provided (for context)
-        if chat_history:
-            messages.extend(chat_history)
-        
-        # Add current user query
-        messages.append({"role": "user", "content": user_prompt})
+        messages = self._build_messages(system_prompt, user_prompt, chat_history, context_prompt)
+        # Built once; every retry sends the same request
+        extra_body = self._cache_key_body(prompt_cache_key, system_prompt)
         
+        backoff = Backoff()
         for attempt in range(max_retries + 1):
             try:
-                logger.debug(f"Requesting Groq completion (attempt {attempt + 1}/{max_retries + 1})")
+                logger.debug(
+                    "Requesting Groq completion (attempt %s/%s)",
+                    attempt + 1, max_retries + 1,
+                )
                 
+                await self._rate_limiter.acquire()
                 response = await self.client.chat.completions.create(
                     model=self.model,
                     messages=messages,
                     temperature=temperature,
-                    max_tokens=self.MAX_OUTPUT_TOKENS,
+                    max_tokens=max_tokens or self.MAX_OUTPUT_TOKENS,
                     timeout=10.0,  # 10 second timeout
+                    extra_body=extra_body,
                 )
                 
                 # Extract response
@@ -119,60 +197,106 @@ class LLMClientGroq:
                 # Log token usage for monitoring
                 usage = response.usage
                 logger.info(
-                    f"Groq completion successful - Tokens: {usage.prompt_tokens} in, "
-                    f"{usage.completion_tokens} out, {usage.total_tokens} total"
+                    "Groq completion successful - Tokens: %s in (%s cached), %s out, %s total",
+                    usage.prompt_tokens, _cached_tokens(usage),
+                    usage.completion_tokens, usage.total_tokens,
                 )
                 
                 return content
                 
             except RateLimitError as e:
-                logger.warning(f"Groq rate limit hit (attempt {attempt + 1}): {e}")
+                logger.warning("Groq rate limit hit (attempt %s): %s", attempt + 1, e)
                 if attempt == max_retries:
                     raise RuntimeError("Groq rate limit exceeded. Try again later.")
-                # Exponential backoff would go here in production
+                await backoff.wait(e, attempt, RATE_LIMIT_BASE_SECONDS)
                 
             except APITimeoutError as e:
-                logger.warning(f"Groq timeout (attempt {attempt + 1}): {e}")
+                logger.warning("Groq timeout (attempt %s): %s", attempt + 1, e)
                 if attempt == max_retries:
                     raise RuntimeError("Groq request timed out. Try again later.")
+                await backoff.wait(e, attempt, TIMEOUT_BASE_SECONDS)
+                
+            except (APIConnectionError, InternalServerError) as e:
+                logger.warning("Groq server error (attempt %s): %s", attempt + 1, e)
+                if attempt == max_retries:
+                    raise RuntimeError("Groq service unavailable. Try again later.")
+                await backoff.wait(e, attempt, SERVER_ERROR_BASE_SECONDS)
                     
             except APIError as e:
-                logger.error(f"Groq API error: {e}")
+                logger.error("Groq API error: %s", e)
                 raise RuntimeError(f"AI service error: {str(e)}")
                 
             except Exception as e:
-                logger.error(f"Unexpected error in Groq LLM completion: {e}")
+                logger.error("Unexpected error in Groq LLM completion: %s", e)
                 raise RuntimeError(f"Failed to generate response: {str(e)}")
         
         raise RuntimeError("Failed to get Groq completion after all retries")
     
-    async def validate_scope(self, user_query: str, validator_prompt: tuple[str, str]) -> bool:
+    async def _bounded_complete(self, request: Dict[str, Any]) -> str:
+        async with self._batch_sem:
+            return await self.complete(**request)
+    
+    async def complete_batch(
+        self,
+        requests: List[Dict[str, Any]],
+    ) -> List[Union[str, BaseException]]:
+        """
+        Run several independent completions concurrently.
+        
+        At most GROQ_CONCURRENCY requests are in flight at once, so a large
+        batch overlaps network latency without tripping provider rate limits.
+        
+        Args:
+            requests: Keyword arguments for complete(), one dict per completion
+            
+        Returns:
+            Results in request order; a failed completion yields its exception
+            instead of failing the whole batch
+        """
+        return await asyncio.gather(
+            *(self._bounded_complete(request) for request in requests),
+            return_exceptions=True,
+        )
+    
+    async def validate_scope(
+        self,
+        user_query: str,
+        validator_prompt: tuple[str, str],
+        fresh: bool = False,
+    ) -> bool:
         """
         Quick scope validation (optimized for low token usage).
         
+        Verdicts are memoized per normalized query, so a recurring borderline
+        question costs one validator call instead of one per request; cache
+        misses for the same query share one in-flight call.
+        
         Args:
             user_query: User's question/request
             validator_prompt: (system, user) prompt tuple
+            fresh: Bypass the verdict cache and always ask the model
             
         Returns:
             True if in scope, False otherwise
         """
-        system_prompt, user_template = validator_prompt
+        cache_key = scope_cache_key(user_query, validator_prompt)
+        
+        if not fresh:
+            cached = self._scope_cache.get(cache_key)
+            if cached is not None:
+                return cached
         
         try:
-            response = await self.complete(
-                system_prompt=system_prompt,
-                user_prompt=user_template.format(user_query=user_query),
-                temperature=0.0,  # Deterministic for validation
-            )
-            
-            result = response.strip().upper()
-            logger.debug(f"Groq scope validation result: {result}")
-            
-            return "IN_SCOPE" in result
+            # Joins an identical validation already in flight (never a shared prompt)
+            in_scope = await self._scope_flights.do(cache_key, lambda: classify_scope(
+                self.complete, user_query, validator_prompt, self._verdict_max_tokens
+            ))
+            # Only real verdicts are cached; fail-open results below are not
+            self._scope_cache[cache_key] = in_scope
+            return in_scope
             
         except Exception as e:
-            logger.error(f"Groq scope validation failed: {e}")
+            logger.error("Groq scope validation failed: %s", e)
             # Fail open: allow request through if validation fails
             return True
     
@@ -182,6 +306,8 @@ class LLMClientGroq:
         user_prompt: str,
         chat_history: Optional[List[Dict[str, str]]] = None,
         temperature: float = 0.7,
+        context_prompt: Optional[str] = None,
+        prompt_cache_key: Optional[str] = None,
     ) -> AsyncGenerator[str, None]:
         """
         Generate streaming completion for real-time UX with chat history.
@@ -194,6 +320,8 @@ class LLMClientGroq:
             user_prompt: User query
             chat_history: Previous conversation messages for context
             temperature: Sampling temperature (0.7 for balanced creativity)
+            context_prompt: Optional per-request system context, sent after system_prompt
+            prompt_cache_key: Stable key for provider prefix caching (if supported)
             
         Yields:
             String chunks as they're generated
@@ -201,28 +329,14 @@ class LLMClientGroq:
         Raises:
             RuntimeError: If streaming fails
         """
-        # Validate token budget
-        estimated_input_tokens = (len(system_prompt) + len(user_prompt)) // 4
-        if estimated_input_tokens > self.MAX_INPUT_TOKENS:
-            logger.warning(
-                f"Input may exceed token budget: ~{estimated_input_tokens} tokens "
-                f"(limit: {self.MAX_INPUT_TOKENS})"
-            )
-        
-        # Build messages with chat history
-        messages = [{"role": "system", "content": system_prompt}]
-        
-        # Add chat history if provided (for context)
-        if chat_history:
-            messages.extend(chat_history)
-        
-        # Add current user query
-        messages.append({"role": "user", "content": user_prompt})
+        messages = self._build_messages(system_prompt, user_prompt, chat_history, context_prompt)
         
         try:
             logger.debug("Requesting streaming Groq completion")
             
             # Create streaming response
+            started = time.perf_counter()
+            await self._rate_limiter.acquire()
             stream = await self.client.chat.completions.create(
                 model=self.model,
                 messages=messages,
@@ -230,31 +344,36 @@ class LLMClientGroq:
                 max_tokens=self.MAX_OUTPUT_TOKENS,
                 stream=True,  # Enable streaming
                 timeout=30.0,  # Longer timeout for streaming
+                extra_body=self._cache_key_body(prompt_cache_key, system_prompt),
             )
             
             # Yield chunks as they arrive
+            first = True
             async for chunk in stream:
                 if chunk.choices and len(chunk.choices) > 0:
                     delta = chunk.choices[0].delta
                     if delta.content:
+                        if first:
+                            _log_ttft(started)
+                            first = False
                         yield delta.content
             
             logger.info("Groq streaming completion successful")
             
         except RateLimitError as e:
-            logger.warning(f"Groq rate limit hit during streaming: {e}")
+            logger.warning("Groq rate limit hit during streaming: %s", e)
             raise RuntimeError("Rate limit exceeded. Please try again later.")
             
         except APITimeoutError as e:
-            logger.warning(f"Groq timeout during streaming: {e}")
+            logger.warning("Groq timeout during streaming: %s", e)
             raise RuntimeError("Request timed out. Please try again.")
             
         except APIError as e:
-            logger.error(f"Groq API error during streaming: {e}")
+            logger.error("Groq API error during streaming: %s", e)
             raise RuntimeError(f"AI service error: {str(e)}")
             
         except Exception as e:
-            logger.error(f"Unexpected error in Groq streaming: {e}")
+            logger.error("Unexpected error in Groq streaming: %s", e)
             raise RuntimeError(f"Failed to stream response: {str(e)}")
     
     async def complete_with_function_calling(
@@ -263,7 +382,8 @@ class LLMClientGroq:
         user_prompt: str,
         tools: List[Dict],
         temperature: float = 0.7,
-        max_retries: int = 2,
+        max_retries: int = MAX_RETRIES,
+        tool_choice: Union[str, Dict] = "required",
     ) -> Dict:
         """
         Generate completion with function/tool calling for structured outputs.
@@ -277,35 +397,33 @@ class LLMClientGroq:
             tools: List of tool/function definitions (OpenAI format)
             temperature: Sampling temperature (0.7 for balanced creativity)
             max_retries: Number of retry attempts on failure
+            tool_choice: "required" (any tool) or a specific tool selector;
+                pass a shared constant rather than building one per call
             
         Returns:
-            Dictionary containing the function call name and parsed arguments
+            Dictionary with the function call "name" and its "arguments" as the
+            raw JSON string; callers decode it straight into their own schema
+            (e.g. a msgspec Struct) so it is parsed exactly once
             
         Raises:
             RuntimeError: If all retries fail or no function call generated
         """
-        # Validate token budget
-        estimated_input_tokens = (len(system_prompt) + len(user_prompt)) // 4
-        if estimated_input_tokens > self.MAX_INPUT_TOKENS:
-            logger.warning(
-                f"Input may exceed token budget: ~{estimated_input_tokens} tokens "
-                f"(limit: {self.MAX_INPUT_TOKENS})"
-            )
-        
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt}
-        ]
+        messages = self._build_messages(system_prompt, user_prompt)
         
+        backoff = Backoff()
         for attempt in range(max_retries + 1):
             try:
-                logger.debug(f"Requesting Groq function calling (attempt {attempt + 1}/{max_retries + 1})")
+                logger.debug(
+                    "Requesting Groq function calling (attempt %s/%s)",
+                    attempt + 1, max_retries + 1,
+                )
                 
+                await self._rate_limiter.acquire()
                 response = await self.client.chat.completions.create(
                     model=self.model,
                     messages=messages,
                     tools=tools,
-                    tool_choice="required",  # Force function calling
+                    tool_choice=tool_choice,  # Force function calling
                     temperature=temperature,
                     max_tokens=4000,  # Higher limit for structured generation
                     timeout=15.0,
@@ -322,8 +440,10 @@ class LLMClientGroq:
                 # Log token usage
                 usage = response.usage
                 logger.info(
-                    f"Groq function calling successful - Tokens: {usage.prompt_tokens} in, "
-                    f"{usage.completion_tokens} out, {usage.total_tokens} total"
+                    "Groq function calling successful - "
+                    "Tokens: %s in (%s cached), %s out, %s total",
+                    usage.prompt_tokens, _cached_tokens(usage),
+                    usage.completion_tokens, usage.total_tokens,
                 )
                 
                 return {
@@ -332,21 +452,41 @@ class LLMClientGroq:
                 }
                 
             except RateLimitError as e:
-                logger.warning(f"Groq rate limit hit (attempt {attempt + 1}): {e}")
+                logger.warning("Groq rate limit hit (attempt %s): %s", attempt + 1, e)
                 if attempt == max_retries:
                     raise RuntimeError("Groq rate limit exceeded. Try again later.")
+                await backoff.wait(e, attempt, RATE_LIMIT_BASE_SECONDS)
                     
             except APITimeoutError as e:
-                logger.warning(f"Groq timeout (attempt {attempt + 1}): {e}")
+                logger.warning("Groq timeout (attempt %s): %s", attempt + 1, e)
                 if attempt == max_retries:
                     raise RuntimeError("Groq request timed out. Try again later.")
+                await backoff.wait(e, attempt, TIMEOUT_BASE_SECONDS)
+                
+            except (APIConnectionError, InternalServerError) as e:
+                logger.warning("Groq server error (attempt %s): %s", attempt + 1, e)
+                if attempt == max_retries:
+                    raise RuntimeError("Groq service unavailable. Try again later.")
+                await backoff.wait(e, attempt, SERVER_ERROR_BASE_SECONDS)
                     
             except APIError as e:
-                logger.error(f"Groq API error: {e}")
+                logger.error("Groq API error: %s", e)
                 raise RuntimeError(f"AI service error: {str(e)}")
                 
             except Exception as e:
-                logger.error(f"Unexpected error in Groq function calling: {e}")
+                logger.error("Unexpected error in Groq function calling: %s", e)
                 raise RuntimeError(f"Failed to generate structured response: {str(e)}")
         
         raise RuntimeError("Failed to get Groq function call after all retries")
+
+
+@functools.cache
+def get_groq_client(model: str = "openai/gpt-oss-120b") -> LLMClientGroq:
+    """
+    Return a shared LLMClientGroq for the given model.
+    
+    Clients are memoized per model name so call sites reuse one AsyncOpenAI
+    instance (and its HTTP connection pool) instead of opening new TLS
+    connections for every client they construct.
+    """
+    return LLMClientGroq(model=model)
@@ -3,10 +3,15 @@ Policy definitions for scope validation and content filtering.
 Defines what's in-scope vs out-of-scope for the pedagogical firewall.
 """
 
-from typing import List, Pattern
+from typing import FrozenSet, List, Pattern
 import re
 
 
+def _combine(patterns: List[Pattern]) -> Pattern:
+    """Merge compiled patterns into one alternation so a query is scanned once."""
+    return re.compile("|".join(f"(?:{p.pattern})" for p in patterns), re.IGNORECASE)
+
+
 class ScopePolicy:
     """
     Defines what the AI tutor can and cannot help with.
@@ -15,7 +20,7 @@ class ScopePolicy:
     """
     
     # Keywords that indicate learning-oriented queries (IN SCOPE)
-    LEARNING_KEYWORDS = [
+    LEARNING_KEYWORDS: FrozenSet[str] = frozenset({
         # Understanding
         "how", "why", "what", "explain", "understand", "confused",
         "difference", "between", "mean", "means",
@@ -31,7 +36,7 @@ class ScopePolicy:
         # Concepts
         "algorithm", "complexity", "time", "space", "data structure",
         "loop", "recursion", "variable", "function",
-    ]
+    })
     
     # Patterns that indicate solution-seeking (BORDERLINE - needs LLM judgment)
     SOLUTION_SEEKING_PATTERNS: List[Pattern] = [
@@ -56,32 +61,35 @@ class ScopePolicy:
         re.compile(r"\b(medical|legal|financial)\s+advice\b", re.IGNORECASE),
     ]
     
+    # Single-pass matchers built from the lists above at import time; the
+    # lists stay the source of truth, quick_filter only uses these
+    OUT_OF_SCOPE_RE: Pattern = _combine(OUT_OF_SCOPE_PATTERNS)
+    SOLUTION_SEEKING_RE: Pattern = _combine(SOLUTION_SEEKING_PATTERNS)
+    # Substring match, so "loops"/"errors" still count; sorted for a stable pattern
+    LEARNING_KEYWORD_RE: Pattern = re.compile("|".join(map(re.escape, sorted(LEARNING_KEYWORDS))))
+    
     @classmethod
     def quick_filter(cls, user_query: str) -> tuple[bool, str]:
         """
         Fast pattern-based filtering before LLM validation.
         
+        Only "NEEDS_LLM_VALIDATION" is sent to the LLM scope validator; every
+        other verdict is final, so most traffic never costs a validator call.
+        
         Returns:
             (is_allowed, reason)
         """
-        query_lower = user_query.lower()
-        
         # Check for clearly out-of-scope patterns
-        for pattern in cls.OUT_OF_SCOPE_PATTERNS:
-            if pattern.search(user_query):
-                return False, "OUT_OF_SCOPE_DOMAIN"
+        if cls.OUT_OF_SCOPE_RE.search(user_query):
+            return False, "OUT_OF_SCOPE_DOMAIN"
         
-        # Check for solution-seeking (flag for LLM review, don't auto-reject)
-        for pattern in cls.SOLUTION_SEEKING_PATTERNS:
-            if pattern.search(user_query):
-                return True, "BORDERLINE_SOLUTION_SEEKING"  # Let LLM handle
+        # Solution-seeking is on-topic: allow it without validation and let
+        # the Socratic prompt steer it towards hints instead of answers
+        if cls.SOLUTION_SEEKING_RE.search(user_query):
+            return True, "BORDERLINE_SOLUTION_SEEKING"
         
         # Check for learning keywords (likely in scope)
-        has_learning_keyword = any(
-            keyword in query_lower for keyword in cls.LEARNING_KEYWORDS
-        )
-        
-        if has_learning_keyword:
+        if cls.LEARNING_KEYWORD_RE.search(user_query.lower()):
             return True, "LEARNING_ORIENTED"
         
         # Default: let LLM validate
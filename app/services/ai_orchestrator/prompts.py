@@ -4,10 +4,10 @@ No external dependencies - simple string formatting with validation.
 """
 
 from dataclasses import dataclass
-from typing import Dict, Optional
+from typing import Dict, Final, Optional
 
 
-@dataclass
+@dataclass(frozen=True)
 class PromptTemplate:
     """Simple template with variable injection"""
     system: str
@@ -36,6 +36,9 @@ Respond with ONLY 'IN_SCOPE' or 'OUT_OF_SCOPE'. No explanations.""",
 )
 
 
+# Static instructions only - kept byte-identical across requests so the
+# provider can reuse its cached prefix. Per-request details go in
+# SOCRATIC_SESSION_CONTEXT and the user turn.
 SOCRATIC_TUTOR_BASE = PromptTemplate(
     system="""You are a friendly programming tutor helping absolute beginners learn to code.
 
@@ -54,15 +57,15 @@ REMEMBER: Your student is a complete NOVICE who might not know:
 - Basic programming concepts
 - Where to even start
 
-Problem: {problem_description}
+Be patient, kind, and break everything down into baby steps.""",
+    user="{code_context}{user_query}"
+)
 
-{code_context}
 
-Student's context: {behavioral_context}
+# Dynamic per-request context, sent as a separate system message after the static prefix
+SOCRATIC_SESSION_CONTEXT: Final[str] = """Problem: {problem_description}
 
-Be patient, kind, and break everything down into baby steps.""",
-    user="{user_query}"
-)
+Student's context: {behavioral_context}"""
 
 
 # State-specific prompt augmentations (beginner-friendly)
@@ -74,6 +77,9 @@ STATE_ADJUSTMENTS = {
     "ACTIVE": "\n✓ The student is engaged and learning. Give subtle hints that help them discover the answer themselves.",
 }
 
+# Provenance states that take priority over iteration and cognitive guidance
+_OVERRIDING_PROVENANCE_STATES = frozenset({"SUSPECTED_PASTE", "SPAMMING"})
+
 
 def build_socratic_prompt(
     user_query: str,
@@ -82,11 +88,16 @@ def build_socratic_prompt(
     cognitive_state: Optional[str] = None,
     iteration_state: Optional[str] = None,
     provenance_state: Optional[str] = None,
-) -> tuple[str, str]:
+) -> tuple[str, str, str]:
     """
     Build context-aware Socratic prompt with behavioral integration.
     
     Keeps token count low by only including relevant state information.
+    
+    Returns:
+        (system_prompt, context_prompt, user_prompt) - the system prompt is
+        static; problem and behavioral details live in context_prompt and
+        the student's code is prepended to the user prompt.
     """
     # Start with base behavioral context
     behavioral_parts = []
@@ -114,25 +125,29 @@ def build_socratic_prompt(
         
         code_context = f"Student's current code:\n```python\n{code_snippet}\n```\n"
     
-    # Get base system prompt
-    system_prompt, user_prompt = SOCRATIC_TUTOR_BASE.format(
+    # Static system prompt is sent as-is (never formatted); code goes in the user turn
+    system_prompt = SOCRATIC_TUTOR_BASE.system
+    user_prompt = SOCRATIC_TUTOR_BASE.user.format(
         user_query=user_query,
-        problem_description=problem_description,
         code_context=code_context,
-        behavioral_context=behavioral_context
+    )
+    context_prompt = SOCRATIC_SESSION_CONTEXT.format(
+        problem_description=problem_description,
+        behavioral_context=behavioral_context,
     )
     
     # Augment with state-specific guidance (token-efficient)
     primary_state = (
-        provenance_state if provenance_state in ["SUSPECTED_PASTE", "SPAMMING"]
+        provenance_state if provenance_state in _OVERRIDING_PROVENANCE_STATES
         else iteration_state if iteration_state == "RAPID_GUESSING"
         else cognitive_state
     )
     
-    if primary_state and primary_state in STATE_ADJUSTMENTS:
-        system_prompt += STATE_ADJUSTMENTS[primary_state]
+    adjustment = STATE_ADJUSTMENTS.get(primary_state)
+    if adjustment:
+        context_prompt += adjustment
     
-    return system_prompt, user_prompt
+    return system_prompt, context_prompt, user_prompt
 
 
 OUT_OF_SCOPE_RESPONSE = """I'm here to help you learn programming! 😊
@@ -0,0 +1,64 @@
+"""
+Client-side rate limiting for LLM provider calls.
+
+Requests are shaped to stay under the provider's requests-per-minute quota
+before they are sent, so a burst waits briefly in-process instead of paying
+a 429 round-trip plus a retry delay.
+"""
+
+import asyncio
+import functools
+import os
+import time
+
+# Groq quotas are per model; 0 disables limiting
+DEFAULT_RPM = int(os.getenv("GROQ_RPM", "300"))
+
+
+class RateLimiter:
+    """
+    Token bucket allowing `rate` acquisitions per `period` seconds.
+
+    The bucket starts full, so short bursts up to `rate` pass immediately;
+    waiters beyond that are released in arrival order as tokens refill.
+    """
+
+    def __init__(self, rate: int, period: float = 60.0):
+        self.capacity = float(rate)
+        self._tokens = float(rate)
+        self._refill_per_second = rate / period
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """Take one token, sleeping until one is available."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity,
+                    self._tokens + (now - self._updated) * self._refill_per_second,
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self._refill_per_second)
+
+
+class _Unlimited:
+    """Stand-in limiter used when rate limiting is disabled."""
+
+    async def acquire(self) -> None:
+        return None
+
+
+@functools.cache
+def get_rate_limiter(model: str, rpm: int = DEFAULT_RPM):
+    """
+    Get the shared limiter for `model` (memoized, so every client of the same
+    model draws from one bucket).
+    """
+    if rpm <= 0:
+        return _Unlimited()
+    return RateLimiter(rpm, 60.0)
@@ -0,0 +1,60 @@
+"""
+Retry backoff for LLM provider calls.
+
+Exponential backoff with full jitter, honoring the provider's Retry-After
+header, and capped in total so a request never stalls for long.
+"""
+
+import asyncio
+import logging
+import os
+import random
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+
+RATE_LIMIT_BASE_SECONDS = 0.5
+TIMEOUT_BASE_SECONDS = 0.25
+SERVER_ERROR_BASE_SECONDS = 0.5
+MAX_DELAY_SECONDS = 8.0
+MAX_TOTAL_BACKOFF_SECONDS = 10.0
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Seconds from the error response's Retry-After header, if it has one."""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    value = response.headers.get("retry-after")
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except ValueError:
+        return None  # HTTP-date form; fall back to computed backoff
+
+
+class Backoff:
+    """Tracks the backoff budget across the attempts of one call."""
+    
+    def __init__(self, max_total_seconds: float = MAX_TOTAL_BACKOFF_SECONDS):
+        self.remaining = max_total_seconds
+    
+    async def wait(self, error: Exception, attempt: int, base: float) -> None:
+        """
+        Sleep before retry number `attempt + 1`.
+        
+        Args:
+            error: The exception that triggered the retry
+            attempt: Zero-based index of the attempt that just failed
+            base: Base delay in seconds, doubled per attempt
+        """
+        delay = _retry_after(error)
+        if delay is None:
+            delay = random.uniform(0, min(MAX_DELAY_SECONDS, base * 2 ** attempt))
+        delay = min(delay, self.remaining)
+        self.remaining -= delay
+        
+        if delay > 0:
+            logger.debug("Retrying in %.2fs", delay)
+            await asyncio.sleep(delay)
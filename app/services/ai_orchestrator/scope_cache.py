@@ -0,0 +1,38 @@
+"""
+Memoization helpers for LLM scope validation.
+
+Validator verdicts are deterministic (temperature 0) and stable for a given
+phrasing, so borderline queries that recur skip the extra validator call.
+"""
+
+import hashlib
+import re
+
+from cachetools import TTLCache
+
+SCOPE_CACHE_SIZE = 4096
+# Verdicts are loss-free to reuse (temperature 0) but expire so a validator
+# model change or drift is picked up within a day
+SCOPE_CACHE_TTL_SECONDS = 24 * 3600
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def scope_cache_key(user_query: str, validator_prompt: tuple[str, str]) -> str:
+    """
+    Cache key for a validator verdict.
+
+    The query is lowercased with whitespace runs collapsed; the validator
+    prompt is hashed in so a prompt change never serves stale verdicts.
+    """
+    normalized = _WHITESPACE_RE.sub(" ", user_query.lower()).strip()
+    digest = hashlib.blake2b(digest_size=16)
+    for part in (*validator_prompt, normalized):
+        digest.update(part.encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def new_scope_cache() -> TTLCache:
+    """Bounded LRU of scope-cache key -> in-scope verdict, expiring after a day."""
+    return TTLCache(maxsize=SCOPE_CACHE_SIZE, ttl=SCOPE_CACHE_TTL_SECONDS)
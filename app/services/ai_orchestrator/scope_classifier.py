@@ -0,0 +1,75 @@
+"""
+Single-query LLM scope classification.
+
+Every query is classified in its own completion. Queries are untrusted
+student text, so they are never batched into a shared prompt: one query
+could inject instructions that flip the verdicts of the others. Identical
+concurrent queries are coalesced by the caller (see SingleFlight).
+"""
+
+import logging
+import re
+from typing import Awaitable, Callable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Output cap for a verdict: room for the label plus a little wrapping
+# ("**IN_SCOPE**", "Answer: IN_SCOPE"). Reasoning models spend output tokens
+# on hidden reasoning before any visible text, so they get no cap at all.
+VERDICT_MAX_TOKENS = 16
+_REASONING_MODEL_RE = re.compile(r"(^|/)(gpt-oss|o\d|deepseek-r1|qwq)", re.IGNORECASE)
+
+_LABEL_RE = re.compile(r"IN_SCOPE|OUT_OF_SCOPE")
+_LEADING_NOISE_RE = re.compile(r"^[^A-Z0-9]+")
+
+Complete = Callable[..., Awaitable[str]]
+ValidatorPrompt = Tuple[str, str]
+
+
+def verdict_max_tokens(model: str) -> Optional[int]:
+    """Output cap for a verdict from `model` (None: the client's default)."""
+    return None if _REASONING_MODEL_RE.search(model) else VERDICT_MAX_TOKENS
+
+
+def parse_verdict(response: str) -> bool:
+    """
+    Whether a validator response says IN_SCOPE.
+    
+    The first label anywhere in the text wins, so markdown or a preamble
+    around it is ignored. Without a full label (output cut mid-label, e.g.
+    "IN_SC") the prefix after any leading punctuation decides.
+    """
+    text = response.upper()
+    match = _LABEL_RE.search(text)
+    if match:
+        return match.group() == "IN_SCOPE"
+    return _LEADING_NOISE_RE.sub("", text).startswith("IN")
+
+
+async def classify_scope(
+    complete: Complete,
+    query: str,
+    validator_prompt: ValidatorPrompt,
+    max_tokens: Optional[int] = VERDICT_MAX_TOKENS,
+) -> bool:
+    """
+    Classify a single query with its own completion.
+    
+    Args:
+        complete: The client's `complete` coroutine function
+        query: User query to classify
+        validator_prompt: (system, user) single-query validator prompt
+        max_tokens: Output cap (see verdict_max_tokens)
+    
+    Returns:
+        True if the query is in scope
+    """
+    system_prompt, user_template = validator_prompt
+    response = await complete(
+        system_prompt=system_prompt,
+        user_prompt=user_template.format(user_query=query),
+        temperature=0.0,  # Deterministic for validation
+        max_tokens=max_tokens,
+    )
+    logger.debug("Scope validation result: %r", response)
+    return parse_verdict(response)
@@ -0,0 +1,60 @@
+"""
+Single-flight coalescing for identical concurrent LLM calls.
+
+When a whole class works the same problem, identical questions often arrive
+together; the first caller makes the provider call and the rest await its
+result instead of issuing their own.
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Shares one in-flight task per key among concurrent callers.
+    
+    The shared call runs as its own task and each caller awaits it through
+    asyncio.shield, so one caller disconnecting doesn't cancel the work for
+    the others. It is cancelled only once every caller has gone.
+    """
+    
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._waiters: Dict[Hashable, int] = {}
+    
+    def __len__(self) -> int:
+        return len(self._inflight)
+    
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run `call()` unless a call for `key` is already in flight; return its result.
+        
+        Args:
+            key: Identity of the call; equal keys must produce interchangeable results
+            call: Zero-argument coroutine function performing the work
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(call())
+            self._inflight[key] = task
+            self._waiters[key] = 0
+            task.add_done_callback(lambda done: self._finish(key, done))
+        
+        self._waiters[key] += 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            if self._inflight.get(key) is task:
+                self._waiters[key] -= 1
+                if not self._waiters[key]:
+                    task.cancel()
+    
+    def _finish(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+            del self._waiters[key]
+        if not task.cancelled():
+            task.exception()  # Retrieved even if every caller went away
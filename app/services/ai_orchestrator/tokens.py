@@ -0,0 +1,178 @@
+"""
+Prompt token counting, history trimming and message layout.
+
+Counts use tiktoken. Models without a registered encoding (the Groq-hosted
+open models) fall back to cl100k_base, which is close enough for budgeting.
+Encodings load lazily on first use (tiktoken may download the BPE file); if
+one cannot be loaded, e.g. offline, counts fall back to a chars/4 estimate.
+"""
+
+import functools
+import logging
+import textwrap
+from typing import Dict, List, Optional
+
+import tiktoken
+import tiktoken.model
+
+logger = logging.getLogger(__name__)
+
+FALLBACK_ENCODING = "cl100k_base"
+
+# Rough characters-per-token ratio used when no encoding can be loaded
+CHARS_PER_TOKEN = 4
+
+# Per-message framing overhead in chat-format prompts (role + separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Providers only cache prompt prefixes at least this long (OpenAI: 1024 tokens)
+PROMPT_CACHE_MIN_TOKENS = 1024
+
+
+@functools.cache
+def encoding_name_for_model(model: str) -> str:
+    """
+    Name of the tiktoken encoding used to count tokens for `model`.
+    
+    Only the name is resolved; nothing is loaded or downloaded here.
+    """
+    try:
+        return tiktoken.model.encoding_name_for_model(model)
+    except KeyError:
+        return FALLBACK_ENCODING
+
+
+@functools.cache
+def _get_encoding(encoding_name: str) -> Optional[tiktoken.Encoding]:
+    """
+    The tiktoken encoding for `encoding_name`, loaded on first use.
+    
+    Returns None (once per process) if it cannot be loaded, so callers use
+    the chars/4 estimate instead of failing or retrying the download.
+    """
+    try:
+        return tiktoken.get_encoding(encoding_name)
+    except Exception as e:
+        logger.warning(
+            "Could not load tiktoken encoding %s, estimating tokens from length: %s",
+            encoding_name, e,
+        )
+        return None
+
+
+@functools.lru_cache(maxsize=1024)
+def count_tokens(encoding_name: str, text: str) -> int:
+    """
+    Token count of `text`; memoized because system prompts repeat verbatim.
+    """
+    encoding = _get_encoding(encoding_name)
+    if encoding is None:
+        return -(-len(text) // CHARS_PER_TOKEN)
+    return len(encoding.encode(text))
+
+
+def prefix_cacheable(encoding_name: str, system_prompt: str) -> bool:
+    """Whether `system_prompt` is long enough for the provider to cache as a prefix."""
+    return (
+        count_tokens(encoding_name, system_prompt) + MESSAGE_OVERHEAD_TOKENS
+        >= PROMPT_CACHE_MIN_TOKENS
+    )
+
+
+def count_message_tokens(encoding_name: str, messages: List[Dict[str, str]]) -> int:
+    """Approximate prompt tokens for a chat-format message list."""
+    return sum(
+        count_tokens(encoding_name, message.get("content") or "") + MESSAGE_OVERHEAD_TOKENS
+        for message in messages
+    )
+
+
+def trim_history(
+    encoding_name: str,
+    prefix: List[Dict[str, str]],
+    chat_history: List[Dict[str, str]],
+    suffix: List[Dict[str, str]],
+    max_tokens: int,
+) -> List[Dict[str, str]]:
+    """
+    Assemble `prefix + chat_history + suffix`, dropping the oldest history
+    messages until the prompt fits in `max_tokens`. Whole turns are dropped:
+    the kept history never opens with an assistant reply whose question was
+    trimmed away.
+
+    The prefix (static system prompt) and suffix (session context and current
+    user turn) are never dropped; if they alone exceed the budget a warning
+    is logged.
+    """
+    fixed = count_message_tokens(encoding_name, prefix) + count_message_tokens(encoding_name, suffix)
+    history_tokens = [
+        count_tokens(encoding_name, message.get("content") or "") + MESSAGE_OVERHEAD_TOKENS
+        for message in chat_history
+    ]
+    
+    start = 0
+    total = fixed + sum(history_tokens)
+    while total > max_tokens and start < len(chat_history):
+        total -= history_tokens[start]
+        start += 1
+        while start < len(chat_history) and chat_history[start].get("role") == "assistant":
+            total -= history_tokens[start]
+            start += 1
+    
+    if start:
+        logger.info("Dropped %s oldest history messages to fit %s-token budget", start, max_tokens)
+    if total > max_tokens:
+        logger.warning("Prompt exceeds token budget: %s tokens (limit: %s)", total, max_tokens)
+    
+    return prefix + chat_history[start:] + suffix
+
+
+
+def build_messages(
+    encoding_name: str,
+    system_prompt: str,
+    user_prompt: str,
+    chat_history: Optional[List[Dict[str, str]]],
+    context_prompt: Optional[str],
+    max_tokens: int,
+) -> List[Dict[str, str]]:
+    """
+    Lay out chat messages from most to least stable so consecutive turns
+    share the longest possible provider-cached prefix:
+
+        static system prompt -> chat history -> session context -> user turn
+
+    The session context (problem, behavioral state) can change every turn,
+    so it sits after the history instead of invalidating it. The oldest
+    history is trimmed so the prompt fits `max_tokens`.
+    """
+    prefix = [{"role": "system", "content": system_prompt}]
+    suffix = [{"role": "user", "content": user_prompt}]
+    if context_prompt:
+        suffix.insert(0, {"role": "system", "content": context_prompt})
+    return trim_history(encoding_name, prefix, chat_history or [], suffix, max_tokens)
+
+
+def tail_snippet(encoding_name: str, code: str, max_tokens: int = 120) -> str:
+    """
+    The last `max_tokens` tokens of `code`, cut back to whole lines.
+    
+    The tail is usually where the student is editing. The snippet starts at
+    a line boundary and common indentation is removed, so no tokens are
+    spent on a partial first line or on leading whitespace.
+    """
+    encoding = _get_encoding(encoding_name)
+    if encoding is None:
+        if len(code) <= max_tokens * CHARS_PER_TOKEN:
+            return textwrap.dedent(code)
+        tail = code[-max_tokens * CHARS_PER_TOKEN:]
+    else:
+        tokens = encoding.encode(code)
+        if len(tokens) <= max_tokens:
+            return textwrap.dedent(code)
+        tail = encoding.decode(tokens[-max_tokens:])
+    
+    newline = tail.find("\n")
+    if newline != -1:
+        tail = tail[newline + 1:]
+    return "# ...\n" + textwrap.dedent(tail)
@@ -0,0 +1,27 @@
+"""
+Behavioral analytics: Data Fusion over raw telemetry and the Cognitive
+Engagement Score (CES).
+"""
+
+from .ces_calculator import CESCalculator
+from .data_fusion import (
+    BatchFusionInsights,
+    CognitiveState,
+    DataFusionEngine,
+    FusionInsights,
+    IterationState,
+    ProvenanceState,
+)
+from .metrics import BatchMetrics, SessionMetrics
+
+__all__ = [
+    "CESCalculator",
+    "DataFusionEngine",
+    "FusionInsights",
+    "BatchFusionInsights",
+    "ProvenanceState",
+    "IterationState",
+    "CognitiveState",
+    "SessionMetrics",
+    "BatchMetrics",
+]
@@ -1,5 +1,16 @@
-from app.services.behavior_engine.metrics import SessionMetrics
-from app.services.behavior_engine.data_fusion import FusionInsights
+import numpy as np
+
+from .metrics import BatchMetrics, SessionMetrics
+from .data_fusion import BatchFusionInsights, FusionInsights
+
+
+# CES label bands (Table 3): a score falls in the band above the last edge it exceeds
+_LABEL_EDGES = np.array([0.0, 0.2, 0.5])
+_LABELS = np.array(
+    ["Disengaged/Suspicious", "Low Engagement", "Moderate Engagement", "High Engagement"],
+    dtype=object,
+)
+
 
 class CESCalculator:
     """
@@ -55,6 +66,12 @@ class CESCalculator:
     # multitasking or integrity concerns, but additional violations beyond
     # this point provide diminishing diagnostic value.
     
+    # Normalization spans (MAX - MIN), precomputed for calculate()
+    _KPM_SPAN = MAX_KPM - MIN_KPM
+    _AD_SPAN = MAX_AD - MIN_AD
+    _IR_SPAN = MAX_IR - MIN_IR
+    _FVC_SPAN = MAX_FVC - MIN_FVC
+    
     # ---------------------------------------------------------
     # 2. WEIGHTS (Thesis Section 1.3.1)
     # ---------------------------------------------------------
@@ -105,17 +122,27 @@ class CESCalculator:
         # The logic gates (Figures 5, 6, 7) have already filtered the data in 'insights'
         # We trust 'insights' to give us the CLEAN numbers.
         
+        # Min-max normalization (`_normalize`) inlined: every span is a nonzero
+        # class constant, so the call frames and zero-range guard are skipped.
+        # Clamps are conditional expressions rather than max(lo, min(hi, x)),
+        # which costs two builtin calls each
+        
         # 1. Normalize Effective KPM (Spam removed by DataFusionEngine)
-        kpm_norm = self._normalize(insights.effective_kpm, self.MIN_KPM, self.MAX_KPM)
+        kpm_norm = (insights.effective_kpm - self.MIN_KPM) / self._KPM_SPAN
+        kpm_norm = 0.0 if kpm_norm < 0.0 else (1.0 if kpm_norm > 1.0 else kpm_norm)
         
         # 2. Normalize Effective AD (Rapid-guessing discounted by DataFusionEngine)
-        ad_norm  = self._normalize(insights.effective_ad, self.MIN_AD, self.MAX_AD)
+        ad_norm  = (insights.effective_ad - self.MIN_AD) / self._AD_SPAN
+        ad_norm  = 0.0 if ad_norm < 0.0 else (1.0 if ad_norm > 1.0 else ad_norm)
         
         # 3. Normalize Effective IR (Reflective pauses excluded by DataFusionEngine)
-        ir_norm  = self._normalize(insights.effective_ir, self.MIN_IR, self.MAX_IR)
+        ir_norm  = (insights.effective_ir - self.MIN_IR) / self._IR_SPAN
+        ir_norm  = 0.0 if ir_norm < 0.0 else (1.0 if ir_norm > 1.0 else ir_norm)
         
         # 4. Normalize FVC (Raw count - not adjusted by fusion logic)
-        fvc_norm = self._normalize(metrics.focus_violation_count, self.MIN_FVC, self.MAX_FVC)
+        fvc = metrics.focus_violation_count
+        fvc_norm = (fvc - self.MIN_FVC) / self._FVC_SPAN
+        fvc_norm = 0.0 if fvc_norm < 0.0 else (1.0 if fvc_norm > 1.0 else fvc_norm)
 
         # --- CALCULATE FINAL SCORE ---
         # Productive Vector: Keystrokes + Run Attempts (positive contribution)
@@ -132,21 +159,31 @@ class CESCalculator:
         final_ces -= insights.integrity_penalty
 
         # Clamp result to valid range (-1.0 to 1.0)
-        final_ces = max(-1.0, min(1.0, final_ces))
+        if final_ces < -1.0:
+            final_ces = -1.0
+        elif final_ces > 1.0:
+            final_ces = 1.0
+        label = self._get_label(final_ces)
+
+        # Rounded once; the legacy and debug keys repeat the same values
+        ces = round(final_ces, 4)
+        kpm = round(insights.effective_kpm, 2)
+        ad = round(insights.effective_ad, 4)
+        ir = round(insights.effective_ir, 2)
 
         return {
             # Basic metrics (needed by telemetry endpoint)
-            "kpm": round(insights.effective_kpm, 2),
-            "ad": round(insights.effective_ad, 4),
-            "ir": round(insights.effective_ir, 2),
+            "kpm": kpm,
+            "ad": ad,
+            "ir": ir,
             
             # CES Score (needed by telemetry endpoint)
-            "ces": round(final_ces, 4),
-            "classification": self._get_label(final_ces),
+            "ces": ces,
+            "classification": label,
             
             # Legacy keys for backward compatibility
-            "ces_score": round(final_ces, 4),
-            "grade_label": self._get_label(final_ces),
+            "ces_score": ces,
+            "grade_label": label,
             
             # Since our Enums inherit from str, they serialize to JSON automatically!
             "pedagogical_states": {
@@ -155,12 +192,69 @@ class CESCalculator:
                 "cognitive": insights.cognitive_state
             },
             "metrics_debug": {
-                "kpm_effective": round(insights.effective_kpm, 2),
-                "ad_effective": round(insights.effective_ad, 4),
-                "ir_effective": round(insights.effective_ir, 2)
+                "kpm_effective": kpm,
+                "ad_effective": ad,
+                "ir_effective": ir
             }
         }
 
+    def calculate_batch(self, metrics: BatchMetrics, insights: BatchFusionInsights) -> dict:
+        """
+        Computes CES for many sessions at once (dashboards, batch scoring).
+        
+        Same formula and thresholds as `calculate`, evaluated column-wise
+        with NumPy so the cost per session is a few vectorized operations
+        instead of a Python call chain.
+        
+        Args:
+            metrics: Raw telemetry columns (for FVC, which is not adjusted)
+            insights: Fused insights from DataFusionEngine.analyze_batch
+        
+        Returns:
+            dict containing:
+            - ces: Final engagement scores (-1.0 to 1.0), rounded like `calculate`
+            - classification: Label per session (object array of str)
+        """
+        # Accumulated in place: one scratch column per term instead of a
+        # fresh temporary for every operator. Kept in float64 - float32
+        # moves scores that sit on a label edge (0.2, 0.5) across it
+        final_ces = self._normalize_array(insights.effective_kpm, self.MIN_KPM, self.MAX_KPM)
+        final_ces *= self.W_KPM
+        
+        term = self._normalize_array(insights.effective_ad, self.MIN_AD, self.MAX_AD)
+        term *= self.W_AD
+        final_ces += term
+        
+        term = self._normalize_array(insights.effective_ir, self.MIN_IR, self.MAX_IR)
+        term *= self.W_IR
+        final_ces -= term
+        
+        term = self._normalize_array(metrics.focus_violation_count, self.MIN_FVC, self.MAX_FVC)
+        term *= self.W_FVC
+        final_ces -= term
+        
+        final_ces -= insights.integrity_penalty
+        np.clip(final_ces, -1.0, 1.0, out=final_ces)
+        
+        # Band index = number of edges strictly below the score
+        labels = _LABELS[np.searchsorted(_LABEL_EDGES, final_ces, side="left")]
+        
+        return {
+            "ces": np.round(final_ces, 4),
+            "classification": labels,
+        }
+
+    @staticmethod
+    def _normalize_array(values, min_val, max_val) -> np.ndarray:
+        """Vectorized `_normalize`: min-max scaling clamped to [0.0, 1.0]."""
+        if max_val - min_val == 0:
+            return np.zeros(np.shape(values), dtype=np.float64)
+        # Always a new float64 array, safe for callers to modify in place
+        norm = np.array(values, dtype=np.float64)
+        norm -= min_val
+        norm /= max_val - min_val
+        return np.clip(norm, 0.0, 1.0, out=norm)
+
     def _normalize(self, value, min_val, max_val):
         """
         Min-Max normalization to [0, 1] scale.
@@ -179,7 +273,7 @@ class CESCalculator:
         if max_val - min_val == 0: 
             return 0.0
         norm = (value - min_val) / (max_val - min_val)
-        return max(0.0, min(1.0, norm))
+        return 0.0 if norm < 0.0 else (1.0 if norm > 1.0 else norm)
 
     def _get_label(self, score):
         """
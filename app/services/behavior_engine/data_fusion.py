@@ -1,6 +1,9 @@
 from dataclasses import dataclass
 from enum import Enum
-from app.services.behavior_engine.metrics import SessionMetrics
+
+import numpy as np
+
+from .metrics import BatchMetrics, SessionMetrics
 
 # --- DEFINING THE ENUMS (The Standardized Flags) ---
 
@@ -24,9 +27,46 @@ class CognitiveState(str, Enum):
     PASSIVE_IDLE = "Passive Idle"
     DISENGAGEMENT = "Disengagement"
 
+# Member -> plain string value for all three state enums. A dict lookup is
+# several times cheaper than the `.value` descriptor on every response.
+STATE_VALUES = {
+    member: member.value
+    for state_enum in (ProvenanceState, IterationState, CognitiveState)
+    for member in state_enum
+}
+
+# Object arrays of members in definition order, so an int code array maps
+# back to enum members with one fancy-index (used by analyze_batch)
+_PROVENANCE_MEMBERS = np.array(list(ProvenanceState), dtype=object)
+_ITERATION_MEMBERS = np.array(list(IterationState), dtype=object)
+_COGNITIVE_MEMBERS = np.array(list(CognitiveState), dtype=object)
+
+_PROVENANCE_CODE = {member: code for code, member in enumerate(ProvenanceState)}
+_ITERATION_CODE = {member: code for code, member in enumerate(IterationState)}
+_COGNITIVE_CODE = {member: code for code, member in enumerate(CognitiveState)}
+
+# Members bound to module names for analyze(): a global read is several
+# times cheaper than the enum class attribute lookup on every assignment
+_INCREMENTAL_EDIT = ProvenanceState.INCREMENTAL_EDIT
+_AUTHENTIC_REFACTORING = ProvenanceState.AUTHENTIC_REFACTORING
+_AMBIGUOUS_EDIT = ProvenanceState.AMBIGUOUS_EDIT
+_SUSPECTED_PASTE = ProvenanceState.SUSPECTED_PASTE
+_SPAMMING = ProvenanceState.SPAMMING
+
+_NORMAL = IterationState.NORMAL
+_DELIBERATE_DEBUGGING = IterationState.DELIBERATE_DEBUGGING
+_VERIFICATION_RUN = IterationState.VERIFICATION_RUN
+_MICRO_ITERATION = IterationState.MICRO_ITERATION
+_RAPID_GUESSING = IterationState.RAPID_GUESSING
+
+_ACTIVE = CognitiveState.ACTIVE
+_REFLECTIVE_PAUSE = CognitiveState.REFLECTIVE_PAUSE
+_PASSIVE_IDLE = CognitiveState.PASSIVE_IDLE
+_DISENGAGEMENT = CognitiveState.DISENGAGEMENT
+
 # --- CORE ALGORITHM ---
 
-@dataclass
+@dataclass(slots=True)
 class FusionInsights:
     """
     Carries the Qualitative Pedagogical Insights derived from Data Fusion.
@@ -41,6 +81,22 @@ class FusionInsights:
     effective_ir: float
     integrity_penalty: float
 
+@dataclass(slots=True)
+class BatchFusionInsights:
+    """
+    Column-wise FusionInsights for a batch of sessions (see BatchMetrics).
+    State columns are object arrays of enum members.
+    """
+    provenance_state: np.ndarray
+    iteration_state: np.ndarray
+    cognitive_state: np.ndarray
+    
+    # Effective Metrics
+    effective_kpm: np.ndarray
+    effective_ad: np.ndarray
+    effective_ir: np.ndarray
+    integrity_penalty: np.ndarray
+
 class DataFusionEngine:
     """
     Implements the Algorithmic Synergy using strict State Enums.
@@ -119,6 +175,11 @@ class DataFusionEngine:
         - Session duration 15-60 minutes
         """
         
+        # The two fields every tree reads, several times each; the rest are
+        # read at most once per taken branch, so they stay attribute reads
+        duration_minutes = metrics.duration_minutes
+        total_keystrokes = metrics.total_keystrokes
+        
         # --- 1. PROVENANCE & AUTHENTICITY (Figure 5) ---
         
         # IMPORTANT: This analysis is STATELESS and evaluates CURRENT behavior only.
@@ -126,10 +187,10 @@ class DataFusionEngine:
         # Small legitimate edits after a large insertion will return to INCREMENTAL_EDIT.
         
         # Default State (assume legitimate until proven otherwise)
-        provenance = ProvenanceState.INCREMENTAL_EDIT
+        provenance = _INCREMENTAL_EDIT
         integrity_penalty = 0.0
         
-        raw_kpm = metrics.total_keystrokes / metrics.duration_minutes if metrics.duration_minutes > 0 else 0
+        raw_kpm = total_keystrokes / duration_minutes if duration_minutes > 0 else 0
         
         # Logic Tree: Large Insertions
         # Context: For novices solving short problems (250-500 chars), 30-char insertions
@@ -147,55 +208,60 @@ class DataFusionEngine:
                 metrics.last_edit_size_chars > 50):
                 # Pattern: Very large insertion + tab-switch + extremely low keystroke density
                 # Interpretation: Strong evidence of copy-paste from external source
-                provenance = ProvenanceState.SUSPECTED_PASTE
+                provenance = _SUSPECTED_PASTE
                 integrity_penalty = 0.5
             # Alternative: Large insertion with high keystroke efficiency
             elif keystroke_to_insertion_ratio > 0.8:
                 # Pattern: Large insertion + high keystroke density (typed it)
                 # Interpretation: Authentic refactoring/rewrite
-                provenance = ProvenanceState.AUTHENTIC_REFACTORING
+                provenance = _AUTHENTIC_REFACTORING
             else:
                 # Pattern: Large insertion + moderate activity
                 # Interpretation: Uncertain—could be internal block move/paste or fast typing
-                provenance = ProvenanceState.AMBIGUOUS_EDIT
+                provenance = _AMBIGUOUS_EDIT
 
         # Logic Tree: Spam Check & Additional Paste Detection
         # Context: Novices typically achieve efficiency ratios of 0.20-0.40
         # due to trial-and-error. Ratios <0.05 suggest random key-mashing.
-        efficiency_ratio = metrics.net_code_change / metrics.total_keystrokes if metrics.total_keystrokes > 50 else 1.0
-        
         # Check for burst typing/spamming
         is_burst_typing = (self.BURST_TYPING_MIN <= metrics.recent_burst_size_chars <= self.BURST_TYPING_MAX)
         
+        # The ratio only feeds the two checks below, which both need either a
+        # spam-level keystroke count or a burst; skip the division otherwise
+        if is_burst_typing or total_keystrokes > self.SPAM_KEYSTROKE_MINIMUM:
+            efficiency_ratio = metrics.net_code_change / total_keystrokes if total_keystrokes > 50 else 1.0
+        else:
+            efficiency_ratio = 1.0
+        
         # Additional paste detection: VERY strict to avoid false positives
         # Only flag if there's EXTREME evidence: lots of code, very few keystrokes, multiple focus violations
         if (metrics.net_code_change > 200 and 
-            metrics.total_keystrokes < metrics.net_code_change * 0.3 and 
+            total_keystrokes < metrics.net_code_change * 0.3 and 
             metrics.focus_violation_count > 2 and
-            provenance not in [ProvenanceState.SUSPECTED_PASTE, ProvenanceState.SPAMMING]):
+            provenance is not _SUSPECTED_PASTE):
             # Pattern: Lots of code exists but extremely few keystrokes + multiple tab switches
             # Interpretation: Code was likely pasted in multiple chunks
-            provenance = ProvenanceState.SUSPECTED_PASTE
+            provenance = _SUSPECTED_PASTE
             integrity_penalty = 0.5
         
-        if metrics.total_keystrokes > self.SPAM_KEYSTROKE_MINIMUM and efficiency_ratio < self.SPAM_EFFICIENCY_THRESHOLD:
+        if total_keystrokes > self.SPAM_KEYSTROKE_MINIMUM and efficiency_ratio < self.SPAM_EFFICIENCY_THRESHOLD:
             # Detected: High keystroke volume with negligible code retention
             # Action: Nullify KPM contribution to prevent score inflation
             effective_kpm = 0.0
-            provenance = ProvenanceState.SPAMMING
+            provenance = _SPAMMING
         elif is_burst_typing and efficiency_ratio < 0.15:
             # Detected: Burst typing pattern with low efficiency
             # Action: Flag as potential spamming/gaming behavior
             effective_kpm = raw_kpm * 0.5  # Apply 50% penalty
-            if provenance == ProvenanceState.INCREMENTAL_EDIT:
-                provenance = ProvenanceState.SPAMMING
+            if provenance is _INCREMENTAL_EDIT:
+                provenance = _SPAMMING
         else:
             effective_kpm = raw_kpm
 
 
         # --- 2. ITERATION QUALITY (Figure 6) ---
         
-        iteration = IterationState.NORMAL
+        iteration = _NORMAL
         effective_runs = metrics.total_run_attempts
         
         # Logic Tree: Run Intervals
@@ -206,35 +272,35 @@ class DataFusionEngine:
             if not metrics.is_semantic_change:
                 # Pattern: Quick re-run + no logical change (whitespace only)
                 # Interpretation: Reflexive guessing, not deliberate debugging
-                iteration = IterationState.RAPID_GUESSING
+                iteration = _RAPID_GUESSING
                 # Penalty: Discount 20% of run attempts (partial productivity credit)
                 effective_runs = metrics.total_run_attempts * self.RAPID_GUESSING_PENALTY
             elif metrics.last_run_was_error:
                 # Pattern: Quick re-run + has changes BUT previous run had error
                 # Interpretation: Likely random trial-and-error without understanding
                 # If truly debugging thoughtfully, would take >10s to read error and fix
-                iteration = IterationState.RAPID_GUESSING
+                iteration = _RAPID_GUESSING
                 effective_runs = metrics.total_run_attempts * self.RAPID_GUESSING_PENALTY
             else:
                 # Pattern: Quick re-run + meaningful code change + no previous error
                 # Interpretation: Valid fast-paced iteration (testing variations)
-                iteration = IterationState.MICRO_ITERATION
+                iteration = _MICRO_ITERATION
         else:
             if metrics.is_semantic_change:
                 # Pattern: Sufficient interval + logical modification
                 # Interpretation: Optimal hypothesis-driven debugging
-                iteration = IterationState.DELIBERATE_DEBUGGING
+                iteration = _DELIBERATE_DEBUGGING
             else:
                 # Pattern: Sufficient interval + trivial change
                 # Interpretation: Re-running same code (verification/sanity check)
-                iteration = IterationState.VERIFICATION_RUN
+                iteration = _VERIFICATION_RUN
 
-        effective_ad = effective_runs / metrics.duration_minutes if metrics.duration_minutes > 0 else 0
+        effective_ad = effective_runs / duration_minutes if duration_minutes > 0 else 0
 
 
         # --- 3. COGNITIVE STATE (Figure 7) ---
         
-        cognitive = CognitiveState.ACTIVE
+        cognitive = _ACTIVE
         adjusted_idle_minutes = metrics.total_idle_minutes
         
         # Logic Tree: Idle Context
@@ -243,21 +309,21 @@ class DataFusionEngine:
             if not metrics.is_window_focused:
                 # Pattern: Idle + window unfocused (alt-tabbed away)
                 # Interpretation: Off-task behavior, distraction
-                cognitive = CognitiveState.DISENGAGEMENT
+                cognitive = _DISENGAGEMENT
             else:
                 if metrics.last_run_was_error:
                     # Pattern: Idle + window focused + recent error
                     # Interpretation: Reading error messages, planning fix (VALID)
-                    cognitive = CognitiveState.REFLECTIVE_PAUSE
+                    cognitive = _REFLECTIVE_PAUSE
                     # Reward: Exclude this pause from idle penalty
                     current_pause_min = metrics.current_idle_duration / 60
                     adjusted_idle_minutes = max(0, metrics.total_idle_minutes - current_pause_min)
                 else:
                     # Pattern: Idle + window focused + no error context
                     # Interpretation: Unproductive stalling (writer's block)
-                    cognitive = CognitiveState.PASSIVE_IDLE
+                    cognitive = _PASSIVE_IDLE
 
-        effective_ir = adjusted_idle_minutes / metrics.duration_minutes if metrics.duration_minutes > 0 else 0
+        effective_ir = adjusted_idle_minutes / duration_minutes if duration_minutes > 0 else 0
 
 
         return FusionInsights(
@@ -268,4 +334,129 @@ class DataFusionEngine:
             effective_ad=effective_ad,
             effective_ir=effective_ir,
             integrity_penalty=integrity_penalty
-        )
\ No newline at end of file
+        )
+
+    def analyze_batch(self, metrics: BatchMetrics) -> BatchFusionInsights:
+        """
+        Vectorized `analyze` over many sessions (dashboards, batch scoring).
+        
+        Evaluates the same three decision trees (Figures 5, 6, 7) with the
+        same thresholds, but column-wise: each branch becomes a boolean mask
+        and each state assignment a masked write, applied in the same order
+        as the scalar code so later rules override earlier ones identically.
+        
+        Args:
+            metrics: Raw telemetry columns, one entry per session
+        
+        Returns:
+            BatchFusionInsights with one entry per session
+        """
+        duration = np.asarray(metrics.duration_minutes, dtype=np.float64)
+        keystrokes = np.asarray(metrics.total_keystrokes, dtype=np.float64)
+        runs = np.asarray(metrics.total_run_attempts, dtype=np.float64)
+        idle_minutes = np.asarray(metrics.total_idle_minutes, dtype=np.float64)
+        fvc = np.asarray(metrics.focus_violation_count)
+        net_change = np.asarray(metrics.net_code_change, dtype=np.float64)
+        last_edit = np.asarray(metrics.last_edit_size_chars, dtype=np.float64)
+        burst = np.asarray(metrics.recent_burst_size_chars, dtype=np.float64)
+        is_semantic = np.asarray(metrics.is_semantic_change, dtype=bool)
+        last_error = np.asarray(metrics.last_run_was_error, dtype=bool)
+        current_idle = np.asarray(metrics.current_idle_duration, dtype=np.float64)
+        
+        # Divisors are replaced by 1 where the scalar code falls back to a constant
+        has_duration = duration > 0
+        safe_duration = np.where(has_duration, duration, 1.0)
+        
+        # --- 1. PROVENANCE & AUTHENTICITY (Figure 5) ---
+        provenance = np.full(duration.shape, _PROVENANCE_CODE[ProvenanceState.INCREMENTAL_EDIT])
+        integrity_penalty = np.zeros(duration.shape)
+        
+        raw_kpm = np.where(has_duration, keystrokes / safe_duration, 0.0)
+        
+        # Logic Tree: Large Insertions (last_edit > threshold implies last_edit > 0)
+        large_insertion = last_edit > self.LARGE_INSERTION_THRESHOLD
+        keystroke_ratio = np.where(
+            large_insertion, burst / np.where(large_insertion, last_edit, 1.0), 0.0
+        )
+        paste = large_insertion & (keystroke_ratio < 0.2) & (fvc > 0) & (last_edit > 50)
+        refactoring = large_insertion & ~paste & (keystroke_ratio > 0.8)
+        ambiguous = large_insertion & ~paste & ~refactoring
+        provenance[paste] = _PROVENANCE_CODE[ProvenanceState.SUSPECTED_PASTE]
+        integrity_penalty[paste] = 0.5
+        provenance[refactoring] = _PROVENANCE_CODE[ProvenanceState.AUTHENTIC_REFACTORING]
+        provenance[ambiguous] = _PROVENANCE_CODE[ProvenanceState.AMBIGUOUS_EDIT]
+        
+        # Logic Tree: Spam Check & Additional Paste Detection
+        counts_efficiency = keystrokes > 50
+        efficiency_ratio = np.where(
+            counts_efficiency,
+            net_change / np.where(counts_efficiency, keystrokes, 1.0),
+            1.0,
+        )
+        is_burst_typing = (burst >= self.BURST_TYPING_MIN) & (burst <= self.BURST_TYPING_MAX)
+        
+        # SPAMMING is only assigned below, so only SUSPECTED_PASTE can be set here
+        extra_paste = (
+            (net_change > 200)
+            & (keystrokes < net_change * 0.3)
+            & (fvc > 2)
+            & (provenance != _PROVENANCE_CODE[ProvenanceState.SUSPECTED_PASTE])
+        )
+        provenance[extra_paste] = _PROVENANCE_CODE[ProvenanceState.SUSPECTED_PASTE]
+        integrity_penalty[extra_paste] = 0.5
+        
+        spamming = (
+            (keystrokes > self.SPAM_KEYSTROKE_MINIMUM)
+            & (efficiency_ratio < self.SPAM_EFFICIENCY_THRESHOLD)
+        )
+        burst_spamming = ~spamming & is_burst_typing & (efficiency_ratio < 0.15)
+        effective_kpm = np.where(spamming, 0.0, np.where(burst_spamming, raw_kpm * 0.5, raw_kpm))
+        provenance[spamming] = _PROVENANCE_CODE[ProvenanceState.SPAMMING]
+        provenance[
+            burst_spamming & (provenance == _PROVENANCE_CODE[ProvenanceState.INCREMENTAL_EDIT])
+        ] = _PROVENANCE_CODE[ProvenanceState.SPAMMING]
+        
+        # --- 2. ITERATION QUALITY (Figure 6) ---
+        rapid = np.asarray(metrics.last_run_interval_seconds) < self.RAPID_ITERATION_THRESHOLD
+        guessing = rapid & (~is_semantic | last_error)
+        iteration = np.select(
+            [guessing, rapid, is_semantic],
+            [
+                _ITERATION_CODE[IterationState.RAPID_GUESSING],
+                _ITERATION_CODE[IterationState.MICRO_ITERATION],
+                _ITERATION_CODE[IterationState.DELIBERATE_DEBUGGING],
+            ],
+            default=_ITERATION_CODE[IterationState.VERIFICATION_RUN],
+        )
+        effective_runs = np.where(guessing, runs * self.RAPID_GUESSING_PENALTY, runs)
+        effective_ad = np.where(has_duration, effective_runs / safe_duration, 0.0)
+        
+        # --- 3. COGNITIVE STATE (Figure 7) ---
+        idle = current_idle > self.REFLECTIVE_PAUSE_MIN
+        focused = np.asarray(metrics.is_window_focused, dtype=bool)
+        reflective = idle & focused & last_error
+        cognitive = np.select(
+            [idle & ~focused, reflective, idle],
+            [
+                _COGNITIVE_CODE[CognitiveState.DISENGAGEMENT],
+                _COGNITIVE_CODE[CognitiveState.REFLECTIVE_PAUSE],
+                _COGNITIVE_CODE[CognitiveState.PASSIVE_IDLE],
+            ],
+            default=_COGNITIVE_CODE[CognitiveState.ACTIVE],
+        )
+        adjusted_idle = np.where(
+            reflective,
+            np.maximum(0.0, idle_minutes - current_idle / 60),
+            idle_minutes,
+        )
+        effective_ir = np.where(has_duration, adjusted_idle / safe_duration, 0.0)
+        
+        return BatchFusionInsights(
+            provenance_state=_PROVENANCE_MEMBERS[provenance],
+            iteration_state=_ITERATION_MEMBERS[iteration],
+            cognitive_state=_COGNITIVE_MEMBERS[cognitive],
+            effective_kpm=effective_kpm,
+            effective_ad=effective_ad,
+            effective_ir=effective_ir,
+            integrity_penalty=integrity_penalty,
+        )
@@ -1,6 +1,8 @@
 from dataclasses import dataclass
 
-@dataclass
+import numpy as np
+
+@dataclass(slots=True)
 class SessionMetrics:
     """
     DTO that holds the RAW telemetry data.
@@ -25,3 +27,25 @@ class SessionMetrics:
     
     # --- BURST TYPING DETECTION ---
     recent_burst_size_chars: int = 0 # Keystrokes in recent 5-second window (for spam detection)
+
+
+@dataclass(slots=True)
+class BatchMetrics:
+    """
+    Column-wise (structure-of-arrays) SessionMetrics for many sessions.
+    Each field is a 1-D NumPy array with one entry per session; entry i of
+    every column belongs to session i. Used for batch scoring.
+    """
+    duration_minutes: np.ndarray
+    total_keystrokes: np.ndarray
+    total_run_attempts: np.ndarray
+    total_idle_minutes: np.ndarray
+    focus_violation_count: np.ndarray
+    net_code_change: np.ndarray
+    last_edit_size_chars: np.ndarray
+    last_run_interval_seconds: np.ndarray
+    is_semantic_change: np.ndarray
+    current_idle_duration: np.ndarray
+    is_window_focused: np.ndarray
+    last_run_was_error: np.ndarray
+    recent_burst_size_chars: np.ndarray
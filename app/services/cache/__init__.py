@@ -0,0 +1,8 @@
+"""
+Caching utilities shared across rbAI services.
+"""
+
+from .llm_cache import LLMCache
+from .semantic_cache import SemanticCache
+
+__all__ = ["LLMCache", "SemanticCache"]
@@ -0,0 +1,68 @@
+"""
+Exact-match cache for LLM tutoring responses.
+
+Students in the same class tend to ask the same first question about the
+same problem; those repeats are answered from memory instead of a new LLM
+round-trip. Keys are hashes of the normalized query plus everything else
+that shapes the prompt (problem and behavioral states).
+"""
+
+import hashlib
+import json
+from typing import Any, Dict, Optional
+
+from cachetools import TTLCache
+
+
+class LLMCache:
+    """
+    Bounded TTL cache keyed by SHA-256 of the prompt-shaping inputs.
+
+    Values are plain dicts (e.g. a dumped response model), so callers own
+    how they are rebuilt on a hit.
+    """
+
+    def __init__(self, max_entries: int = 10_000, ttl_seconds: float = 3600.0):
+        self._entries: TTLCache = TTLCache(maxsize=max_entries, ttl=ttl_seconds)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(problem_id: str, user_query: str, **states: Optional[str]) -> str:
+        """
+        Build a cache key from a problem, a query and any behavioral states.
+
+        The query is whitespace- and case-normalized so trivial variations
+        share an entry.
+        """
+        payload = {
+            "pid": problem_id,
+            "q": " ".join(user_query.lower().split()),
+            **states,
+        }
+        return hashlib.sha256(
+            json.dumps(payload, sort_keys=True).encode()
+        ).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached value for `key`, or None on a miss."""
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        """Store `value` under `key`, evicting the least recently used entry if full."""
+        self._entries[key] = value
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for observability."""
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
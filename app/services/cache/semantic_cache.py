@@ -0,0 +1,196 @@
+"""
+Lightweight in-process semantic cache for LLM-generated content.
+
+Prompts are embedded as L2-normalized vectors of words plus adjacent word
+pairs, so filler-word and plural variations ("make an activity on binary
+search" vs "create activities about binary search") resolve to the same
+cached entry, while prompts that only reorder the same words ("convert a
+list to a string" vs "convert a string to a list") do not. No external model
+or vector index needed - the cache is small and lookups are a linear cosine
+scan.
+"""
+
+import math
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+# Filler words that carry no topical meaning in activity/tutoring prompts
+_STOPWORDS = frozenset({
+    "a", "an", "the", "and", "or", "of", "on", "in", "to", "for", "with",
+    "about", "some", "me", "my", "i", "please", "make", "create", "generate",
+    "give", "write", "can", "you", "could", "would", "new", "that", "this",
+    "is", "are", "be", "it", "using", "use",
+})
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+Embedding = Dict[str, float]
+
+
+def _tokenize(text: str) -> List[str]:
+    """Normalized content tokens of `text`, in order."""
+    tokens = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        if token in _STOPWORDS:
+            continue
+        # Crude plural folding ("activities" -> "activity", "loops" -> "loop")
+        if len(token) > 4 and token.endswith("ies"):
+            token = token[:-3] + "y"
+        elif len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def embed(text: str) -> Embedding:
+    """
+    Embed text as a sparse, L2-normalized vector of words and word pairs.
+
+    Args:
+        text: Raw prompt text
+
+    Returns:
+        Mapping of feature -> weight (unit length); features are tokens and
+        space-joined adjacent token pairs
+    """
+    return _vectorize(_tokenize(text))
+
+
+def _vectorize(tokens: List[str]) -> Embedding:
+    counts: Dict[str, float] = {}
+    for token in tokens:
+        counts[token] = counts.get(token, 0.0) + 1.0
+    # Adjacent pairs carry word order: "celsius to fahrenheit" and
+    # "fahrenheit to celsius" share every word but no pair
+    for first, second in zip(tokens, tokens[1:]):
+        pair = f"{first} {second}"
+        counts[pair] = counts.get(pair, 0.0) + 1.0
+
+    norm = math.sqrt(sum(v * v for v in counts.values()))
+    if norm == 0:
+        return {}
+    return {token: v / norm for token, v in counts.items()}
+
+
+def cosine(a: Embedding, b: Embedding) -> float:
+    """Cosine similarity of two normalized sparse vectors (dot product)."""
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(weight * b.get(token, 0.0) for token, weight in a.items())
+
+
+class SemanticCache:
+    """
+    Bounded LRU + TTL cache with nearest-neighbour lookup over prompt embeddings.
+
+    Design:
+    - Exact hits (same normalized tokens in the same order) are O(1)
+    - Near-duplicates are found with a cosine scan over live entries
+    - Entries expire after `ttl_seconds` and the oldest are evicted past `max_entries`
+    - An optional `namespace` (e.g. a problem ID) partitions entries; lookups
+      never match across namespaces
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.92,
+        max_entries: int = 256,
+        ttl_seconds: float = 3600.0,
+    ):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        # key -> (embedding, value, expires_at, namespace)
+        self._entries: "OrderedDict[str, Tuple[Embedding, Any, float, str]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(tokens: List[str], namespace: str = "") -> str:
+        return f"{namespace}|" + " ".join(tokens)
+
+    def _evict_expired(self, now: float) -> None:
+        expired = [key for key, (_, _, expires_at, _) in self._entries.items() if expires_at <= now]
+        for key in expired:
+            del self._entries[key]
+
+    def search(
+        self,
+        text: str,
+        min_score: float = 0.0,
+        top_k: int = 1,
+        namespace: str = "",
+    ) -> List[Tuple[float, Any]]:
+        """
+        Return up to `top_k` (similarity, value) pairs scoring at least `min_score`.
+
+        Does not count towards hit/miss statistics.
+        """
+        now = time.monotonic()
+        self._evict_expired(now)
+
+        query = embed(text)
+        if not query:
+            return []
+
+        scored = [
+            (cosine(query, vector), value)
+            for vector, value, _, entry_namespace in self._entries.values()
+            if entry_namespace == namespace
+        ]
+        scored = [item for item in scored if item[0] >= min_score]
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return scored[:top_k]
+
+    def get(self, text: str, namespace: str = "") -> Optional[Any]:
+        """
+        Look up a cached value for `text` or a close paraphrase of it.
+
+        Returns:
+            Cached value if similarity >= threshold, else None
+        """
+        now = time.monotonic()
+        tokens = _tokenize(text)
+
+        # Fast path: identical token sequence
+        key = self._key(tokens, namespace)
+        entry = self._entries.get(key) if tokens else None
+        if entry and entry[2] > now:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+        matches = self.search(text, min_score=self.threshold, top_k=1, namespace=namespace)
+        if matches:
+            self.hits += 1
+            return matches[0][1]
+
+        self.misses += 1
+        return None
+
+    def set(self, text: str, value: Any, namespace: str = "") -> None:
+        """Store `value` for `text`, evicting the least recently used entry if full."""
+        tokens = _tokenize(text)
+        if not tokens:
+            return
+
+        vector = _vectorize(tokens)
+        key = self._key(tokens, namespace)
+        self._entries[key] = (vector, value, time.monotonic() + self.ttl_seconds, namespace)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for observability."""
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
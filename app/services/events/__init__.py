@@ -0,0 +1,7 @@
+"""
+Asynchronous event persistence for behavioral telemetry.
+"""
+
+from .batcher import EventBatcher
+
+__all__ = ["EventBatcher"]
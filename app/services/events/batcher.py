@@ -0,0 +1,143 @@
+"""
+Batched write-behind queue for execution/telemetry events.
+
+Request handlers enqueue events without awaiting any I/O; a single
+background consumer drains the queue and persists events in batches, so
+one round-trip (one multi-row INSERT once a database is wired in) covers
+many students' runs.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+Event = Dict[str, Any]
+
+
+class EventBatcher:
+    """
+    Bounded asyncio queue with a batching consumer.
+
+    Design:
+    - `put` never blocks: when the queue is full the oldest event is dropped
+    - The consumer flushes every `max_batch` events or `max_delay_seconds`,
+      whichever comes first
+    - `stop` signals the consumer instead of cancelling it, so a partial
+      batch or a flush in progress is never lost; everything still queued
+      is flushed before it returns
+
+    Persistence is not wired in yet: `_flush` only logs the batch size and
+    the events are then discarded.
+    """
+
+    def __init__(
+        self,
+        max_queue: int = 10_000,
+        max_batch: int = 100,
+        max_delay_seconds: float = 0.2,
+    ):
+        self.max_batch = max_batch
+        self.max_delay_seconds = max_delay_seconds
+
+        self._queue: "asyncio.Queue[Event]" = asyncio.Queue(maxsize=max_queue)
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+        self.dropped = 0
+
+    def start(self) -> None:
+        """Spawn the consumer task on the running event loop."""
+        if self._task is None:
+            self._stopping.clear()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Tell the consumer to drain the queue, wait for it, then flush any stragglers."""
+        if self._task is not None:
+            self._stopping.set()
+            await self._task
+            self._task = None
+
+        remaining: List[Event] = []
+        while not self._queue.empty():
+            remaining.append(self._queue.get_nowait())
+        if remaining:
+            await self._flush(remaining)
+
+    def put(self, event: Event) -> None:
+        """Enqueue an event, dropping the oldest one if the queue is full."""
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self._queue.get_nowait()
+            self._queue.put_nowait(event)
+            self.dropped += 1
+            if self.dropped % 1000 == 1:
+                logger.warning("Event queue full, dropped %s events so far", self.dropped)
+
+    async def _next_event(self, timeout: Optional[float] = None) -> Optional[Event]:
+        """
+        Next queued event, waiting up to `timeout` seconds (forever if None).
+
+        Returns None on timeout, or once `stop` was requested and the queue
+        is empty; queued events are always handed out first.
+        """
+        if not self._queue.empty():
+            return self._queue.get_nowait()
+        if self._stopping.is_set():
+            return None
+
+        get = asyncio.ensure_future(self._queue.get())
+        stopping = asyncio.ensure_future(self._stopping.wait())
+        try:
+            await asyncio.wait({get, stopping}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            stopping.cancel()
+            if not get.done():
+                get.cancel()  # Queue.get gives up cleanly; no event is consumed
+        if get.done() and not get.cancelled():
+            return get.result()
+        return None
+
+    async def _collect_batch(self) -> List[Event]:
+        """
+        Wait for one event, then gather more until the batch is full or the
+        window closes. Returns an empty batch once stopped and drained.
+        """
+        first = await self._next_event()
+        if first is None:
+            return []
+        batch = [first]
+        deadline = time.monotonic() + self.max_delay_seconds
+
+        while len(batch) < self.max_batch:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            event = await self._next_event(timeout)
+            if event is None:
+                break
+            batch.append(event)
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._collect_batch()
+            if not batch:
+                return
+            try:
+                await self._flush(batch)
+            except Exception as e:
+                logger.error("Failed to persist %s events: %s", len(batch), e, exc_info=True)
+
+    async def _flush(self, batch: List[Event]) -> None:
+        """
+        Persist one batch of events.
+
+        TODO: Insert into database as a single multi-row statement
+        (Telemetry Events table), e.g. INSERT INTO telemetry_events (...) VALUES (...), (...)
+        """
+        logger.info("Persisting batch of %s events", len(batch))
+        # await db.telemetry_events.insert_many(batch)
@@ -5,33 +5,56 @@ Implements secure, isolated Python code execution with resource limits.
 
 import docker
 import asyncio
+import os
+import socket
 import time
-from typing import Dict, Any, List, Optional
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Any, List, Optional, Set, Tuple
 from datetime import datetime
 import logging
 
-from .test_validator import create_test_code
+from docker.models.containers import Container
+
+from .test_validator import create_batch_test_code, create_test_code, parse_batch_results
 
 logger = logging.getLogger(__name__)
 
+# Pre-warmed sandbox containers per executor (= max concurrent runs)
+POOL_SIZE = int(os.getenv("EXECUTION_POOL_SIZE", "4"))
+
+# Every sandbox container carries the role label; the owner label records
+# the host and PID that started it so a later process can tell which
+# leftovers belong to a process that has died
+_ROLE_LABEL = "rbai.role"
+_ROLE_VALUE = "sandbox-worker"
+_OWNER_LABEL = "rbai.owner"
+
+# Per-container process cap; bounds fork bombs in a reused container
+_PIDS_LIMIT = 64
+
+# Run in a worker after every job: kill whatever the job left running
+# (background processes, a timed-out interpreter) and empty both writable
+# mounts (/tmp and /dev/shm) so nothing carries over to the next
+# submission. `kill -1` spares PID 1 (the idle `sleep`) and the shell
+# running it; it is repeated to catch processes forked mid-kill. Exits
+# non-zero if anything is left, so the worker gets replaced
+_RESET_COMMAND = [
+    "sh", "-c",
+    "kill -9 -1 2>/dev/null; kill -9 -1 2>/dev/null; kill -9 -1 2>/dev/null; "
+    "find /tmp /dev/shm -mindepth 1 -delete 2>/dev/null; "
+    "[ -z \"$(find /tmp /dev/shm -mindepth 1 | head -n 1)\" ]",
+]
+
 
+@dataclass(slots=True)
 class ExecutionResult:
     """Data class for execution results"""
-    def __init__(
-        self,
-        status: str,
-        output: str,
-        error: str = "",
-        execution_time: float = 0.0,
-        exit_code: int = 0,
-        test_results: Optional[List[Dict]] = None
-    ):
-        self.status = status  # "success", "error", "timeout"
-        self.output = output
-        self.error = error
-        self.execution_time = execution_time
-        self.exit_code = exit_code
-        self.test_results = test_results or []
+    status: str  # "success", "error", "timeout", "failed_tests"
+    output: str
+    error: str = ""
+    execution_time: float = 0.0
+    exit_code: int = 0
+    test_results: List[Dict] = field(default_factory=list)
 
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -44,10 +67,157 @@ class ExecutionResult:
         }
 
 
+def _pid_alive(pid: str) -> bool:
+    """Whether `pid` names a running process other than this one."""
+    try:
+        pid_number = int(pid)
+    except ValueError:
+        return False
+    if pid_number == os.getpid():
+        return False
+    if os.name == "nt":
+        return True  # os.kill(pid, 0) would terminate it on Windows
+    try:
+        os.kill(pid_number, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # Exists, owned by another user
+    return True
+
+
+class _WorkerPool:
+    """
+    Fixed set of long-lived sandbox containers, lent out one job at a time.
+    
+    Each container idles on `sleep infinity` under the same limits a
+    per-run container had, and jobs are `exec`s inside it. A run then costs
+    one exec instead of a container create/start/remove (hundreds of ms of
+    namespace and cgroup setup).
+    """
+    
+    def __init__(self, spawn: Callable[[], Container], size: int):
+        """
+        Start `size` containers (blocking; call from a worker thread).
+        
+        Args:
+            spawn: Blocking factory for one idle sandbox container
+            size: Number of containers to keep
+        """
+        self.size = size
+        self._spawn = spawn
+        self._idle: "asyncio.Queue[Container]" = asyncio.Queue()
+        self._all: Set[Container] = set()
+        # Slots whose replacement failed; refilled lazily by acquire()
+        self._missing = 0
+        # In-flight replacements (strong refs so they are not collected)
+        self._replacing: Set["asyncio.Task[None]"] = set()
+        # Set by aclose(); containers spawned after it are removed at once
+        self._closed = False
+        
+        try:
+            for _ in range(size):
+                container = spawn()
+                self._all.add(container)
+                self._idle.put_nowait(container)
+        except Exception:
+            self._remove_all()
+            raise
+    
+    @property
+    def idle(self) -> int:
+        return self._idle.qsize()
+    
+    async def acquire(self) -> Container:
+        """Wait for an idle container, first retrying any failed replacement."""
+        if self._missing and self._idle.empty():
+            self._missing -= 1
+            container = None
+            try:
+                container = await asyncio.to_thread(self._spawn)
+            except docker.errors.DockerException as e:
+                logger.error("Could not start sandbox worker: %s", e)
+                if self._missing + 1 >= self.size:
+                    raise RuntimeError("No sandbox workers available") from e
+            finally:
+                if container is None:
+                    # Failed or cancelled: the slot is still missing
+                    self._missing += 1
+            if container is not None:
+                if self._closed:
+                    await asyncio.to_thread(self._remove, container)
+                    raise RuntimeError("Sandbox pool is closed")
+                self._all.add(container)
+                return container
+        return await self._idle.get()
+    
+    def release(self, container: Container) -> None:
+        """Return a container that was reset cleanly."""
+        self._idle.put_nowait(container)
+    
+    def replace(self, container: Container) -> None:
+        """
+        Discard a broken or tainted container and start a fresh one.
+        
+        Runs as its own task, so a caller cancelled while releasing the
+        slot (client disconnect) cannot abandon the replacement halfway.
+        """
+        self._all.discard(container)
+        task = asyncio.get_running_loop().create_task(self._replace(container))
+        self._replacing.add(task)
+        task.add_done_callback(self._replacing.discard)
+    
+    async def _replace(self, container: Container) -> None:
+        fresh = None
+        try:
+            await asyncio.to_thread(self._remove, container)
+            fresh = await asyncio.to_thread(self._spawn)
+        except docker.errors.DockerException as e:
+            logger.error("Could not replace sandbox worker: %s", e)
+        finally:
+            if fresh is None:
+                # Failed or cancelled: acquire() retries the slot
+                self._missing += 1
+            elif self._closed:
+                # Finished after shutdown began: nothing will ever use it
+                await asyncio.to_thread(self._remove, fresh)
+            else:
+                self._all.add(fresh)
+                self._idle.put_nowait(fresh)
+    
+    async def aclose(self) -> None:
+        """
+        Remove every container, including ones still being replaced.
+        
+        In-flight replacements are awaited rather than cancelled: cancelling
+        the await would not stop the blocking spawn in its thread, and the
+        container it started would be left running with no owner.
+        """
+        self._closed = True
+        while self._replacing:
+            await asyncio.gather(*self._replacing, return_exceptions=True)
+        await asyncio.to_thread(self._remove_all)
+    
+    def _remove_all(self) -> None:
+        for container in list(self._all):
+            self._remove(container)
+        self._all.clear()
+    
+    @staticmethod
+    def _remove(container: Container) -> None:
+        try:
+            container.remove(force=True)
+        except docker.errors.DockerException as e:
+            logger.warning("Failed to remove sandbox worker %s: %s", container.short_id, e)
+
+
 class DockerExecutor:
     """
     Executes Python code in isolated Docker containers with strict resource limits.
     
+    Runs are dispatched to a pool of pre-started containers (see
+    `_WorkerPool`); each container is reset after every job.
+    
     Security Features:
     - Network disabled
     - Memory limit: 128MB
@@ -62,7 +232,8 @@ class DockerExecutor:
         image_name: str = "python:3.10-alpine",
         memory_limit: str = "128m",
         cpu_quota: int = 50000,  # 50% of one CPU core
-        timeout: int = 5
+        timeout: int = 5,
+        pool_size: int = POOL_SIZE
     ):
         self.image_name = image_name
         self.memory_limit = memory_limit
@@ -75,10 +246,76 @@ class DockerExecutor:
             self.client.ping()
             logger.info("Docker client initialized successfully")
         except docker.errors.DockerException as e:
-            logger.error(f"Failed to initialize Docker client: {e}")
+            logger.error("Failed to initialize Docker client: %s", e)
             raise RuntimeError(
                 "Docker is not available. Please ensure Docker is installed and running."
             )
+        
+        self._owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._remove_stale_workers()
+        
+        try:
+            self._pool = _WorkerPool(self._spawn_worker, pool_size)
+            logger.info("Started %d sandbox workers", pool_size)
+        except docker.errors.ImageNotFound:
+            logger.error("Docker image not found: %s", self.image_name)
+            raise RuntimeError(f"Docker image {self.image_name} is not available.")
+        except docker.errors.DockerException as e:
+            logger.error("Failed to start sandbox workers: %s", e)
+            raise RuntimeError("Could not start sandbox containers.")
+    
+    def _spawn_worker(self) -> Container:
+        """Start one idle sandbox container (blocking SDK call)."""
+        return self.client.containers.run(
+            self.image_name,
+            command=["sleep", "infinity"],
+            detach=True,
+            mem_limit=self.memory_limit,
+            cpu_quota=self.cpu_quota,
+            network_disabled=True,
+            read_only=True,
+            tmpfs={'/tmp': 'size=10M,mode=1777'},
+            # Docker's default /dev/shm is a writable 64MB tmpfs even with
+            # read_only; keep it as small as /tmp
+            shm_size='10m',
+            pids_limit=_PIDS_LIMIT,
+            environment={
+                'PYTHONUNBUFFERED': '1',
+                'PYTHONDONTWRITEBYTECODE': '1'
+            },
+            labels={_ROLE_LABEL: _ROLE_VALUE, _OWNER_LABEL: self._owner}
+        )
+    
+    def _remove_stale_workers(self) -> None:
+        """
+        Remove sandbox containers left behind by a process that died without
+        shutting down (blocking SDK calls).
+        
+        Only containers started from this host are considered, and only if
+        their owning PID is gone or is our own (a restarted container reuses
+        PIDs); other live processes sharing the Docker daemon keep theirs.
+        Containers without an owner label predate it and are always stale.
+        """
+        try:
+            containers = self.client.containers.list(
+                all=True, filters={"label": f"{_ROLE_LABEL}={_ROLE_VALUE}"}
+            )
+        except docker.errors.DockerException as e:
+            logger.warning("Could not list leftover sandbox workers: %s", e)
+            return
+        
+        host = socket.gethostname()
+        for container in containers:
+            owner = container.labels.get(_OWNER_LABEL, "")
+            owner_host, _, owner_pid = owner.rpartition(":")
+            if owner and (owner_host != host or _pid_alive(owner_pid)):
+                continue
+            logger.info("Removing leftover sandbox worker %s (owner: %s)", container.short_id, owner or "unknown")
+            _WorkerPool._remove(container)
+    
+    async def aclose(self) -> None:
+        """Remove the pooled containers (call at shutdown)."""
+        await self._pool.aclose()
     
     def _prepare_code(self, user_code: str, stdin_data: str = "") -> str:
         """
@@ -88,8 +325,9 @@ class DockerExecutor:
         # Indent user code
         indented_code = self._indent_code(user_code, 8)
         
-        # Escape stdin data for Python string
-        stdin_escaped = stdin_data.replace('\\', '\\\\').replace("'", "\\'").replace('\n', '\\n')
+        # repr() yields a valid one-line Python literal for any string
+        # (quotes, backslashes, CR, control and non-BMP characters)
+        stdin_literal = repr(stdin_data)
         
         # Wrapper template that captures stdout/stderr and injects stdin
         wrapper = f'''import sys
@@ -97,7 +335,7 @@ import io
 from contextlib import redirect_stdout, redirect_stderr
 
 # Replace stdin with provided input
-sys.stdin = io.StringIO('{stdin_escaped}')
+sys.stdin = io.StringIO({stdin_literal})
 
 # Capture output
 stdout_capture = io.StringIO()
@@ -125,8 +363,8 @@ except Exception as e:
     def _indent_code(self, code: str, spaces: int) -> str:
         """Indent each line of code by specified spaces"""
         indent = ' ' * spaces
-        lines = code.split('\n')
-        return '\n'.join(indent + line for line in lines)
+        # Same result as prefixing every split line, in two C-level passes
+        return indent + code.replace('\n', '\n' + indent)
     
     async def execute_code(
         self,
@@ -135,13 +373,56 @@ except Exception as e:
         test_cases: Optional[List[Dict]] = None
     ) -> ExecutionResult:
         """
-        Execute Python code in a Docker container.
+        Execute Python code in a pooled sandbox container.
+        
+        Waits for an idle worker, runs the code there, then resets the
+        worker before returning it. A worker that fails to reset, or whose
+        run was cancelled mid-flight, is replaced rather than reused.
         
         Args:
             code: The Python code to execute
             stdin: Optional standard input for the program
             test_cases: Optional list of test cases to validate against
             
+        Returns:
+            ExecutionResult object with execution details
+        """
+        return await self._run_pooled(code, stdin, self.timeout)
+    
+    async def _run_pooled(self, code: str, stdin: str, timeout: float) -> ExecutionResult:
+        """Borrow a worker, run `code` with the given time limit, and reset it."""
+        container = await self._pool.acquire()
+        reusable = False
+        try:
+            result = await self._exec_in_worker(container, code, stdin, timeout)
+            # Docker SDK calls are blocking; keep them off the event loop
+            reusable = await asyncio.to_thread(self._reset_worker, container)
+        finally:
+            if reusable:
+                self._pool.release(container)
+            else:
+                self._pool.replace(container)
+        return result
+    
+    async def _exec_in_worker(
+        self,
+        container: Container,
+        code: str,
+        stdin: str,
+        timeout: float
+    ) -> ExecutionResult:
+        """
+        Run wrapped code as an exec inside `container`.
+        
+        On timeout the blocked exec thread is left to finish on its own:
+        the reset that follows kills the interpreter, which ends the exec.
+        
+        Args:
+            container: Worker taken from the pool
+            code: The Python code to execute
+            stdin: Standard input for the program
+            timeout: Time limit in seconds
+            
         Returns:
             ExecutionResult object with execution details
         """
@@ -151,50 +432,25 @@ except Exception as e:
             # Prepare code with safety wrapper (stdin is injected into the code)
             wrapped_code = self._prepare_code(code, stdin)
             
-            # Create and run container
             logger.info("Starting container execution...")
-            container = self.client.containers.run(
-                self.image_name,
-                command=["python", "-c", wrapped_code],
-                detach=True,
-                remove=False,
-                mem_limit=self.memory_limit,
-                cpu_quota=self.cpu_quota,
-                network_disabled=True,
-                read_only=True,
-                tmpfs={'/tmp': 'size=10M,mode=1777'},
-                environment={
-                    'PYTHONUNBUFFERED': '1',
-                    'PYTHONDONTWRITEBYTECODE': '1'
-                }
-            )
-            
-            # Wait for completion with timeout
             try:
-                result = container.wait(timeout=self.timeout)
-                exit_code = result['StatusCode']
-            except Exception as e:
-                container.stop(timeout=0)
-                container.remove(force=True)
+                exit_code, (stdout, stderr) = await asyncio.wait_for(
+                    asyncio.to_thread(
+                        container.exec_run,
+                        ["python", "-c", wrapped_code],
+                        demux=True
+                    ),
+                    timeout=timeout
+                )
+            except asyncio.TimeoutError:
                 execution_time = time.time() - start_time
-                
-                if execution_time >= self.timeout:
-                    logger.warning(f"Execution timeout after {execution_time:.3f}s")
-                    return ExecutionResult(
-                        status="timeout",
-                        output="",
-                        error=f"Execution exceeded {self.timeout} second time limit",
-                        execution_time=execution_time
-                    )
-                else:
-                    raise
-            
-            # Get output
-            stdout = container.logs(stdout=True, stderr=False).decode('utf-8')
-            stderr = container.logs(stdout=False, stderr=True).decode('utf-8')
-            
-            # Clean up
-            container.remove(force=True)
+                logger.warning("Execution timeout after %.3fs", execution_time)
+                return ExecutionResult(
+                    status="timeout",
+                    output="",
+                    error=f"Execution exceeded {timeout:g} second time limit",
+                    execution_time=execution_time
+                )
             
             execution_time = time.time() - start_time
             
@@ -204,18 +460,18 @@ except Exception as e:
             else:
                 status = "error"
             
-            logger.info(f"Execution completed: {status} in {execution_time:.3f}s")
+            logger.info("Execution completed: %s in %.3fs", status, execution_time)
             
             return ExecutionResult(
                 status=status,
-                output=stdout,
-                error=stderr,
+                output=(stdout or b"").decode('utf-8', errors='replace'),
+                error=(stderr or b"").decode('utf-8', errors='replace'),
                 execution_time=execution_time,
                 exit_code=exit_code
             )
-                
-        except docker.errors.ContainerError as e:
-            logger.error(f"Container error: {e}")
+            
+        except docker.errors.APIError as e:
+            logger.error("Container error: %s", e)
             return ExecutionResult(
                 status="error",
                 output="",
@@ -223,17 +479,10 @@ except Exception as e:
                 execution_time=time.time() - start_time
             )
             
-        except docker.errors.ImageNotFound:
-            logger.error(f"Docker image not found: {self.image_name}")
-            return ExecutionResult(
-                status="error",
-                output="",
-                error=f"Python environment not available. Please contact administrator.",
-                execution_time=0
-            )
-            
         except Exception as e:
-            logger.error(f"Unexpected execution error: {e}", exc_info=True)
+            # Not reached by failing user code (that is a normal exit code);
+            # only SDK/internal failures land here, so keep the traceback
+            logger.error("Unexpected execution error: %s", e, exc_info=True)
             return ExecutionResult(
                 status="error",
                 output="",
@@ -241,6 +490,22 @@ except Exception as e:
                 execution_time=time.time() - start_time
             )
     
+    @staticmethod
+    def _reset_worker(container: Container) -> bool:
+        """
+        Clean a worker after a job (blocking SDK call).
+        
+        Returns:
+            False if the container could not be reset (e.g. it died or is
+            fork-bombed) and must be replaced
+        """
+        try:
+            exit_code, _ = container.exec_run(_RESET_COMMAND)
+            return exit_code == 0
+        except docker.errors.DockerException as e:
+            logger.warning("Sandbox worker %s failed to reset: %s", container.short_id, e)
+            return False
+    
     async def execute_with_tests(
         self,
         code: str,
@@ -250,6 +515,13 @@ except Exception as e:
         Execute code and validate against test cases.
         Automatically calls the user's function with test inputs.
         
+        All test cases first run in one execution: a generated script loops
+        over the inputs, running the user code in fresh globals per test, so
+        K tests cost one interpreter start instead of K. If that execution
+        yields no usable per-test report (timeout, crash, syntax error, a
+        tampered report line), every test is re-run in its own execution as
+        before, so one test's failure cannot fail the others.
+        
         Args:
             code: Python code to execute (function definition)
             test_cases: List of dicts with 'input' and 'expected_output' keys
@@ -257,19 +529,97 @@ except Exception as e:
         Returns:
             ExecutionResult with test_results populated
         """
+        # (input, stripped expected output) per test, read once
+        normalized = [
+            (test_case.get('input', ''), test_case.get('expected_output', '').strip())
+            for test_case in test_cases
+        ]
+        batch_code, error = create_batch_test_code(code, [test_input for test_input, _ in normalized])
+        
+        if error or not test_cases:
+            # Failed to generate test code (e.g., no function found)
+            return ExecutionResult(
+                status="error",
+                output="",
+                error="No valid test cases executed",
+                test_results=[
+                    {
+                        "test_number": i + 1,
+                        "passed": False,
+                        "input": test_input,
+                        "expected_output": expected,
+                        "actual_output": "",
+                        "error": error
+                    }
+                    for i, (test_input, expected) in enumerate(normalized)
+                ]
+            )
+        
+        # Single per-test time limit: a batch that needs longer (or loops
+        # forever) falls back to per-test runs, each with the full limit
+        result = await self._run_pooled(batch_code, "", self.timeout)
+        per_test = (
+            parse_batch_results(result.output, len(normalized))
+            if result.status == "success" else None
+        )
+        if per_test is None:
+            return await self._execute_tests_individually(code, normalized)
+        
         test_results = []
         all_passed = True
-        last_result = None
         
-        for i, test_case in enumerate(test_cases):
-            test_input = test_case.get('input', '')
-            expected = test_case.get('expected_output', '').strip()
+        for i, (test_input, expected) in enumerate(normalized):
+            actual = per_test[i]["output"].strip()
+            test_error = per_test[i]["error"]
+            passed = (actual == expected) and per_test[i]["ok"]
             
+            test_results.append({
+                "test_number": i + 1,
+                "passed": passed,
+                "input": test_input,
+                "expected_output": expected,
+                "actual_output": actual,
+                "error": test_error
+            })
+            
+            if not passed:
+                all_passed = False
+        
+        # Report the last test's output/error, with status based on all tests
+        result.output = per_test[-1]["output"]
+        result.error = per_test[-1]["error"] or ""
+        result.exit_code = 0 if per_test[-1]["ok"] else 1
+        result.test_results = test_results
+        result.status = "success" if all_passed else "failed_tests"
+        # Clear error if all tests passed
+        if all_passed:
+            result.error = ""
+        return result
+    
+    async def _execute_tests_individually(
+        self,
+        code: str,
+        normalized: List[Tuple[str, str]]
+    ) -> ExecutionResult:
+        """
+        Run each test case in its own execution (fallback for execute_with_tests).
+        
+        Args:
+            code: Python code to execute (function definition)
+            normalized: (input, stripped expected output) per test
+            
+        Returns:
+            ExecutionResult with test_results populated
+        """
+        test_results = []
+        all_passed = True
+        last_result = None
+        
+        for i, (test_input, expected) in enumerate(normalized):
             # Generate test code that calls the function with inputs
             test_code, error = create_test_code(code, test_input)
             
             if error:
-                # Failed to generate test code (e.g., no function found)
                 test_results.append({
                     "test_number": i + 1,
                     "passed": False,
@@ -281,7 +631,6 @@ except Exception as e:
                 all_passed = False
                 continue
             
-            # Execute the generated test code
             result = await self.execute_code(test_code, stdin="")
             last_result = result
             
@@ -339,6 +688,10 @@ except Exception as e:
                 "docker_available": True,
                 "image_available": image_available,
                 "image_name": self.image_name,
+                "pool": {
+                    "size": self._pool.size,
+                    "idle": self._pool.idle
+                },
                 "resource_limits": {
                     "memory": self.memory_limit,
                     "cpu_quota": self.cpu_quota,
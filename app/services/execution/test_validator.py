@@ -3,8 +3,15 @@ Test validation utilities for automatic function testing.
 Extracts function names from code and generates test wrappers.
 """
 
+import json
 import re
-from typing import Optional, List, Tuple
+from typing import Any, Dict, Optional, List, Tuple
+
+# Prefixes the JSON line a batch test script prints its results on
+BATCH_RESULTS_MARKER = "__RBAI_TEST_RESULTS__"
+
+# Function definitions: def function_name(params):
+_DEF_RE = re.compile(r'def\s+([a-zA-Z_][a-zA-Z0-9_]*)\s*\(')
 
 
 def extract_function_name(code: str) -> Optional[str]:
@@ -18,9 +25,7 @@ def extract_function_name(code: str) -> Optional[str]:
     Returns:
         Function name or None if no function found
     """
-    # Match function definitions: def function_name(params):
-    pattern = r'def\s+([a-zA-Z_][a-zA-Z0-9_]*)\s*\('
-    match = re.search(pattern, code)
+    match = _DEF_RE.search(code)
     
     if match:
         return match.group(1)
@@ -106,3 +111,122 @@ def create_test_code(user_code: str, test_input: str) -> Tuple[str, Optional[str
     test_code = generate_test_wrapper(user_code, func_name, test_args)
     
     return test_code, None
+
+
+def generate_batch_test_wrapper(user_code: str, function_name: str, test_inputs: List[str]) -> str:
+    """
+    Generate one script that runs the user's code against every test input.
+    
+    Each test gets what a separate `generate_test_wrapper` run would: the
+    user code executed in fresh globals, then the function called and its
+    result printed. Output and errors are captured per test and reported
+    as a JSON list on a line starting with BATCH_RESULTS_MARKER, one
+    {"output", "error", "ok"} entry per test. Each entry matches what that
+    test's own execution reported: stdout, stderr (or None), and whether
+    it exited cleanly.
+    
+    Code and calls are embedded as string literals, so the script stays
+    valid when DockerExecutor indents it into its safety wrapper.
+    
+    Args:
+        user_code: User's function definition
+        function_name: Name of the function to test
+        test_inputs: Raw test case inputs (e.g., "5, 3")
+        
+    Returns:
+        Complete Python code that executes all tests
+    """
+    calls = [f"{function_name}({', '.join(parse_test_input(i))})" for i in test_inputs]
+    
+    wrapper = f'''import io, json
+from contextlib import redirect_stderr, redirect_stdout
+
+_code = compile({user_code!r}, "<user_code>", "exec")
+_results = []
+for _call in {calls!r}:
+    _out = io.StringIO()
+    _err = io.StringIO()
+    _globals = {{"__name__": "__main__"}}
+    try:
+        with redirect_stdout(_out), redirect_stderr(_err):
+            exec(_code, _globals)
+            print(eval(_call, _globals))
+        _results.append({{"output": _out.getvalue(), "error": _err.getvalue() or None, "ok": True}})
+    except SystemExit as _e:
+        # exit() ends only this test. As with a process of its own, captured
+        # output is discarded; an int status decides success, any other
+        # value is printed to stderr and fails the test
+        if _e.code is None or isinstance(_e.code, int):
+            _results.append({{"output": "", "error": None, "ok": not _e.code}})
+        else:
+            _results.append({{"output": "", "error": f"{{_e.code}}\\n", "ok": False}})
+    except BaseException as _e:
+        _results.append({{
+            "output": "",
+            "error": f"Runtime Error: {{type(_e).__name__}}: {{_e}}\\n",
+            "ok": False,
+        }})
+print({BATCH_RESULTS_MARKER!r} + json.dumps(_results))
+'''
+    
+    return wrapper
+
+
+def create_batch_test_code(user_code: str, test_inputs: List[str]) -> Tuple[str, Optional[str]]:
+    """
+    Create one executable script covering all test inputs.
+    
+    Args:
+        user_code: User's Python code with function definition
+        test_inputs: Test case inputs, in order
+        
+    Returns:
+        Tuple of (executable_code, error_message)
+        If error_message is not None, code generation failed
+    """
+    func_name = extract_function_name(user_code)
+    
+    if not func_name:
+        return "", "No function definition found in code"
+    
+    return generate_batch_test_wrapper(user_code, func_name, test_inputs), None
+
+
+def parse_batch_results(output: str, expected_count: int) -> Optional[List[Dict[str, Any]]]:
+    """
+    Extract per-test results from a batch script's stdout.
+    
+    The line is produced inside the user's process, so it is validated
+    rather than trusted: anything but exactly `expected_count` well-formed
+    entries counts as no results.
+    
+    Args:
+        output: The batch script's stdout
+        expected_count: Number of test inputs the script was generated for
+    
+    Returns:
+        List of {"output", "error", "ok"} dicts, or None if the script did not
+        get as far as reporting (crash, syntax error, timeout) or the
+        report is malformed
+    """
+    # The results are the script's last line; test output is captured
+    # into the JSON, so an earlier marker-looking line is not ours
+    last_line = output.rstrip("\n").rpartition("\n")[2]
+    if not last_line.startswith(BATCH_RESULTS_MARKER):
+        return None
+    try:
+        results = json.loads(last_line[len(BATCH_RESULTS_MARKER):])
+    except ValueError:
+        return None
+    
+    if not isinstance(results, list) or len(results) != expected_count:
+        return None
+    for entry in results:
+        if not (
+            isinstance(entry, dict)
+            and isinstance(entry.get("output"), str)
+            and (entry.get("error") is None or isinstance(entry.get("error"), str))
+            and isinstance(entry.get("ok"), bool)
+        ):
+            return None
+    return results
@@ -0,0 +1,13 @@
+"""
+Per-session state shared between the execution and chat endpoints.
+"""
+
+from .code_store import get_session_code, store_session_code
+from .history_store import append_chat_turn, get_chat_history
+
+__all__ = [
+    "get_session_code",
+    "store_session_code",
+    "get_chat_history",
+    "append_chat_turn",
+]
@@ -0,0 +1,95 @@
+"""
+Session code store.
+
+Holds the latest code each student ran, keyed by session and problem, so
+the chat tutor can see it. Redis-backed when REDIS_URL is set (shared
+across workers, TTL eviction); falls back to a bounded in-memory TTL cache
+for local development.
+"""
+
+import logging
+import time
+from typing import Optional
+
+import zstandard as zstd
+from cachetools import TTLCache
+from redis.exceptions import RedisError
+
+from .redis_client import redis_client as _redis
+
+logger = logging.getLogger(__name__)
+
+SESSION_CODE_TTL_SECONDS = 3600
+SESSION_CODE_MAX_ENTRIES = 10_000
+_session_code_store: TTLCache = TTLCache(
+    maxsize=SESSION_CODE_MAX_ENTRIES,
+    ttl=SESSION_CODE_TTL_SECONDS,
+)
+
+# Stored code is zstd-compressed (level 1: fast, still ~3x on Python source).
+# Both contexts are reused; requests run on a single event loop thread.
+_code_compressor = zstd.ZstdCompressor(level=1)
+_code_decompressor = zstd.ZstdDecompressor()
+
+
+def _decompress_code(blob: bytes) -> str:
+    """Decode a stored code blob, tolerating uncompressed legacy values."""
+    try:
+        return _code_decompressor.decompress(blob).decode()
+    except zstd.ZstdError:
+        return blob.decode()
+
+
+async def store_session_code(session_id: str, problem_id: str, code: str) -> None:
+    """
+    Store the current code for a session-problem pair.
+    
+    Args:
+        session_id: Unique session identifier
+        problem_id: Problem/activity identifier
+        code: Current code content
+    """
+    key = f"code:{session_id}:{problem_id}"
+    blob = _code_compressor.compress(code.encode())
+    if _redis is not None:
+        try:
+            await _redis.set(key, blob, ex=SESSION_CODE_TTL_SECONDS)
+        except RedisError as e:
+            logger.warning("Failed to store code for %s in Redis: %s", key, e)
+            return
+    else:
+        # (stored_at_ns, blob) - tuple is smaller and cheaper to build than a dict
+        _session_code_store[key] = (time.time_ns(), blob)
+    logger.debug("Stored code for %s (%d chars)", key, len(code))
+
+
+async def get_session_code(
+    session_id: str,
+    problem_id: str,
+    max_chars: Optional[int] = None,
+) -> Optional[str]:
+    """
+    Retrieve the current code for a session-problem pair.
+    
+    Args:
+        session_id: Unique session identifier
+        problem_id: Problem/activity identifier
+        max_chars: Optional cap on the returned code length
+        
+    Returns:
+        Current code or None if not found
+    """
+    key = f"code:{session_id}:{problem_id}"
+    if _redis is not None:
+        try:
+            blob = await _redis.get(key)
+        except RedisError as e:
+            logger.warning("Failed to read code for %s from Redis: %s", key, e)
+            return None
+    else:
+        stored = _session_code_store.get(key)
+        blob = stored[1] if stored else None
+
+    if not blob:
+        return None
+    return _decompress_code(blob)[:max_chars]
@@ -0,0 +1,100 @@
+"""
+Server-side chat history.
+
+Keeps the recent tutoring turns for each session-problem pair so clients
+only send the new message instead of re-uploading the whole conversation
+every turn. Redis-backed when REDIS_URL is set; otherwise a bounded
+in-memory TTL cache.
+"""
+
+import logging
+from typing import Dict, List, Optional
+
+import orjson
+from cachetools import TTLCache
+from redis.exceptions import RedisError
+
+from .redis_client import redis_client as _redis
+
+logger = logging.getLogger(__name__)
+
+CHAT_HISTORY_TTL_SECONDS = 3600
+CHAT_HISTORY_MAX_ENTRIES = 10_000
+# Messages kept per conversation (user + assistant turns)
+CHAT_HISTORY_MAX_MESSAGES = 20
+
+_history_store: TTLCache = TTLCache(
+    maxsize=CHAT_HISTORY_MAX_ENTRIES,
+    ttl=CHAT_HISTORY_TTL_SECONDS,
+)
+
+
+def _history_key(session_id: str, problem_id: str) -> str:
+    return f"history:{session_id}:{problem_id}"
+
+
+async def get_chat_history(
+    session_id: str,
+    problem_id: str,
+    limit: Optional[int] = None,
+) -> List[Dict[str, str]]:
+    """
+    Retrieve the stored conversation for a session-problem pair.
+    
+    Args:
+        session_id: Unique session identifier
+        problem_id: Problem/activity identifier
+        limit: Only return the newest `limit` messages (all if None); older
+            messages are neither transferred nor decoded
+        
+    Returns:
+        Messages oldest first ([] if none stored)
+    """
+    key = _history_key(session_id, problem_id)
+    start = -limit if limit else 0
+    if _redis is None:
+        # Stored as a tuple of shared dicts; only the slice is copied
+        return list(_history_store.get(key, ())[start:])
+    
+    try:
+        raw = await _redis.lrange(key, start, -1)
+    except RedisError as e:
+        logger.warning("Failed to read chat history for %s from Redis: %s", key, e)
+        return []
+    return [orjson.loads(item) for item in raw]
+
+
+async def append_chat_turn(
+    session_id: str,
+    problem_id: str,
+    user_message: str,
+    assistant_message: str,
+) -> None:
+    """
+    Record one user/assistant exchange, keeping only the newest messages.
+    
+    Args:
+        session_id: Unique session identifier
+        problem_id: Problem/activity identifier
+        user_message: The student's message
+        assistant_message: The tutor's reply
+    """
+    key = _history_key(session_id, problem_id)
+    turn = (
+        {"role": "user", "content": user_message},
+        {"role": "assistant", "content": assistant_message},
+    )
+    
+    if _redis is None:
+        history = _history_store.get(key, ()) + turn
+        _history_store[key] = history[-CHAT_HISTORY_MAX_MESSAGES:]
+        return
+    
+    try:
+        async with _redis.pipeline(transaction=False) as pipe:
+            pipe.rpush(key, *(orjson.dumps(message) for message in turn))
+            pipe.ltrim(key, -CHAT_HISTORY_MAX_MESSAGES, -1)
+            pipe.expire(key, CHAT_HISTORY_TTL_SECONDS)
+            await pipe.execute()
+    except RedisError as e:
+        logger.warning("Failed to store chat turn for %s in Redis: %s", key, e)
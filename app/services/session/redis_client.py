@@ -0,0 +1,21 @@
+"""
+Shared Redis connection for the session stores.
+
+None when REDIS_URL is unset; each store then falls back to an in-memory
+cache (per worker process, fine for local development).
+"""
+
+import os
+from typing import Optional
+
+import redis.asyncio as aioredis
+
+_redis_url = os.getenv("REDIS_URL")
+redis_client: Optional[aioredis.Redis] = (
+    aioredis.from_url(
+        _redis_url,
+        max_connections=int(os.getenv("REDIS_MAX_CONNECTIONS", "50")),
+    )
+    if _redis_url
+    else None
+)
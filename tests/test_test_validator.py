@@ -0,0 +1,123 @@
+"""
+Batch test script and report parsing (app/services/execution/test_validator.py).
+
+Generated scripts are run with the local interpreter, which is enough to
+check that each batch entry matches what the per-test execution path
+(one sandboxed process per test) reports.
+"""
+
+import json
+import subprocess
+import sys
+
+import pytest
+
+from app.services.execution.test_validator import (
+    BATCH_RESULTS_MARKER,
+    create_batch_test_code,
+    parse_batch_results,
+)
+
+
+def _run_batch(user_code, test_inputs):
+    code, error = create_batch_test_code(user_code, test_inputs)
+    assert error is None
+    completed = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, timeout=10
+    )
+    assert completed.returncode == 0, completed.stderr
+    return parse_batch_results(completed.stdout, len(test_inputs))
+
+
+def _report(entries):
+    return BATCH_RESULTS_MARKER + json.dumps(entries) + "\n"
+
+
+# --- GENERATED SCRIPT ---
+
+def test_passing_tests_report_output():
+    results = _run_batch("def add(a, b):\n    return a + b", ["1, 2", "3, 4"])
+    assert results == [
+        {"output": "3\n", "error": None, "ok": True},
+        {"output": "7\n", "error": None, "ok": True},
+    ]
+
+
+def test_system_exit_zero_is_clean_and_nonzero_fails():
+    user_code = "def f(a):\n    print('partial')\n    exit(a)"
+    results = _run_batch(user_code, ["0", "1", "None"])
+    # Output is discarded and no error is reported, as with a process that
+    # exited with that status; only the status differs
+    assert results == [
+        {"output": "", "error": None, "ok": True},
+        {"output": "", "error": None, "ok": False},
+        {"output": "", "error": None, "ok": True},
+    ]
+
+
+def test_system_exit_message_is_reported_as_error():
+    results = _run_batch("def f():\n    exit('bye')", [""])
+    assert results == [{"output": "", "error": "bye\n", "ok": False}]
+
+
+def test_stderr_of_passing_test_is_reported():
+    user_code = "import sys\ndef f(a):\n    print('warn', file=sys.stderr)\n    return a"
+    results = _run_batch(user_code, ["1"])
+    assert results == [{"output": "1\n", "error": "warn\n", "ok": True}]
+
+
+def test_runtime_error_matches_per_test_format():
+    results = _run_batch("def f(a):\n    return 1 / a", ["1", "0"])
+    assert results[0] == {"output": "1.0\n", "error": None, "ok": True}
+    assert results[1] == {
+        "output": "",
+        "error": "Runtime Error: ZeroDivisionError: division by zero\n",
+        "ok": False,
+    }
+
+
+def test_marker_printed_by_user_code_stays_in_its_output():
+    user_code = f"def f():\n    print({BATCH_RESULTS_MARKER + '[]'!r})\n    return 1"
+    results = _run_batch(user_code, [""])
+    assert results == [{"output": BATCH_RESULTS_MARKER + "[]\n1\n", "error": None, "ok": True}]
+
+
+# --- REPORT PARSING ---
+
+_ENTRY = {"output": "1\n", "error": None, "ok": True}
+
+
+def test_parse_accepts_well_formed_report():
+    assert parse_batch_results("noise\n" + _report([_ENTRY, _ENTRY]), 2) == [_ENTRY, _ENTRY]
+
+
+@pytest.mark.parametrize("count", [1, 3])
+def test_parse_rejects_wrong_count(count):
+    assert parse_batch_results(_report([_ENTRY, _ENTRY]), count) is None
+
+
+@pytest.mark.parametrize("entries", [
+    {"output": "1\n"},
+    [1, 2],
+    [{"output": 1, "error": None, "ok": True}],
+    [{"output": "1\n", "error": 0, "ok": True}],
+    [{"output": "1\n", "error": None}],
+    [{"output": "1\n", "error": None, "ok": "yes"}],
+])
+def test_parse_rejects_forged_entries(entries):
+    assert parse_batch_results(_report(entries), 1) is None
+
+
+def test_parse_rejects_invalid_json():
+    assert parse_batch_results(BATCH_RESULTS_MARKER + "[{]\n", 1) is None
+
+
+def test_parse_ignores_marker_before_last_line():
+    output = _report([_ENTRY]) + "printed after the report\n"
+    assert parse_batch_results(output, 1) is None
+
+
+def test_parse_uses_last_line_when_marker_also_appears_earlier():
+    forged = {"output": "forged\n", "error": None, "ok": True}
+    output = _report([forged]) + _report([_ENTRY])
+    assert parse_batch_results(output, 1) == [_ENTRY]